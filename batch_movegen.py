@@ -0,0 +1,226 @@
+import random
+import time
+
+import numpy as np
+
+from game_logic import (MAX_TURN_MOVES, MOVE_CODE_BAR, MOVE_CODE_OFF, MOVE_CODE_SHIFT, NO_MOVE_CODE, NUM_POINTS,
+                        PLAYER_O, BackgammonGame, Position, decode_move, encode_turn)
+
+BATCH_POSITION_WIDTH = NUM_POINTS + 2
+HOME_POINTS = 6
+
+# Canonical rows are seen from the side to move: its checkers are positive, it moves from point 23 towards 0,
+# column 24 is its bar and column 25 the opponent's bar. X rows are already canonical; O rows are mirrored.
+_MOVER_BAR = NUM_POINTS
+_OPPONENT_BAR = NUM_POINTS + 1
+_SOURCES = np.arange(NUM_POINTS + 1)
+
+
+def positions_to_array(positions):
+    """Stacks Position objects (or their cells) into the (N, 26) batch layout: 24 signed points, bar X, bar O."""
+    return np.array([position.cells[:BATCH_POSITION_WIDTH] if isinstance(position, Position)
+                     else position[:BATCH_POSITION_WIDTH] for position in positions], dtype=np.int16)
+
+
+def _mirror_rows(boards, rows):
+    # Swaps X/O orientation of the selected rows; applying it twice is the identity.
+    mirrored = boards[rows]
+    boards[rows, :NUM_POINTS] = -mirrored[:, NUM_POINTS - 1::-1]
+    boards[rows, _MOVER_BAR] = mirrored[:, _OPPONENT_BAR]
+    boards[rows, _OPPONENT_BAR] = mirrored[:, _MOVER_BAR]
+    return boards
+
+
+def _first_unique_rows(keys):
+    """Indices of the first occurrence of each distinct row of a 2-D integer array, in original order."""
+    keys = np.ascontiguousarray(keys)
+    row_view = keys.view(np.dtype((np.void, keys.dtype.itemsize * keys.shape[1]))).ravel()
+    _, first = np.unique(row_view, return_index=True)
+    first.sort()
+    return first
+
+
+def _legal_single_moves(boards, die):
+    """(K, 25) mask of sources (24 = bar) that can move one checker `die` pips on each canonical board."""
+    dest = _SOURCES[None, :] - die[:, None]
+    own = boards[:, :NUM_POINTS + 1] > 0
+    must_enter = boards[:, _MOVER_BAR] > 0
+    own[must_enter, :NUM_POINTS] = False
+
+    target = np.take_along_axis(boards[:, :NUM_POINTS], np.clip(dest, 0, NUM_POINTS - 1), axis=1)
+    lands = (dest >= 0) & (target >= -1)
+
+    all_home = ~(boards[:, HOME_POINTS:_MOVER_BAR + 1] > 0).any(axis=1)
+    furthest = HOME_POINTS - 1 - np.argmax(boards[:, HOME_POINTS - 1::-1] > 0, axis=1)
+    bears_off = (dest == -1) | ((dest < -1) & (_SOURCES[None, :] == furthest[:, None]))
+    bears_off &= all_home[:, None]
+    return own & (lands | bears_off) & (die > 0)[:, None], dest
+
+
+def generate_successors(positions, dice, players):
+    """Generates every distinct position reachable by a legal turn, for a whole batch at once.
+
+    `positions` is an (N, 26) int array in the positions_to_array layout, `dice` a (2,) or (N, 2) array of
+    rolls and `players` the side to move, scalar or (N,). Returns (successors, offsets, moves): successors is
+    (M, 26) int16 with the rows for input i in successors[offsets[i]:offsets[i + 1]], and moves is (M, 4) int16
+    holding one turn reaching each row as game_logic move codes padded with NO_MOVE_CODE. An input with no
+    legal turn gets an empty range. The legal set is the one get_possible_moves(..., unique_positions=True)
+    produces: all dice played if possible, otherwise as many as possible, and the larger die when only one can be.
+    """
+    positions = np.asarray(positions, dtype=np.int16).reshape(-1, BATCH_POSITION_WIDTH)
+    num_inputs = len(positions)
+    players = np.broadcast_to(np.asarray(players), (num_inputs,))
+    dice = np.broadcast_to(np.asarray(dice, dtype=np.int16).reshape(-1, 2), (num_inputs, 2))
+    is_o = players == PLAYER_O
+    canonical = _mirror_rows(positions.copy(), is_o)
+
+    high, low = dice.max(axis=1), dice.min(axis=1)
+    doubles = high == low
+    # One branch per order the dice can be played in; a double is a single branch of four equal dice.
+    first_order = np.where(doubles[:, None], high[:, None], np.stack([high, low, low * 0, low * 0], axis=1))
+    swapped_inputs = np.flatnonzero(~doubles)
+    second_order = np.zeros((len(swapped_inputs), MAX_TURN_MOVES), dtype=np.int16)
+    second_order[:, 0], second_order[:, 1] = low[swapped_inputs], high[swapped_inputs]
+    branch_dice = np.concatenate([first_order.astype(np.int16), second_order])
+    branch_input = np.concatenate([np.arange(num_inputs), swapped_inputs])
+
+    branch = np.arange(len(branch_dice))
+    boards = canonical[branch_input]
+    moves = np.full((len(branch), MAX_TURN_MOVES), NO_MOVE_CODE, dtype=np.int16)
+    done_branch, done_boards, done_moves, done_length = [], [], [], []
+
+    for step in range(MAX_TURN_MOVES + 1):
+        die = branch_dice[branch, step] if step < MAX_TURN_MOVES else np.zeros(len(branch), dtype=np.int16)
+        legal, dest = _legal_single_moves(boards, die)
+        finished = ~legal.any(axis=1)
+        if step > 0 and finished.any():
+            done_branch.append(branch[finished])
+            done_boards.append(boards[finished])
+            done_moves.append(moves[finished])
+            done_length.append(np.full(int(finished.sum()), step))
+        rows, sources = np.nonzero(legal)
+        if len(rows) == 0:
+            break
+
+        targets = dest[rows, sources]
+        next_boards = boards[rows]
+        row_ids = np.arange(len(rows))
+        next_boards[row_ids, sources] -= 1
+        lands = targets >= 0
+        land_rows, land_points = row_ids[lands], targets[lands]
+        hit = next_boards[land_rows, land_points] == -1
+        next_boards[land_rows, land_points] = np.where(hit, 1, next_boards[land_rows, land_points] + 1)
+        next_boards[land_rows[hit], _OPPONENT_BAR] += 1
+
+        next_branch = branch[rows]
+        mirrored = is_o[branch_input[next_branch]]
+        start_codes = np.where(sources == _MOVER_BAR, MOVE_CODE_BAR,
+                               np.where(mirrored, NUM_POINTS - 1 - sources, sources))
+        end_codes = np.where(targets < 0, MOVE_CODE_OFF, np.where(mirrored, NUM_POINTS - 1 - targets, targets))
+        next_moves = moves[rows]
+        next_moves[:, step] = (start_codes << MOVE_CODE_SHIFT) | end_codes
+
+        # Within a branch, equal intermediate boards have identical continuations: keep one of each.
+        keep = _first_unique_rows(np.concatenate([next_branch[:, None], next_boards], axis=1).astype(np.int32))
+        branch, boards, moves = next_branch[keep], next_boards[keep], next_moves[keep]
+
+    if not done_branch:
+        return (np.zeros((0, BATCH_POSITION_WIDTH), dtype=np.int16), np.zeros(num_inputs + 1, dtype=np.int64),
+                np.zeros((0, MAX_TURN_MOVES), dtype=np.int16))
+    done_branch = np.concatenate(done_branch)
+    done_boards = np.concatenate(done_boards)
+    done_moves = np.concatenate(done_moves)
+    done_length = np.concatenate(done_length)
+    done_input = branch_input[done_branch]
+
+    longest = np.zeros(num_inputs, dtype=np.int64)
+    np.maximum.at(longest, done_input, done_length)
+    keep = done_length == longest[done_input]
+    first_die = branch_dice[done_branch, 0]
+    single_die = keep & (done_length == 1) & ~doubles[done_input]
+    larger_playable = np.zeros(num_inputs, dtype=bool)
+    larger_playable[done_input[single_die & (first_die == high[done_input])]] = True
+    keep &= ~(single_die & (first_die != high[done_input]) & larger_playable[done_input])
+
+    kept = np.flatnonzero(keep)
+    kept = kept[np.argsort(done_input[kept], kind="stable")]
+    unique = kept[_first_unique_rows(np.concatenate([done_input[kept, None], done_boards[kept]], axis=1)
+                                     .astype(np.int32))]
+    unique = unique[np.argsort(done_input[unique], kind="stable")]
+
+    successor_input = done_input[unique]
+    successors = _mirror_rows(done_boards[unique], is_o[successor_input])
+    offsets = np.zeros(num_inputs + 1, dtype=np.int64)
+    np.cumsum(np.bincount(successor_input, minlength=num_inputs), out=offsets[1:])
+    return successors, offsets, done_moves[unique]
+
+
+def decode_row(move_codes):
+    """Turns one row of move codes back into the [(start, end), ...] sequence format."""
+    return [decode_move(int(code)) for code in move_codes if code != NO_MOVE_CODE]
+
+
+def row_turn_code(move_codes):
+    """Packs one row of move codes into a game_logic turn code."""
+    return encode_turn([int(code) for code in move_codes if code != NO_MOVE_CODE])
+
+
+def _conformance_corpus(num_games, seed):
+    rng = random.Random(seed)
+    samples = []
+    for _ in range(num_games):
+        game = BackgammonGame(rng=rng)
+        game.determine_first_player()
+        while game.winner is None:
+            if not game.dice:
+                game.roll_dice()
+            player = game.current_player
+            samples.append((game.position.copy(), tuple(game.dice), player))
+            legal = game.get_legal_turn_codes(player, unique_positions=True)
+            if legal:
+                game.apply_moves(player, rng.choice(legal))
+            else:
+                game.switch_player()
+    return samples
+
+
+def check_conformance(samples):
+    """Compares generate_successors with BackgammonGame on (Position, dice, player) samples; returns mismatches."""
+    game = BackgammonGame()
+    positions = positions_to_array([position for position, _, _ in samples])
+    dice = np.array([d for _, d, _ in samples])
+    players = np.array([p for _, _, p in samples])
+    successors, offsets, moves = generate_successors(positions, dice, players)
+
+    mismatches = []
+    for i, (position, roll, player) in enumerate(samples):
+        board, bar = position.to_board(), position.bar_dict()
+        legal_turn_codes = set(game.get_possible_moves(player, list(roll), board, bar))
+        expected = {tuple(game._apply_hypothetical_move_sequence(player, turn, position).cells[:BATCH_POSITION_WIDTH])
+                    for turn in game._possible_move_tuples(player, list(roll), position, unique_positions=True)}
+        rows = range(offsets[i], offsets[i + 1])
+        got = {tuple(int(v) for v in successors[row]) for row in rows}
+        bad_turns = [decode_row(moves[row]) for row in rows if row_turn_code(moves[row]) not in legal_turn_codes]
+        if got != expected or bad_turns:
+            mismatches.append((i, roll, player, len(expected), len(got), bad_turns[:1]))
+    return mismatches
+
+
+if __name__ == "__main__":
+    corpus = _conformance_corpus(num_games=20, seed=1)
+    start = time.perf_counter()
+    check_game = BackgammonGame()
+    for position, roll, player in corpus:
+        check_game.get_possible_moves(player, list(roll), position.to_board(), position.bar_dict(),
+                                      unique_positions=True)
+    scalar_time = time.perf_counter() - start
+    batch = positions_to_array([position for position, _, _ in corpus])
+    start = time.perf_counter()
+    out_successors, out_offsets, _ = generate_successors(batch, np.array([d for _, d, _ in corpus]),
+                                                         np.array([p for _, _, p in corpus]))
+    batch_time = time.perf_counter() - start
+    failures = check_conformance(corpus)
+    print(f"{len(corpus)} positions, {len(out_successors)} successors, {len(failures)} mismatches")
+    print(f"get_possible_moves: {scalar_time:.3f}s  generate_successors: {batch_time:.3f}s")
+    for failure in failures[:10]:
+        print("  mismatch:", failure)
@@ -0,0 +1,389 @@
+import argparse
+import json
+import logging
+import multiprocessing
+import queue
+import socket
+import threading
+import time
+from collections import deque
+
+from framing import LineFramer
+from game_logic import MoveCache
+from tournament import (DEFAULT_SHARD_SIZE, GameResult, TournamentStandings, load_strategy, make_pairings,
+                        make_shards, parse_strategy_specs, play_shard)
+
+DEFAULT_COORDINATOR_PORT = 65434
+MAX_MESSAGE_SIZE = 16 * 1024 * 1024
+DEFAULT_BATCH_SIZE = 4
+HEARTBEAT_INTERVAL = 2.0
+WORKER_TIMEOUT = 10.0
+
+logger = logging.getLogger(__name__)
+
+
+class LineConnection:
+    """Newline-delimited JSON messages over a socket, the same framing p2p.py uses; send() is thread-safe."""
+
+    def __init__(self, sock):
+        self.sock = sock
+        self._framer = LineFramer(MAX_MESSAGE_SIZE)
+        self._send_lock = threading.Lock()
+
+    def send(self, message_dict):
+        data = (json.dumps(message_dict) + "\n").encode("utf-8")
+        with self._send_lock:
+            self.sock.sendall(data)
+
+    def recv(self):
+        """Returns the next message, or None once the peer has closed the connection."""
+        while (line := self._framer.next_frame()) is None:
+            nbytes = self.sock.recv_into(self._framer.get_buffer())
+            if not nbytes:
+                return None
+            self._framer.buffer_updated(nbytes)
+        return json.loads(line)
+
+    def close(self):
+        try:
+            self.sock.close()
+        except OSError:
+            pass
+
+
+class Coordinator:
+    """Hands out (pairing, seed range) jobs to TCP workers and collects their compact per-game results.
+
+    Workers pull batches of jobs. Once the queue is empty, an idle worker steals half of the unstarted jobs of
+    the most loaded worker, and the victim is told to drop them. Jobs held by a worker whose connection closes
+    or goes silent for `worker_timeout` seconds are re-queued. Games are seeded, so a job finished twice gives
+    the same answer and only the first copy counts. If every worker that connected has gone and none joins within
+    `worker_timeout` seconds, iter_results raises RuntimeError rather than waiting for jobs nobody will play.
+    """
+
+    def __init__(self, strategy_specs, mode="round-robin", games_per_pairing=100, seed=0, host="127.0.0.1",
+                 port=DEFAULT_COORDINATOR_PORT, job_size=DEFAULT_SHARD_SIZE, worker_timeout=WORKER_TIMEOUT):
+        self.strategy_specs = dict(strategy_specs)
+        self.pairings = make_pairings(list(self.strategy_specs), mode)
+        self.seed = seed
+        self.worker_timeout = worker_timeout
+        self.jobs = make_shards(self.pairings, games_per_pairing, job_size)
+
+        self._cond = threading.Condition()
+        self._pending = deque(range(len(self.jobs)))
+        self._done = set()
+        self._owner = {}
+        self._assigned = {}
+        self._connections = {}
+        self._next_worker_id = 0
+        self._workers_gone_at = None
+        self._stopped = False
+        self._results = queue.Queue()
+
+        self._server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._server.bind((host, port))
+        self._server.listen()
+        self.address = self._server.getsockname()
+
+    def start(self):
+        threading.Thread(target=self._accept_loop, daemon=True).start()
+        return self
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+        self._server.close()
+
+    @property
+    def finished(self):
+        return len(self._done) == len(self.jobs)
+
+    def iter_results(self):
+        """Yields GameResult records in completion order until every job has reported."""
+        remaining = len(self.jobs)
+        while remaining:
+            try:
+                results = self._results.get(timeout=HEARTBEAT_INTERVAL)
+            except queue.Empty:
+                self._check_workers_left()
+                continue
+            remaining -= 1
+            yield from results
+
+    def run(self, on_result=None):
+        standings = TournamentStandings(self.pairings)
+        for result in self.iter_results():
+            standings.add(result)
+            if on_result is not None:
+                on_result(result)
+        return standings
+
+    def _check_workers_left(self):
+        with self._cond:
+            gone_at = self._workers_gone_at
+            if gone_at is not None and time.monotonic() - gone_at > self.worker_timeout:
+                unfinished = len(self.jobs) - len(self._done)
+                raise RuntimeError(f"No workers left; {unfinished} of {len(self.jobs)} jobs unfinished.")
+
+    def _accept_loop(self):
+        while True:
+            try:
+                sock, addr = self._server.accept()
+            except OSError:
+                return
+            with self._cond:
+                worker_id = self._next_worker_id
+                self._next_worker_id += 1
+            threading.Thread(target=self._serve_worker, args=(LineConnection(sock), worker_id, addr),
+                             daemon=True).start()
+
+    def _serve_worker(self, conn, worker_id, addr):
+        conn.sock.settimeout(self.worker_timeout)
+        with self._cond:
+            self._connections[worker_id] = conn
+            self._assigned[worker_id] = deque()
+            self._workers_gone_at = None
+        logger.info("Worker %s connected from %s", worker_id, addr)
+        try:
+            conn.send({"type": "welcome", "worker_id": worker_id, "strategies": self.strategy_specs,
+                       "pairings": self.pairings, "seed": self.seed})
+            while True:
+                message = conn.recv()
+                if message is None:
+                    break
+                msg_type = message.get("type")
+                if msg_type == "request_jobs":
+                    job_ids = self._take_jobs(worker_id, message.get("max_jobs", DEFAULT_BATCH_SIZE))
+                    if job_ids is None:
+                        conn.send({"type": "done"})
+                        break
+                    conn.send({"type": "jobs", "jobs": [[job_id, *self.jobs[job_id]] for job_id in job_ids]})
+                elif msg_type == "started":
+                    self._mark_started(worker_id, message["job_id"])
+                elif msg_type == "results":
+                    self._complete_job(worker_id, message["job_id"], message["games"])
+                elif msg_type != "heartbeat":
+                    logger.warning("Worker %s sent unknown message type: %s", worker_id, msg_type)
+        except (OSError, ValueError) as e:
+            logger.warning("Worker %s lost: %s", worker_id, e)
+        finally:
+            self._drop_worker(worker_id)
+            conn.close()
+
+    def _take_jobs(self, worker_id, max_jobs):
+        # Blocks until work is available; None means every job has finished (or the coordinator stopped).
+        with self._cond:
+            while True:
+                if self._stopped or self.finished:
+                    return None
+                if not self._pending:
+                    self._steal_for(worker_id)
+                if self._pending:
+                    job_ids = [self._pending.popleft() for _ in range(min(max_jobs, len(self._pending)))]
+                    for job_id in job_ids:
+                        self._owner[job_id] = worker_id
+                        self._assigned[worker_id].append(job_id)
+                    return job_ids
+                self._cond.wait()
+
+    def _steal_for(self, thief_id):
+        victim_id = max((w for w in self._assigned if w != thief_id), key=lambda w: len(self._assigned[w]),
+                        default=None)
+        if victim_id is None or len(self._assigned[victim_id]) < 2:
+            return
+        victim_queue = self._assigned[victim_id]
+        stolen = [victim_queue.pop() for _ in range(len(victim_queue) // 2)]
+        stolen.reverse()
+        self._pending.extend(stolen)
+        try:
+            self._connections[victim_id].send({"type": "revoke", "job_ids": stolen})
+        except OSError:
+            pass
+        logger.info("Worker %s stole %s jobs from worker %s", thief_id, len(stolen), victim_id)
+
+    def _mark_started(self, worker_id, job_id):
+        with self._cond:
+            if self._owner.get(job_id) == worker_id:
+                try:
+                    self._assigned[worker_id].remove(job_id)
+                except ValueError:
+                    pass
+
+    def _complete_job(self, worker_id, job_id, games):
+        with self._cond:
+            if job_id in self._done:
+                return
+            self._done.add(job_id)
+            for holder in {worker_id, self._owner.pop(job_id, None)}:
+                assigned = self._assigned.get(holder)
+                if assigned is not None and job_id in assigned:
+                    assigned.remove(job_id)
+            if job_id in self._pending:
+                self._pending.remove(job_id)
+            if self.finished:
+                self._cond.notify_all()
+        self._results.put(self._expand_results(job_id, games))
+
+    def _expand_results(self, job_id, games):
+        pairing_idx = self.jobs[job_id][0]
+        name_a, name_b = self.pairings[pairing_idx]
+        results = []
+        for game_index, a_is_x, x_won, turns, moves in games:
+            player_x, player_o = (name_a, name_b) if a_is_x else (name_b, name_a)
+            results.append(GameResult(pairing_idx, game_index, None, player_x, player_o,
+                                      player_x if x_won else player_o, turns, moves))
+        return results
+
+    def _drop_worker(self, worker_id):
+        with self._cond:
+            self._connections.pop(worker_id, None)
+            self._assigned.pop(worker_id, None)
+            if not self._connections:
+                self._workers_gone_at = time.monotonic()
+            orphaned = [job_id for job_id, owner in self._owner.items() if owner == worker_id]
+            for job_id in orphaned:
+                del self._owner[job_id]
+                if job_id not in self._done and job_id not in self._pending:
+                    self._pending.appendleft(job_id)
+            if orphaned:
+                logger.info("Re-queued %s jobs from worker %s", len(orphaned), worker_id)
+            self._cond.notify_all()
+
+
+def run_worker(host="127.0.0.1", port=DEFAULT_COORDINATOR_PORT, batch_size=DEFAULT_BATCH_SIZE,
+               heartbeat_interval=HEARTBEAT_INTERVAL):
+    """Connects to a coordinator and plays the jobs it hands out until it says everything is done."""
+    conn = LineConnection(socket.create_connection((host, port)))
+    welcome = conn.recv()
+    pairings = [tuple(pairing) for pairing in welcome["pairings"]]
+    seed = welcome["seed"]
+    strategies = {name: load_strategy(spec) for name, spec in welcome["strategies"].items()}
+    # One size-bounded cache for the worker's lifetime rather than a fresh one per job.
+    move_cache = MoveCache()
+
+    cond = threading.Condition()
+    local_jobs = deque()
+    state = {"done": False, "awaiting": False}
+    stop_heartbeat = threading.Event()
+
+    def reader():
+        try:
+            while True:
+                message = conn.recv()
+                if message is None:
+                    break
+                with cond:
+                    if message["type"] == "jobs":
+                        local_jobs.extend(message["jobs"])
+                        state["awaiting"] = False
+                    elif message["type"] == "revoke":
+                        revoked = set(message["job_ids"])
+                        for job in [job for job in local_jobs if job[0] in revoked]:
+                            local_jobs.remove(job)
+                    elif message["type"] == "done":
+                        break
+                    cond.notify_all()
+        except (OSError, ValueError):
+            pass
+        with cond:
+            state["done"] = True
+            cond.notify_all()
+
+    def heartbeat():
+        while not stop_heartbeat.wait(heartbeat_interval):
+            try:
+                conn.send({"type": "heartbeat"})
+            except OSError:
+                return
+
+    threading.Thread(target=reader, daemon=True).start()
+    threading.Thread(target=heartbeat, daemon=True).start()
+    games_played = 0
+    try:
+        while True:
+            with cond:
+                if not local_jobs and not state["done"] and not state["awaiting"]:
+                    state["awaiting"] = True
+                    conn.send({"type": "request_jobs", "max_jobs": batch_size})
+                while not local_jobs and not state["done"]:
+                    cond.wait()
+                if not local_jobs:
+                    break
+                job_id, pairing_idx, first_game, num_games = local_jobs.popleft()
+            conn.send({"type": "started", "job_id": job_id})
+            name_a = pairings[pairing_idx][0]
+            results = play_shard(strategies, pairings, seed, (pairing_idx, first_game, num_games), move_cache)
+            games = [[r.game_index, int(r.player_x == name_a), int(r.winner == r.player_x), r.turns, r.moves]
+                     for r in results]
+            conn.send({"type": "results", "job_id": job_id, "games": games})
+            games_played += num_games
+    except OSError as e:
+        logger.warning("Lost coordinator connection: %s", e)
+    finally:
+        stop_heartbeat.set()
+        conn.close()
+    cache_stats = move_cache.stats()
+    logger.info("Worker played %s games; move cache hit rate %.3f over %s lookups", games_played,
+                cache_stats["hit_rate"], cache_stats["hits"] + cache_stats["misses"])
+    return games_played
+
+
+def run_local(strategy_specs, mode="round-robin", games_per_pairing=100, seed=0, num_workers=2,
+              job_size=DEFAULT_SHARD_SIZE, batch_size=DEFAULT_BATCH_SIZE):
+    """Runs a coordinator on an ephemeral localhost port with `num_workers` worker processes."""
+    coordinator = Coordinator(strategy_specs, mode, games_per_pairing, seed, port=0, job_size=job_size).start()
+    host, port = coordinator.address
+    workers = [multiprocessing.Process(target=run_worker, args=(host, port, batch_size), daemon=True)
+               for _ in range(num_workers)]
+    for worker in workers:
+        worker.start()
+    try:
+        return coordinator.run()
+    finally:
+        coordinator.stop()
+        for worker in workers:
+            worker.join(timeout=WORKER_TIMEOUT)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Distributed self-play: one coordinator, many TCP workers.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    for name in ("coordinator", "local"):
+        p = sub.add_parser(name)
+        p.add_argument("strategies", nargs="+", help="[name=]module[:function], e.g. ai_player:choose_move")
+        p.add_argument("--mode", choices=("round-robin", "head-to-head"), default="round-robin")
+        p.add_argument("--games", type=int, default=100, help="games per pairing")
+        p.add_argument("--seed", type=int, default=0)
+        p.add_argument("--job-size", type=int, default=DEFAULT_SHARD_SIZE)
+    sub.choices["coordinator"].add_argument("--host", default="0.0.0.0")
+    sub.choices["coordinator"].add_argument("--port", type=int, default=DEFAULT_COORDINATOR_PORT)
+    sub.choices["local"].add_argument("--workers", type=int, default=2)
+    worker_parser = sub.add_parser("worker")
+    worker_parser.add_argument("--host", default="127.0.0.1")
+    worker_parser.add_argument("--port", type=int, default=DEFAULT_COORDINATOR_PORT)
+    for p in (sub.choices["local"], worker_parser):
+        p.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    logging.getLogger("game_logic").setLevel(logging.WARNING)
+
+    start = time.perf_counter()
+    if args.command == "worker":
+        played = run_worker(args.host, args.port, args.batch_size)
+        print(f"Worker played {played} games in {time.perf_counter() - start:.2f}s")
+    else:
+        specs = parse_strategy_specs(args.strategies)
+        if args.command == "local":
+            final = run_local(specs, args.mode, args.games, args.seed, args.workers, args.job_size, args.batch_size)
+        else:
+            coordinator = Coordinator(specs, args.mode, args.games, args.seed, args.host, args.port,
+                                      args.job_size).start()
+            print(f"Coordinator listening on {coordinator.address[0]}:{coordinator.address[1]}")
+            final = coordinator.run()
+            coordinator.stop()
+        elapsed = time.perf_counter() - start
+        total_games = sum(sum(wins.values()) for wins in final.pairing_wins)
+        print(final.summary())
+        print(f"{total_games} games in {elapsed:.2f}s ({total_games / elapsed:.1f} games/s)")
@@ -0,0 +1,71 @@
+from array import array
+
+import numpy as np
+
+from game_logic import BAR_PIP_DISTANCE, BAR_INDEX, NUM_POINTS, PLAYER_O, PLAYER_X, Position
+
+CANDIDATE_WIDTH = NUM_POINTS + 2
+# A pure pip-race evaluator hits whenever it can and games ping-pong for thousands of turns.
+BLOT_PENALTY_PIPS = 8
+
+# Pip distance of each point for X and O; the bar columns are worth BAR_PIP_DISTANCE to their owner.
+_POINT_PIPS = np.array([np.arange(1, NUM_POINTS + 1), np.arange(NUM_POINTS, 0, -1)], dtype=np.int32)
+
+
+def candidate_positions(game_state, player_id, possible_moves):
+    """Resulting position of every candidate turn, as one contiguous (M, 26) int16 array.
+
+    Rows use the batch layout of batch_movegen: 24 signed points (X positive), bar X, bar O.
+    """
+    position = Position.from_board(game_state["board"], game_state["bar"], game_state.get("borne_off"))
+    rows = array('h')
+    for sequence in possible_moves:
+        hits = [position.apply_move(player_id, start, end) for start, end in sequence]
+        rows.extend(position.cells[:CANDIDATE_WIDTH])
+        for (start, end), hit in zip(reversed(sequence), reversed(hits)):
+            position.undo_move(player_id, start, end, hit)
+    return np.frombuffer(rows, dtype=np.int16).reshape(len(possible_moves), CANDIDATE_WIDTH)
+
+
+def choose_move_by_evaluator(evaluate, game_state, player_id, possible_moves):
+    """Scores all candidates with one evaluate(candidates, player_id) call and returns the best-scoring turn."""
+    if not possible_moves:
+        return []
+    if len(possible_moves) == 1:
+        return possible_moves[0]
+    candidates = candidate_positions(game_state, player_id, possible_moves)
+    scores = np.asarray(evaluate(candidates, player_id))
+    if scores.shape != (len(possible_moves),):
+        raise ValueError(f"Evaluator returned scores of shape {scores.shape} for {len(possible_moves)} candidates.")
+    return possible_moves[int(np.argmax(scores))]
+
+
+def evaluator_strategy(evaluate):
+    """Wraps a batch evaluator as a choose_move(game_state, player_id, possible_moves) strategy."""
+    def choose_move(game_state, player_id, possible_moves):
+        return choose_move_by_evaluator(evaluate, game_state, player_id, possible_moves)
+    choose_move.evaluate = evaluate
+    return choose_move
+
+
+def pip_counts(candidates):
+    """(M, 2) pip counts of X and O for each candidate row."""
+    points = candidates[:, :NUM_POINTS].astype(np.int32)
+    x_pips = np.maximum(points, 0) @ _POINT_PIPS[PLAYER_X] + candidates[:, BAR_INDEX + PLAYER_X] * BAR_PIP_DISTANCE
+    o_pips = np.maximum(-points, 0) @ _POINT_PIPS[PLAYER_O] + candidates[:, BAR_INDEX + PLAYER_O] * BAR_PIP_DISTANCE
+    return np.stack([x_pips, o_pips], axis=1)
+
+
+def blot_counts(candidates):
+    """(M, 2) number of single exposed checkers of X and O on each candidate row."""
+    points = candidates[:, :NUM_POINTS]
+    return np.stack([(points == 1).sum(axis=1), (points == -1).sum(axis=1)], axis=1)
+
+
+def pip_blot_evaluate(candidates, player_id):
+    """Pip lead after the move, less BLOT_PENALTY_PIPS for each blot we leave behind."""
+    pips = pip_counts(candidates)
+    return pips[:, 1 - player_id] - pips[:, player_id] - BLOT_PENALTY_PIPS * blot_counts(candidates)[:, player_id]
+
+
+pip_blot_choose_move = evaluator_strategy(pip_blot_evaluate)
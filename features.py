@@ -0,0 +1,86 @@
+import numpy as np
+
+from game_logic import (BAR_INDEX, MAX_CHECKERS_PER_PLAYER, NUM_POINTS, OFF_INDEX, PLAYER_O, PLAYER_X,
+                        POSITION_SIZE, Position)
+from evaluator import blot_counts, pip_counts
+
+UNITS_PER_POINT = 4
+POINT_FEATURES = 2 * NUM_POINTS * UNITS_PER_POINT
+BASE_FEATURES = POINT_FEATURES + 2 + 2 + 2
+PIP_FEATURES = 2
+STRUCTURE_FEATURES = 4
+PIP_SCALE = 167.0
+MAX_PRIME = 6.0
+
+_POINT_INDEX = np.arange(NUM_POINTS)
+
+
+def feature_width(include_pips=False, include_structure=False):
+    return BASE_FEATURES + PIP_FEATURES * include_pips + STRUCTURE_FEATURES * include_structure
+
+
+def states_to_array(game_states):
+    """Packs get_state() dicts into an (N, 28) int16 array of Position cells plus an (N,) side-to-move array."""
+    cells = np.empty((len(game_states), POSITION_SIZE), dtype=np.int16)
+    players = np.empty(len(game_states), dtype=np.int8)
+    for row, state in enumerate(game_states):
+        position = Position.from_board(state["board"], state["bar"], state.get("borne_off"))
+        cells[row] = np.frombuffer(position.cells, dtype=np.int16, count=POSITION_SIZE)
+        players[row] = state["current_player"]
+    return cells, players
+
+
+def _longest_prime(made_points):
+    # Longest run of consecutive True per row: distance from each point back to the last point that is not made.
+    last_gap = np.maximum.accumulate(np.where(made_points, -1, _POINT_INDEX), axis=1)
+    return (_POINT_INDEX - last_gap).max(axis=1)
+
+
+def encode_positions(positions, players, include_pips=False, include_structure=False):
+    """TD-Gammon-style float32 features for a batch of positions.
+
+    `positions` is the compact array form: (N, 26) rows of 24 signed points and bar X/O, as used by
+    batch_movegen and evaluator, or full (N, 28) Position cells that also carry borne-off counts. `players` is
+    the side to move, scalar or (N,). Per point and side there are four units (at least 1, 2 and 3 checkers,
+    then (count - 3) / 2), followed by bar / 2 and off / 15 for X and O and a one-hot side to move. Optional
+    extras: pip counts / 167, and blots / 15 plus longest prime / 6 for each side.
+    """
+    positions = np.asarray(positions)
+    positions = positions.reshape(-1, positions.shape[-1])
+    num_rows = len(positions)
+    players = np.broadcast_to(np.asarray(players), (num_rows,))
+    points = positions[:, :NUM_POINTS].astype(np.int16)
+    bars = positions[:, BAR_INDEX:BAR_INDEX + 2].astype(np.float32)
+    checkers = np.stack([np.maximum(points, 0), np.maximum(-points, 0)], axis=1)
+    if positions.shape[1] >= POSITION_SIZE:
+        off = positions[:, OFF_INDEX:OFF_INDEX + 2].astype(np.float32)
+    else:
+        off = MAX_CHECKERS_PER_PLAYER - checkers.sum(axis=2) - bars
+
+    features = np.empty((num_rows, feature_width(include_pips, include_structure)), dtype=np.float32)
+    units = features[:, :POINT_FEATURES].reshape(num_rows, 2, NUM_POINTS, UNITS_PER_POINT)
+    units[..., 0] = checkers >= 1
+    units[..., 1] = checkers >= 2
+    units[..., 2] = checkers >= 3
+    units[..., 3] = np.maximum(checkers - 3, 0) * 0.5
+    column = POINT_FEATURES
+    features[:, column:column + 2] = bars * 0.5
+    features[:, column + 2:column + 4] = off * (1.0 / MAX_CHECKERS_PER_PLAYER)
+    features[:, column + 4] = players == PLAYER_X
+    features[:, column + 5] = players == PLAYER_O
+    column = BASE_FEATURES
+
+    if include_pips:
+        features[:, column:column + 2] = pip_counts(positions) * (1.0 / PIP_SCALE)
+        column += PIP_FEATURES
+    if include_structure:
+        features[:, column:column + 2] = blot_counts(positions) * (1.0 / MAX_CHECKERS_PER_PLAYER)
+        features[:, column + 2] = _longest_prime(checkers[:, PLAYER_X] >= 2) * (1.0 / MAX_PRIME)
+        features[:, column + 3] = _longest_prime(checkers[:, PLAYER_O] >= 2) * (1.0 / MAX_PRIME)
+    return features
+
+
+def encode_states(game_states, include_pips=False, include_structure=False):
+    """encode_positions for a list of get_state() dicts, using each state's current_player as side to move."""
+    cells, players = states_to_array(game_states)
+    return encode_positions(cells, players, include_pips, include_structure)
@@ -0,0 +1,122 @@
+import struct
+
+DEFAULT_MAX_FRAME_SIZE = 64 * 1024
+READ_SIZE = 4096
+SHRINK_FACTOR = 4
+FRAME_LENGTH = struct.Struct("<H")
+
+
+class FrameTooLarge(ValueError):
+    pass
+
+
+class _FrameBuffer:
+    """Receive buffer shared by the framers: one reusable bytearray with a read cursor.
+
+    Bytes land in it either through feed() or zero-copy through get_buffer()/buffer_updated(), which match
+    asyncio.BufferedProtocol and socket.recv_into. The unread tail, at most one partial frame, is moved to the
+    front only when room is needed for the next read, so a burst of many frames costs linear time. A frame
+    longer than `max_frame_size` raises FrameTooLarge instead of growing the buffer without bound.
+    """
+
+    def __init__(self, max_frame_size=DEFAULT_MAX_FRAME_SIZE, read_size=READ_SIZE):
+        self.max_frame_size = max_frame_size
+        self.read_size = read_size
+        self._initial_capacity = 2 * read_size
+        self._buffer = bytearray(self._initial_capacity)
+        self._start = 0
+        self._end = 0
+        self._scan = 0
+
+    @classmethod
+    def from_framer(cls, other, max_frame_size=None):
+        """Takes over another framer's buffer, e.g. to change framing mid-stream after a negotiation frame."""
+        framer = cls(other.max_frame_size if max_frame_size is None else max_frame_size, other.read_size)
+        framer._buffer, framer._start, framer._end = other._buffer, other._start, other._end
+        framer._scan = other._start
+        return framer
+
+    @property
+    def buffered_bytes(self):
+        """Bytes received but not yet returned as frames."""
+        return self._end - self._start
+
+    @property
+    def capacity(self):
+        return len(self._buffer)
+
+    def get_buffer(self, sizehint=-1):
+        """A writable memoryview over free space of at least `read_size` bytes (or `sizehint`, if larger)."""
+        wanted = max(sizehint, self.read_size)
+        unread = self._end - self._start
+        if unread > self.max_frame_size:
+            raise FrameTooLarge(f"Partial frame of {unread} bytes exceeds {self.max_frame_size}.")
+        if len(self._buffer) - self._end < wanted:
+            if not unread and len(self._buffer) > SHRINK_FACTOR * self._initial_capacity:
+                self._buffer = bytearray(self._initial_capacity)
+            elif unread + wanted > len(self._buffer):
+                # A fresh buffer rather than a resize, which would fail while a caller still holds a view.
+                grown = bytearray(max(2 * len(self._buffer), unread + wanted))
+                grown[:unread] = self._buffer[self._start:self._end]
+                self._buffer = grown
+            else:
+                self._buffer[:unread] = self._buffer[self._start:self._end]
+            self._scan -= self._start
+            self._start, self._end = 0, unread
+        return memoryview(self._buffer)[self._end:]
+
+    def buffer_updated(self, nbytes):
+        self._end += nbytes
+
+    def feed(self, data):
+        self.get_buffer(len(data))[:len(data)] = data
+        self._end += len(data)
+
+    def _consume(self, frame_end):
+        self._start = self._scan = frame_end
+        if self._start == self._end:
+            self._start = self._end = self._scan = 0
+
+    def frames(self):
+        while (frame := self.next_frame()) is not None:
+            yield frame
+
+
+class LineFramer(_FrameBuffer):
+    """Newline-delimited frames, each decoded once as UTF-8 straight from a memoryview of the buffer."""
+
+    def next_frame(self):
+        """The next complete frame decoded as UTF-8 without its newline, or None until more bytes arrive.
+
+        A frame that is not valid UTF-8 is consumed before UnicodeDecodeError is raised, so the next call moves on.
+        """
+        newline = self._buffer.find(b"\n", self._scan, self._end)
+        if newline < 0:
+            self._scan = self._end
+            if self._end - self._start > self.max_frame_size:
+                raise FrameTooLarge(f"Partial frame of {self._end - self._start} bytes exceeds "
+                                    f"{self.max_frame_size}.")
+            return None
+        if newline - self._start > self.max_frame_size:
+            raise FrameTooLarge(f"Frame of {newline - self._start} bytes exceeds {self.max_frame_size}.")
+        with memoryview(self._buffer) as view, view[self._start:newline] as frame:
+            self._consume(newline + 1)
+            return str(frame, "utf-8")
+
+
+class LengthPrefixedFramer(_FrameBuffer):
+    """Frames of a little-endian u16 byte count followed by that many bytes, each returned as a bytearray copy."""
+
+    def next_frame(self):
+        start, buffer = self._start, self._buffer
+        if self._end - start < FRAME_LENGTH.size:
+            return None
+        frame_start = start + FRAME_LENGTH.size
+        frame_end = frame_start + (buffer[start] | buffer[start + 1] << 8)
+        if frame_end - frame_start > self.max_frame_size:
+            raise FrameTooLarge(f"Frame of {frame_end - frame_start} bytes exceeds {self.max_frame_size}.")
+        if frame_end > self._end:
+            return None
+        frame = buffer[frame_start:frame_end]
+        self._consume(frame_end)
+        return frame
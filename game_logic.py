@@ -1,18 +1,560 @@
 import random
 import json
-import copy
+import logging
+import sys
+import threading
+from array import array
+from collections import OrderedDict
 
 NUM_POINTS = 24
 MAX_CHECKERS_PER_PLAYER = 15
 PLAYER_X = 0
 PLAYER_O = 1
 
+BAR_INDEX = NUM_POINTS
+OFF_INDEX = NUM_POINTS + 2
+POSITION_SIZE = NUM_POINTS + 4
+PIP_COUNT_INDEX = POSITION_SIZE
+OUTSIDE_HOME_INDEX = POSITION_SIZE + 2
+FURTHEST_POINT_INDEX = POSITION_SIZE + 4
+POSITION_ARRAY_SIZE = POSITION_SIZE + 6
+BAR_PIP_DISTANCE = NUM_POINTS + 1
+NO_FURTHEST_POINT = (-1, NUM_POINTS)
+DEFAULT_MOVE_CACHE_SIZE = 10000
+TURN_CONTEXT_CACHE_MODE = "turn_context"
+
+logger = logging.getLogger(__name__)
+
+NO_BEAR_OFF = 0
+EXACT_BEAR_OFF = 1
+OVERSHOOT_BEAR_OFF = 2
+
+# Integer move codes: start cell (0-23, or MOVE_CODE_BAR) above MOVE_CODE_SHIFT bits, end cell (0-23, or
+# MOVE_CODE_OFF) below them. NO_MOVE_CODE pads fixed-width turns of fewer than four moves.
+MOVE_CODE_BAR = BAR_INDEX
+MOVE_CODE_OFF = NUM_POINTS + 1
+MOVE_CODE_SHIFT = 5
+MOVE_CODE_END_MASK = (1 << MOVE_CODE_SHIFT) - 1
+NO_MOVE_CODE = -1
+
+# Turn codes pack up to MAX_TURN_MOVES move codes into one int, first move in the lowest MOVE_CODE_BITS bits.
+# No move has code 0 (it would start and end on point 0), so the move count is implicit and a pass is 0.
+MOVE_CODE_BITS = 2 * MOVE_CODE_SHIFT
+MOVE_CODE_MASK = (1 << MOVE_CODE_BITS) - 1
+MAX_TURN_MOVES = 4
+PASS_TURN_CODE = 0
+
+
+def _move_cell(value, special, special_cell):
+    if value == special:
+        return special_cell
+    if isinstance(value, bool):
+        raise TypeError(f"{value!r} is not a point.")
+    cell = int(value)
+    if not 0 <= cell < NUM_POINTS:
+        raise ValueError(f"{value!r} is not a point or {special!r}.")
+    return cell
+
+
+def encode_move(start, end):
+    """Raises ValueError or TypeError unless start is a point or 'BAR' and end a point or 'OFF'."""
+    return (_move_cell(start, 'BAR', MOVE_CODE_BAR) << MOVE_CODE_SHIFT) | _move_cell(end, 'OFF', MOVE_CODE_OFF)
+
+
+def decode_move(code):
+    start_cell, end_cell = code >> MOVE_CODE_SHIFT, code & MOVE_CODE_END_MASK
+    return ('BAR' if start_cell == MOVE_CODE_BAR else start_cell, 'OFF' if end_cell == MOVE_CODE_OFF else end_cell)
+
+
+def encode_turn(moves):
+    """Packs a turn given as (start, end) pairs or move codes into a turn code; an int is checked and returned.
+
+    Raises ValueError or TypeError for anything that is not a turn of valid moves, including bools.
+    """
+    if isinstance(moves, bool):
+        raise TypeError(f"{moves!r} is not a turn code.")
+    if isinstance(moves, int):
+        if not 0 <= moves < 1 << (MOVE_CODE_BITS * MAX_TURN_MOVES) or \
+                any(code not in VALID_MOVE_CODES for code in turn_move_codes(moves)):
+            raise ValueError(f"{moves!r} is not a turn code.")
+        return moves
+    turn_code = 0
+    shift = 0
+    for move in moves:
+        if isinstance(move, bool):
+            raise TypeError(f"{move!r} is not a move.")
+        code = move if isinstance(move, int) else encode_move(*move)
+        if code not in VALID_MOVE_CODES or shift == MOVE_CODE_BITS * MAX_TURN_MOVES:
+            raise ValueError(f"{moves!r} is not a turn of at most {MAX_TURN_MOVES} moves.")
+        turn_code |= code << shift
+        shift += MOVE_CODE_BITS
+    return turn_code
+
+
+def turn_move_codes(turn_code):
+    codes = []
+    while turn_code:
+        codes.append(turn_code & MOVE_CODE_MASK)
+        turn_code >>= MOVE_CODE_BITS
+    return codes
+
+
+# A move never ends where it started, which also keeps code 0 free for the empty slots above a turn's last move.
+VALID_MOVE_CODES = frozenset(encode_move(start, end) for start in (*range(NUM_POINTS), 'BAR')
+                             for end in (*range(NUM_POINTS), 'OFF') if start != end)
+
+
+def decode_turn(turn_code):
+    """The [(start, end), ...] form of a turn code, as choose_move strategies receive and return turns."""
+    return [decode_move(code) for code in turn_move_codes(turn_code)]
+
+
+def choose_turn_code(choose_move, game_state, player, turn_codes):
+    """Runs a choose_move strategy, which works on [(start, end), ...] turns, over turn codes.
+
+    Returns the chosen turn as a turn code, PASS_TURN_CODE if the strategy returned no moves.
+    """
+    chosen = choose_move(game_state, player, [decode_turn(turn_code) for turn_code in turn_codes])
+    return encode_turn(chosen) if chosen else PASS_TURN_CODE
+
+
+def _build_move_tables():
+    # Every table is indexed [player][point][die] or [player][point] / [player][die]; die index 0 is unused.
+    home_ranges = (range(0, 6), range(NUM_POINTS - 6, NUM_POINTS))
+    move_target, bar_entry, in_home, bear_off_pips, bear_off_kind, pip_distance = [], [], [], [], [], []
+    for player in (PLAYER_X, PLAYER_O):
+        direction = -1 if player == PLAYER_X else 1
+        home = home_ranges[player]
+        targets, pips, kinds = [], [], []
+        for point in range(NUM_POINTS):
+            dests = [-1] * 7
+            point_kinds = [NO_BEAR_OFF] * 7
+            required = 0
+            if point in home:
+                required = point + 1 if player == PLAYER_X else NUM_POINTS - point
+            for die in range(1, 7):
+                dest = point + direction * die
+                dests[die] = dest if 0 <= dest < NUM_POINTS else -1
+                if required:
+                    point_kinds[die] = EXACT_BEAR_OFF if die == required else (
+                        OVERSHOOT_BEAR_OFF if die > required else NO_BEAR_OFF)
+            targets.append(tuple(dests))
+            pips.append(required)
+            kinds.append(tuple(point_kinds))
+        move_target.append(tuple(targets))
+        bar_entry.append(tuple([-1] + [NUM_POINTS - die if player == PLAYER_X else die - 1 for die in range(1, 7)]))
+        in_home.append(tuple(point in home for point in range(NUM_POINTS)))
+        bear_off_pips.append(tuple(pips))
+        bear_off_kind.append(tuple(kinds))
+        pip_distance.append(tuple(point + 1 if player == PLAYER_X else NUM_POINTS - point
+                                  for point in range(NUM_POINTS)))
+    return (home_ranges, tuple(move_target), tuple(bar_entry), tuple(in_home), tuple(bear_off_pips),
+            tuple(bear_off_kind), tuple(pip_distance))
+
+
+(HOME_BOARD_RANGES, MOVE_TARGET, BAR_ENTRY_POINT, IN_HOME_BOARD, BEAR_OFF_PIPS, BEAR_OFF_KIND,
+ PIP_DISTANCE) = _build_move_tables()
+
+_zobrist_rng = random.Random(0x5EED)
+# One 64-bit key per (cell, signed count), looked up as ZOBRIST_CELL_KEYS[cell][count]: negative counts use
+# Python's negative indexing into the 31-entry row. Empty cells map to 0 so they drop out of the XOR.
+ZOBRIST_CELL_KEYS = tuple(
+    tuple(0 if value == 0 else _zobrist_rng.getrandbits(64)
+          for value in list(range(MAX_CHECKERS_PER_PLAYER + 1)) + list(range(-MAX_CHECKERS_PER_PLAYER, 0)))
+    for _cell in range(POSITION_SIZE))
+ZOBRIST_SIDE_KEYS = (_zobrist_rng.getrandbits(64), _zobrist_rng.getrandbits(64))
+del _zobrist_rng
+
+
+class Position:
+    """Compact board: 24 signed point counts (X positive, O negative), then bar X/O and off X/O.
+
+    The same array also carries per-player aggregates after the 28 board cells: pip count, checkers
+    not yet in the home board (bar included) and the furthest occupied point (-1 / 24 when none).
+    `hash` is a 64-bit Zobrist key of the board cells. apply_move/undo_move keep all of it up to date.
+    """
+
+    __slots__ = ("cells", "hash")
+
+    def __init__(self, cells=None):
+        self.cells = array('h', [0]) * POSITION_ARRAY_SIZE
+        if cells is not None:
+            self.cells[:POSITION_SIZE] = array('h', cells[:POSITION_SIZE])
+        self.rehash()
+
+    @classmethod
+    def from_board(cls, board, bar, borne_off=None):
+        position = cls()
+        cells = position.cells
+        for i, (owner, count) in enumerate(board):
+            if owner is not None and count:
+                cells[i] = count if owner == PLAYER_X else -count
+        for player, count in bar.items():
+            cells[BAR_INDEX + int(player)] = count
+        if borne_off:
+            for player, count in borne_off.items():
+                cells[OFF_INDEX + int(player)] = count
+        position.rehash()
+        return position
+
+    def rehash(self):
+        """Recomputes the hash and aggregates from the board cells."""
+        cells = self.cells
+        h = 0
+        for cell_idx in range(POSITION_SIZE):
+            h ^= ZOBRIST_CELL_KEYS[cell_idx][cells[cell_idx]]
+        self.hash = h
+
+        for player in (PLAYER_X, PLAYER_O):
+            sign = 1 if player == PLAYER_X else -1
+            bar_count = cells[BAR_INDEX + player]
+            pip_count = bar_count * BAR_PIP_DISTANCE
+            outside_home = bar_count
+            for point_idx in range(NUM_POINTS):
+                count = cells[point_idx] * sign
+                if count > 0:
+                    pip_count += count * PIP_DISTANCE[player][point_idx]
+                    if not IN_HOME_BOARD[player][point_idx]:
+                        outside_home += count
+            cells[PIP_COUNT_INDEX + player] = pip_count
+            cells[OUTSIDE_HOME_INDEX + player] = outside_home
+            cells[FURTHEST_POINT_INDEX + player] = self._scan_furthest(
+                player, NUM_POINTS - 1 if player == PLAYER_X else 0)
+        return h
+
+    def _scan_furthest(self, player, from_idx):
+        cells = self.cells
+        if player == PLAYER_X:
+            for point_idx in range(from_idx, -1, -1):
+                if cells[point_idx] > 0:
+                    return point_idx
+        else:
+            for point_idx in range(from_idx, NUM_POINTS):
+                if cells[point_idx] < 0:
+                    return point_idx
+        return NO_FURTHEST_POINT[player]
+
+    def copy(self):
+        position = Position.__new__(Position)
+        position.cells = self.cells[:]
+        position.hash = self.hash
+        return position
+
+    def __eq__(self, other):
+        return isinstance(other, Position) and self.cells == other.cells
+
+    def __repr__(self):
+        return f"Position({self.cells[:POSITION_SIZE].tolist()})"
+
+    def key(self):
+        return self.hash
+
+    def point(self, point_idx):
+        c = self.cells[point_idx]
+        if c > 0:
+            return [PLAYER_X, c]
+        if c < 0:
+            return [PLAYER_O, -c]
+        return [None, 0]
+
+    def count(self, player, point_idx):
+        c = self.cells[point_idx]
+        return c if player == PLAYER_X else -c
+
+    def bar_count(self, player):
+        return self.cells[BAR_INDEX + player]
+
+    def off_count(self, player):
+        return self.cells[OFF_INDEX + player]
+
+    def pip_count(self, player):
+        return self.cells[PIP_COUNT_INDEX + player]
+
+    def checkers_outside_home(self, player):
+        return self.cells[OUTSIDE_HOME_INDEX + player]
+
+    def furthest_point(self, player):
+        return self.cells[FURTHEST_POINT_INDEX + player]
+
+    def to_board(self):
+        return [self.point(i) for i in range(NUM_POINTS)]
+
+    def bar_dict(self):
+        return {PLAYER_X: self.cells[BAR_INDEX + PLAYER_X], PLAYER_O: self.cells[BAR_INDEX + PLAYER_O]}
+
+    def borne_off_dict(self):
+        return {PLAYER_X: self.cells[OFF_INDEX + PLAYER_X], PLAYER_O: self.cells[OFF_INDEX + PLAYER_O]}
+
+    def apply_move(self, player, start, end):
+        """Moves one checker of `player`; returns True if an opponent blot was hit."""
+        cells = self.cells
+        keys = ZOBRIST_CELL_KEYS
+        h = self.hash
+        sign = 1 if player == PLAYER_X else -1
+        pip_distance = PIP_DISTANCE[player]
+        in_home = IN_HOME_BOARD[player]
+        hit = False
+
+        if start == 'BAR':
+            from_idx = BAR_INDEX + player
+            old = cells[from_idx]
+            new = old - 1
+            pip_delta = -BAR_PIP_DISTANCE
+            outside_delta = -1
+        else:
+            from_idx = start
+            old = cells[from_idx]
+            new = old - sign
+            pip_delta = -pip_distance[start]
+            outside_delta = 0 if in_home[start] else -1
+        cells[from_idx] = new
+        h ^= keys[from_idx][old] ^ keys[from_idx][new]
+
+        if end == 'OFF':
+            to_idx = OFF_INDEX + player
+            old = cells[to_idx]
+            new = old + 1
+        else:
+            to_idx = end
+            old = cells[to_idx]
+            pip_delta += pip_distance[end]
+            if not in_home[end]:
+                outside_delta += 1
+            if old == -sign:
+                hit = True
+                new = sign
+                h ^= self._send_to_bar(1 - player, end)
+            else:
+                new = old + sign
+        cells[to_idx] = new
+        h ^= keys[to_idx][old] ^ keys[to_idx][new]
+
+        cells[PIP_COUNT_INDEX + player] += pip_delta
+        cells[OUTSIDE_HOME_INDEX + player] += outside_delta
+        furthest_idx = FURTHEST_POINT_INDEX + player
+        furthest = cells[furthest_idx]
+        if start == furthest and cells[start] == 0:
+            cells[furthest_idx] = self._scan_furthest(player, start)
+        elif end != 'OFF' and (end > furthest if player == PLAYER_X else end < furthest):
+            cells[furthest_idx] = end
+
+        self.hash = h
+        return hit
+
+    def undo_move(self, player, start, end, hit):
+        cells = self.cells
+        keys = ZOBRIST_CELL_KEYS
+        h = self.hash
+        sign = 1 if player == PLAYER_X else -1
+        pip_distance = PIP_DISTANCE[player]
+        in_home = IN_HOME_BOARD[player]
+
+        if end == 'OFF':
+            to_idx = OFF_INDEX + player
+            old = cells[to_idx]
+            new = old - 1
+            pip_delta = 0
+            outside_delta = 0
+        else:
+            to_idx = end
+            old = cells[to_idx]
+            pip_delta = -pip_distance[end]
+            outside_delta = 0 if in_home[end] else -1
+            new = 0 if hit else old - sign
+        cells[to_idx] = new
+        h ^= keys[to_idx][old] ^ keys[to_idx][new]
+        if hit:
+            h ^= self._return_from_bar(1 - player, end)
+
+        if start == 'BAR':
+            from_idx = BAR_INDEX + player
+            old = cells[from_idx]
+            new = old + 1
+            pip_delta += BAR_PIP_DISTANCE
+            outside_delta += 1
+        else:
+            from_idx = start
+            old = cells[from_idx]
+            new = old + sign
+            pip_delta += pip_distance[start]
+            if not in_home[start]:
+                outside_delta += 1
+        cells[from_idx] = new
+        h ^= keys[from_idx][old] ^ keys[from_idx][new]
+
+        cells[PIP_COUNT_INDEX + player] += pip_delta
+        cells[OUTSIDE_HOME_INDEX + player] += outside_delta
+        furthest_idx = FURTHEST_POINT_INDEX + player
+        furthest = cells[furthest_idx]
+        if start != 'BAR' and (start > furthest if player == PLAYER_X else start < furthest):
+            cells[furthest_idx] = start
+        elif end == furthest and cells[end] * sign <= 0:
+            cells[furthest_idx] = self._scan_furthest(player, end)
+
+        self.hash = h
+
+    def _send_to_bar(self, player, point_idx):
+        # The caller overwrites the point itself; this only moves `player`'s bar count and aggregates.
+        cells = self.cells
+        bar_idx = BAR_INDEX + player
+        bar_count = cells[bar_idx]
+        cells[bar_idx] = bar_count + 1
+        cells[PIP_COUNT_INDEX + player] += BAR_PIP_DISTANCE - PIP_DISTANCE[player][point_idx]
+        if IN_HOME_BOARD[player][point_idx]:
+            cells[OUTSIDE_HOME_INDEX + player] += 1
+        if cells[FURTHEST_POINT_INDEX + player] == point_idx:
+            cells[point_idx] = 0
+            cells[FURTHEST_POINT_INDEX + player] = self._scan_furthest(player, point_idx)
+        return ZOBRIST_CELL_KEYS[bar_idx][bar_count] ^ ZOBRIST_CELL_KEYS[bar_idx][bar_count + 1]
+
+    def _return_from_bar(self, player, point_idx):
+        # Puts `player`'s hit blot back on `point_idx`; returns the hash delta for both cells touched.
+        cells = self.cells
+        bar_idx = BAR_INDEX + player
+        bar_count = cells[bar_idx]
+        cells[bar_idx] = bar_count - 1
+        blot = 1 if player == PLAYER_X else -1
+        cells[point_idx] = blot
+        cells[PIP_COUNT_INDEX + player] -= BAR_PIP_DISTANCE - PIP_DISTANCE[player][point_idx]
+        if IN_HOME_BOARD[player][point_idx]:
+            cells[OUTSIDE_HOME_INDEX + player] -= 1
+        furthest = cells[FURTHEST_POINT_INDEX + player]
+        if point_idx > furthest if player == PLAYER_X else point_idx < furthest:
+            cells[FURTHEST_POINT_INDEX + player] = point_idx
+        return (ZOBRIST_CELL_KEYS[bar_idx][bar_count] ^
+                ZOBRIST_CELL_KEYS[bar_idx][bar_count - 1] ^
+                ZOBRIST_CELL_KEYS[point_idx][0] ^
+                ZOBRIST_CELL_KEYS[point_idx][blot])
+
+
+def _as_position(board_state, bar_state=None):
+    if isinstance(board_state, Position):
+        return board_state
+    return Position.from_board(board_state, bar_state or {})
+
+
+class MoveCache:
+    """Thread-safe LRU cache of generated move sequences keyed by (position hash, player, dice, mode).
+
+    get_possible_moves stores tuples of tuples under its sorted dice and unique_positions flag; games store their
+    TurnContext under the rolled dice and TURN_CONTEXT_CACHE_MODE. Neither kind of value can be mutated by callers.
+    With `max_bytes` set, entries are also evicted while their approximate total size exceeds it; the newest entry
+    is always kept.
+    """
+
+    def __init__(self, max_entries=DEFAULT_MOVE_CACHE_SIZE, max_bytes=None):
+        if max_entries < 1:
+            raise ValueError("max_entries must be at least 1")
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.size_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._entry_bytes = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            if self.max_bytes is not None:
+                # Sized only when bounded: a TurnContext of many turns takes a while to measure.
+                size = value.approximate_size() if isinstance(value, TurnContext) else sys.getsizeof(value)
+                self.size_bytes += size - self._entry_bytes.get(key, 0)
+                self._entry_bytes[key] = size
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries or \
+                    (self.max_bytes is not None and self.size_bytes > self.max_bytes and len(self._entries) > 1):
+                evicted_key, _ = self._entries.popitem(last=False)
+                self.size_bytes -= self._entry_bytes.pop(evicted_key, 0)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._entry_bytes.clear()
+            self.size_bytes = 0
+            self.hits = self.misses = self.evictions = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "bytes": self.size_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+class TurnContext:
+    """Legal turns for one (player, position, dice) triple, generated once and shared by validation and apply.
+
+    Turns are stored only as turn codes, which is what validation checks against and what MoveCache holds; the
+    move tuple form that strategies take is decoded on demand.
+    """
+
+    __slots__ = ("player", "dice", "position_hash", "legal_turn_codes", "legal_turn_set", "unique_turn_codes")
+
+    def __init__(self, player, dice, position_hash, legal_turn_codes, unique_turn_codes):
+        self.player = player
+        self.dice = dice
+        self.position_hash = position_hash
+        self.legal_turn_codes = legal_turn_codes
+        self.legal_turn_set = frozenset(legal_turn_codes)
+        self.unique_turn_codes = unique_turn_codes
+
+    @property
+    def legal_turns(self):
+        return tuple(tuple(decode_turn(turn_code)) for turn_code in self.legal_turn_codes)
+
+    @property
+    def unique_turns(self):
+        return tuple(tuple(decode_turn(turn_code)) for turn_code in self.unique_turn_codes)
+
+    def matches(self, player, dice, position_hash):
+        return self.player == player and self.position_hash == position_hash and self.dice == dice
+
+    def is_legal(self, turn_code):
+        if not turn_code:
+            return not self.legal_turn_codes
+        return turn_code in self.legal_turn_set
+
+    @property
+    def max_dice_count(self):
+        return len(turn_move_codes(self.legal_turn_codes[0])) if self.legal_turn_codes else 0
+
+    def approximate_size(self):
+        """Bytes held by this context; unique_turn_codes and the set share the tuple's int objects."""
+        return (sys.getsizeof(self) + sys.getsizeof(self.legal_turn_codes) + sys.getsizeof(self.legal_turn_set) +
+                sys.getsizeof(self.unique_turn_codes) +
+                sum(sys.getsizeof(turn_code) for turn_code in self.legal_turn_codes))
+
 
 class BackgammonGame:
-    def __init__(self):
-        self.board = self.initial_board()
-        self.bar = {PLAYER_X: 0, PLAYER_O: 0}
-        self.borne_off = {PLAYER_X: 0, PLAYER_O: 0}
+    def __init__(self, move_cache=None, game_logger=None, rng=None):
+        self.position = Position.from_board(self.initial_board(), {PLAYER_X: 0, PLAYER_O: 0})
+        self.move_cache = move_cache
+        self.rng = rng if rng is not None else random
+        self.logger = game_logger if game_logger is not None else logger
         self.current_player = None
         self.dice = []
         self.dice_used = {}
@@ -21,12 +563,56 @@ class BackgammonGame:
         self.winner = None
         self.first_roll_made = False
         self.log_prefix = "[GameLogic] "
+        self._turn_context = None
+
+    @property
+    def board(self):
+        return self.position.to_board()
+
+    @board.setter
+    def board(self, board_state):
+        self.position = Position.from_board(board_state, self.bar, self.borne_off)
+
+    @property
+    def turn_context(self):
+        """The TurnContext of the roll being played, or None if none has been built yet; never generates one."""
+        return self._turn_context
+
+    @property
+    def bar(self):
+        return self.position.bar_dict()
+
+    @bar.setter
+    def bar(self, bar_state):
+        self.position = Position.from_board(self.board, bar_state, self.borne_off)
+
+    @property
+    def borne_off(self):
+        return self.position.borne_off_dict()
+
+    @borne_off.setter
+    def borne_off(self, borne_off_state):
+        self.position = Position.from_board(self.board, self.bar, borne_off_state)
+
+    @property
+    def zobrist_hash(self):
+        """Position hash combined with the side to move."""
+        if self.current_player is None:
+            return self.position.hash
+        return self.position.hash ^ ZOBRIST_SIDE_KEYS[self.current_player]
 
     def _update_log_prefix(self):
         player_str = f"P{self.current_player}" if self.current_player is not None else "None"
         dice_str = f"D:{self.dice}" if self.dice else "D:[]"
         self.log_prefix = f"[GameLogic {player_str} {dice_str}] "
 
+    def _log(self, level, msg, *args):
+        # Nothing is formatted and the prefix is not rebuilt unless `level` is enabled on this game's logger.
+        if self.logger.isEnabledFor(level):
+            self._update_log_prefix()
+            self.logger.log(level, self.log_prefix + msg, *args,
+                            extra={"player": self.current_player, "dice": list(self.dice)})
+
     def initial_board(self):
         board = [[None, 0] for _ in range(NUM_POINTS)]
         board[0] = [PLAYER_O, 2]
@@ -39,51 +625,48 @@ class BackgammonGame:
         board[23] = [PLAYER_X, 2]
         return board
 
-    def roll_dice(self):
-        self._update_log_prefix()
-        d1, d2 = random.randint(1, 6), random.randint(1, 6)
-        self.dice = sorted([d1, d2], reverse=True)
-
-        if d1 == d2:
-            self.dice_used = {d1: [False, False, False, False]}
+    def set_dice(self, dice):
+        self.dice = sorted(dice, reverse=True)
+        if self.dice[0] == self.dice[1]:
+            self.dice_used = {self.dice[0]: [False, False, False, False]}
         else:
             self.dice_used = {val: False for val in self.dice}
-
         self.doubles_played_count = 0
-        self._update_log_prefix()
-        print(f"{self.log_prefix}Rolled dice: {self.dice}. Initial dice_used: {self.dice_used}")
+        if self.current_player is not None and self.winner is None:
+            self.get_turn_context(self.current_player)
+
+    def roll_dice(self):
+        d1, d2 = self.rng.randint(1, 6), self.rng.randint(1, 6)
+        self.set_dice([d1, d2])
+        self._log(logging.INFO, "Rolled dice: %s. Initial dice_used: %s", self.dice, self.dice_used)
         return self.dice
 
     def determine_first_player(self):
         while True:
-            d1, d2 = random.randint(1, 6), random.randint(1, 6)
+            d1, d2 = self.rng.randint(1, 6), self.rng.randint(1, 6)
             if d1 != d2:
                 self.current_player = PLAYER_X if d1 > d2 else PLAYER_O
-                self.dice = sorted([d1, d2], reverse=True)
-
-                self.dice_used = {val: False for val in self.dice}
-                self.doubles_played_count = 0
+                self.set_dice([d1, d2])
 
                 self.first_roll_made = True
-                self._update_log_prefix()
-                print(
-                    f"{self.log_prefix}First player P{self.current_player}, first dice {self.dice}, dice_used: {self.dice_used}")
+                self._log(logging.INFO, "First player P%s, first dice %s, dice_used: %s",
+                          self.current_player, self.dice, self.dice_used)
                 return self.current_player, self.dice
 
     def get_opponent(self, player):
         return PLAYER_O if player == PLAYER_X else PLAYER_X
 
     def get_player_home_board_range(self, player):
-        return range(0, 6) if player == PLAYER_X else range(18, 24)
+        return HOME_BOARD_RANGES[player]
+
+    def all_checkers_in_home_state(self, player, board_state, bar_state=None):
+        return _as_position(board_state, bar_state).checkers_outside_home(player) == 0
 
-    def all_checkers_in_home_state(self, player, board_state, bar_state):
-        if bar_state.get(player, 0) > 0:
+    def is_furthest_home_checker(self, player, position, point_idx):
+        if position.bar_count(player) > 0:
             return False
-        home_range = self.get_player_home_board_range(player)
-        for i in range(NUM_POINTS):
-            if board_state[i][0] == player and board_state[i][1] > 0 and i not in home_range:
-                return False
-        return True
+        furthest = position.furthest_point(player)
+        return furthest <= point_idx if player == PLAYER_X else furthest >= point_idx
 
     def get_target_point(self, player, start_point_idx, die_roll):
         if player == PLAYER_X:
@@ -92,228 +675,127 @@ class BackgammonGame:
             return start_point_idx + die_roll
 
     def is_move_valid(self, player, moves_from_client):
-        moves = []
-        for m_part in moves_from_client:
-            try:
-                start = m_part[0] if m_part[0] == 'BAR' else int(m_part[0])
-                end = m_part[1] if m_part[1] == 'OFF' else int(m_part[1])
-                moves.append(tuple((start, end)))
-            except (ValueError, TypeError, IndexError):
-                print(f"{self.log_prefix}IS_MOVE_VALID: FAIL - Malformed move segment: {m_part}")
-                return False
-
-        self._update_log_prefix()
+        """`moves_from_client` is a turn code or a sequence of (start, end) pairs or move codes."""
+        try:
+            turn_code = encode_turn(moves_from_client)
+        except (ValueError, TypeError, IndexError):
+            self._log(logging.WARNING, "IS_MOVE_VALID: FAIL - Malformed moves: %s", moves_from_client)
+            return False
 
         if self.winner is not None:
-            print(f"{self.log_prefix}IS_MOVE_VALID: FAIL - Game winner P{self.winner} already declared.")
+            self._log(logging.INFO, "IS_MOVE_VALID: FAIL - Game winner P%s already declared.", self.winner)
             return False
         if player != self.current_player:
-            print(f"{self.log_prefix}IS_MOVE_VALID: FAIL - Not P{player}'s turn (Current: P{self.current_player}).")
+            self._log(logging.INFO, "IS_MOVE_VALID: FAIL - Not P%s's turn (Current: P%s).", player, self.current_player)
             return False
         if not self.dice:
-            print(f"{self.log_prefix}IS_MOVE_VALID: FAIL - No dice for P{player} (self.dice: {self.dice}).")
+            self._log(logging.INFO, "IS_MOVE_VALID: FAIL - No dice for P%s (self.dice: %s).", player, self.dice)
             return False
 
-        temp_board = copy.deepcopy(self.board)
-        temp_bar = {int(k): v for k, v in self.bar.items()}
-
-        current_turn_dice_options = list(self.dice)
-        is_double_roll = len(current_turn_dice_options) == 2 and current_turn_dice_options[0] == \
-                         current_turn_dice_options[1]
-
-        available_dice_for_sequence = [current_turn_dice_options[0]] * 4 if is_double_roll else list(
-            current_turn_dice_options)
+        turn_context = self.get_turn_context(player)
 
-        if not moves:
-            if self.get_possible_moves(player, current_turn_dice_options, self.board, self.bar):
-                print(f"{self.log_prefix}IS_MOVE_VALID: FAIL (Pass attempt) - Moves are possible.")
+        if not turn_code:
+            if turn_context.legal_turn_codes:
+                self._log(logging.INFO, "IS_MOVE_VALID: FAIL (Pass attempt) - Moves are possible.")
                 return False
             else:
-                print(f"{self.log_prefix}IS_MOVE_VALID: VALID (Pass attempt) - No moves found by get_possible_moves.")
+                self._log(logging.DEBUG, "IS_MOVE_VALID: VALID (Pass attempt) - No moves found by get_possible_moves.")
                 return True
 
-        pips_player_moved_in_sequence = []
-        for i, (start_pip_val, end_pip_val) in enumerate(moves):
-            sub_log = f"{self.log_prefix}  Sub-move {i + 1} ({start_pip_val} -> {end_pip_val}): "
-            is_entering_from_bar = (start_pip_val == 'BAR')
-            is_bearing_off = (end_pip_val == 'OFF')
-            start_pip_idx = -1
-
-            if is_entering_from_bar:
-                if temp_bar.get(player, 0) == 0:
-                    print(f"{sub_log}FAIL - Cannot enter from bar, P{player} bar is empty: {temp_bar.get(player, 0)}.")
-                    return False
-            else:
-                start_pip_idx = int(start_pip_val)
-                if not (0 <= start_pip_idx < NUM_POINTS):
-                    print(f"{sub_log}FAIL - Start pip {start_pip_idx} out of bounds.")
-                    return False
-                if temp_board[start_pip_idx][0] != player or temp_board[start_pip_idx][1] == 0:
-                    print(
-                        f"{sub_log}FAIL - No checkers for P{player} at start pip {start_pip_idx}. Point state: {temp_board[start_pip_idx]}")
-                    return False
-                if temp_bar.get(player, 0) > 0:
-                    print(f"{sub_log}FAIL - P{player} must enter {temp_bar.get(player, 0)} checker(s) from bar first.")
-                    return False
-
-            actual_pip_distance_for_this_move = 0
-            landing_pip_idx = -1
-            opponent = self.get_opponent(player)
-
-            if is_bearing_off:
-                if not self.all_checkers_in_home_state(player, temp_board, temp_bar):
-                    print(f"{sub_log}FAIL - Cannot bear off, not all checkers in home board or bar not empty.")
-                    return False
-
-                home_range_for_player = self.get_player_home_board_range(player)
-                if start_pip_idx not in home_range_for_player:
-                    print(
-                        f"{sub_log}FAIL - Bear off attempt from {start_pip_idx} which is not in home board {home_range_for_player}.")
-                    return False
-
-                required_pip_for_exact_bear_off = (start_pip_idx + 1) if player == PLAYER_X else (
-                            NUM_POINTS - start_pip_idx)
-
-                die_to_consume_for_bear_off = -1
-                if required_pip_for_exact_bear_off in available_dice_for_sequence:
-                    die_to_consume_for_bear_off = required_pip_for_exact_bear_off
-                else:
-                    is_furthest_checker_in_home = True
-                    if player == PLAYER_X:
-                        for p_check_idx in range(start_pip_idx + 1,
-                                                 home_range_for_player.stop):
-                            if p_check_idx in home_range_for_player and temp_board[p_check_idx][0] == player and \
-                                    temp_board[p_check_idx][1] > 0:
-                                is_furthest_checker_in_home = False;
-                                break
-                    else:
-                        for p_check_idx in range(start_pip_idx - 1, home_range_for_player.start - 1,
-                                                 -1):
-                            if p_check_idx in home_range_for_player and temp_board[p_check_idx][0] == player and \
-                                    temp_board[p_check_idx][1] > 0:
-                                is_furthest_checker_in_home = False;
-                                break
-
-                    if is_furthest_checker_in_home:
-                        suitable_overshoot_dice = [d for d in available_dice_for_sequence if
-                                                   d > required_pip_for_exact_bear_off]
-                        if suitable_overshoot_dice:
-                            die_to_consume_for_bear_off = min(
-                                suitable_overshoot_dice)
-
-                if die_to_consume_for_bear_off == -1:
-                    print(
-                        f"{sub_log}FAIL - Bear off from {start_pip_idx} (req pip {required_pip_for_exact_bear_off}). No suitable die in {available_dice_for_sequence}.")
-                    return False
-                actual_pip_distance_for_this_move = die_to_consume_for_bear_off
-
-            elif is_entering_from_bar:
-                landing_pip_idx = int(end_pip_val)
-                if player == PLAYER_X:
-                    actual_pip_distance_for_this_move = NUM_POINTS - landing_pip_idx
-                    if not (NUM_POINTS - 6 <= landing_pip_idx < NUM_POINTS):
-                        print(f"{sub_log}FAIL - P{player}(X) entering invalid pip {landing_pip_idx} from bar.")
-                        return False
-                else:
-                    actual_pip_distance_for_this_move = landing_pip_idx + 1
-                    if not (0 <= landing_pip_idx < 6):
-                        print(f"{sub_log}FAIL - P{player}(O) entering invalid pip {landing_pip_idx} from bar.")
-                        return False
-
+        if not turn_context.is_legal(turn_code):
+            num_moves = len(turn_move_codes(turn_code))
+            if num_moves < turn_context.max_dice_count:
+                self._log(logging.INFO, "IS_MOVE_VALID: FAIL - Player used %s dice, but could have used %s.",
+                          num_moves, turn_context.max_dice_count)
             else:
-                landing_pip_idx = int(end_pip_val)
-                if not (0 <= landing_pip_idx < NUM_POINTS):
-                    print(f"{sub_log}FAIL - Target pip {landing_pip_idx} out of bounds.")
-                    return False
-                actual_pip_distance_for_this_move = abs(start_pip_idx - landing_pip_idx)
-                if (player == PLAYER_X and landing_pip_idx >= start_pip_idx) or \
-                        (player == PLAYER_O and landing_pip_idx <= start_pip_idx):
-                    print(
-                        f"{sub_log}FAIL - P{player} moving wrong direction from {start_pip_idx} to {landing_pip_idx}.")
-                    return False
-
-            if not (1 <= actual_pip_distance_for_this_move <= 6):
-                print(
-                    f"{sub_log}FAIL - Deduced pip distance {actual_pip_distance_for_this_move} is not a valid die (1-6).")
-                return False
-            try:
-                available_dice_for_sequence.remove(actual_pip_distance_for_this_move)
-                pips_player_moved_in_sequence.append(actual_pip_distance_for_this_move)
-            except ValueError:
-                print(
-                    f"{sub_log}FAIL - Deduced pip distance {actual_pip_distance_for_this_move} not in available dice {available_dice_for_sequence}.")
-                return False
-
-            if not is_bearing_off:
-                target_owner, target_checkers_count = temp_board[landing_pip_idx]
-                if target_owner == opponent and target_checkers_count > 1:
-                    print(
-                        f"{sub_log}FAIL - Target pip {landing_pip_idx} is blocked by P{opponent} (count: {target_checkers_count}).")
-                    return False
-
-            if is_entering_from_bar:
-                temp_bar[player] -= 1
-            else:
-                temp_board[start_pip_idx][1] -= 1
-                if temp_board[start_pip_idx][1] == 0: temp_board[start_pip_idx][0] = None
-
-            if not is_bearing_off:
-                target_owner, target_checkers_count = temp_board[landing_pip_idx]
-                if target_owner == opponent and target_checkers_count == 1:
-                    temp_board[landing_pip_idx] = [player, 1]
-                    temp_bar[opponent] += 1
-                else:
-                    temp_board[landing_pip_idx][0] = player
-                    temp_board[landing_pip_idx][1] += 1
-
-        num_dice_player_used_in_sequence = len(pips_player_moved_in_sequence)
-
-        all_possible_turns_from_original_state = self.get_possible_moves(player, list(self.dice), self.board, self.bar)
-
-        max_dice_truly_playable_this_turn = 0
-        if all_possible_turns_from_original_state:
-            max_dice_truly_playable_this_turn = max(len(turn) for turn in all_possible_turns_from_original_state)
-
-        if num_dice_player_used_in_sequence < max_dice_truly_playable_this_turn:
-            print(
-                f"{self.log_prefix}IS_MOVE_VALID: FAIL - Player used {num_dice_player_used_in_sequence} dice, but could have used {max_dice_truly_playable_this_turn}.")
+                self._log(logging.INFO, "IS_MOVE_VALID: FAIL - %s is not one of the %s legal turns for dice %s.",
+                          decode_turn(turn_code), len(turn_context.legal_turn_codes), self.dice)
             return False
 
-        original_dice_for_turn = list(self.dice)
-        is_original_roll_double = len(original_dice_for_turn) == 2 and original_dice_for_turn[0] == \
-                                  original_dice_for_turn[1]
-
-        if not is_original_roll_double and len(original_dice_for_turn) == 2 and \
-                num_dice_player_used_in_sequence == 1 and max_dice_truly_playable_this_turn == 1:
-
-            larger_die_of_roll = original_dice_for_turn[0]
-            smaller_die_of_roll = original_dice_for_turn[1]
-            die_player_actually_used = pips_player_moved_in_sequence[0]
-
-            if die_player_actually_used == smaller_die_of_roll:
-                possible_single_moves_with_larger_die = self._get_possible_moves_recursive(
-                    player, [larger_die_of_roll], self.board, self.bar, []
-                )
-                can_play_larger_die_singly = any(len(seq) == 1 for seq in possible_single_moves_with_larger_die if seq)
-
-                if can_play_larger_die_singly:
-                    print(
-                        f"{self.log_prefix}IS_MOVE_VALID: FAIL - Player used smaller die ({smaller_die_of_roll}), but larger die ({larger_die_of_roll}) was playable singly.")
-                    return False
-
-        print(f"{self.log_prefix}IS_MOVE_VALID: ALL CHECKS PASSED for moves: {moves}")
+        self._log(logging.DEBUG, "IS_MOVE_VALID: ALL CHECKS PASSED for moves: %s", moves_from_client)
         return True
 
+    def get_turn_context(self, player=None):
+        if player is None:
+            player = self.current_player
+        dice_key = tuple(self.dice)
+        turn_context = self._turn_context
+        if turn_context is None or not turn_context.matches(player, dice_key, self.position.hash):
+            turn_context = self._build_turn_context(player, dice_key)
+            self._turn_context = turn_context
+        return turn_context
+
+    def get_legal_turns(self, player=None, unique_positions=False):
+        turn_context = self.get_turn_context(player)
+        turn_codes = turn_context.unique_turn_codes if unique_positions else turn_context.legal_turn_codes
+        return [decode_turn(turn_code) for turn_code in turn_codes]
+
+    def get_legal_turn_codes(self, player=None, unique_positions=False):
+        """get_legal_turns as turn codes, in the same order."""
+        turn_context = self.get_turn_context(player)
+        return list(turn_context.unique_turn_codes if unique_positions else turn_context.legal_turn_codes)
+
+    def get_unique_turn_index(self, turn_code, player=None):
+        """Index in get_legal_turn_codes(unique_positions=True) of the turn reaching the same position as
+        `turn_code`, which may be any legal move order; None if `turn_code` is not a legal turn.
+        """
+        if player is None:
+            player = self.current_player
+        turn_context = self.get_turn_context(player)
+        if turn_code in turn_context.unique_turn_codes:
+            return turn_context.unique_turn_codes.index(turn_code)
+        if not turn_context.is_legal(turn_code) or not turn_code:
+            return None
+        target_key = self._apply_hypothetical_move_sequence(player, decode_turn(turn_code), self.position).key()
+        for turn_index, unique_turn_code in enumerate(turn_context.unique_turn_codes):
+            if self._apply_hypothetical_move_sequence(
+                    player, decode_turn(unique_turn_code), self.position).key() == target_key:
+                return turn_index
+        return None
+
+    def _build_turn_context(self, player, dice_key):
+        move_cache = self.move_cache
+        if move_cache is not None:
+            cache_key = (self.position.hash, player, dice_key, TURN_CONTEXT_CACHE_MODE)
+            turn_context = move_cache.get(cache_key)
+            if turn_context is not None:
+                return turn_context
+
+        resulting_position_keys = []
+        found_sequences_with_dice_info = self._find_legal_turns(
+            player, list(dice_key), self.position, resulting_position_keys)
+
+        legal_turn_codes = {}
+        unique_turn_codes = {}
+        for seq, position_key in zip(found_sequences_with_dice_info, resulting_position_keys):
+            # Searched moves are legal by construction, so they are packed without encode_turn's checks.
+            turn_code = 0
+            shift = 0
+            for mf, mt, du_unused in seq:
+                start_cell = MOVE_CODE_BAR if mf == 'BAR' else mf
+                end_cell = MOVE_CODE_OFF if mt == 'OFF' else mt
+                turn_code |= ((start_cell << MOVE_CODE_SHIFT) | end_cell) << shift
+                shift += MOVE_CODE_BITS
+            if turn_code not in legal_turn_codes:
+                legal_turn_codes[turn_code] = position_key
+                unique_turn_codes.setdefault(position_key, turn_code)
+        turn_context = TurnContext(player, dice_key, self.position.hash, tuple(legal_turn_codes),
+                                   tuple(unique_turn_codes.values()))
+        if move_cache is not None:
+            move_cache.put(cache_key, turn_context)
+        return turn_context
+
     def apply_moves(self, player, moves_from_client):
-        moves = []
-        for m_part in moves_from_client:
-            start = m_part[0] if m_part[0] == 'BAR' else int(m_part[0])
-            end = m_part[1] if m_part[1] == 'OFF' else int(m_part[1])
-            moves.append(tuple((start, end)))
+        """Plays a turn code or a sequence of (start, end) pairs or move codes, as accepted by is_move_valid."""
+        turn_code = encode_turn(moves_from_client)
+        moves = decode_turn(turn_code)
 
-        self._update_log_prefix()
-        print(
-            f"{self.log_prefix}APPLY_MOVES for P{player} with moves {moves}. Current dice_used before apply: {self.dice_used}, Current dice: {self.dice}")
+        self._log(logging.DEBUG, "APPLY_MOVES for P%s with moves %s. Current dice_used before apply: %s, Current dice: %s",
+                  player, moves, self.dice_used, self.dice)
+
+        turn_context = self._turn_context
+        completes_legal_turn = turn_context is not None and turn_context.matches(
+            player, tuple(self.dice), self.position.hash) and turn_code in turn_context.legal_turn_set
 
         is_original_roll_double = len(self.dice) == 2 and self.dice[0] == self.dice[1]
 
@@ -325,8 +807,7 @@ class BackgammonGame:
             actual_die_val_for_segment = 0
 
             if is_bearing_off:
-                required_pip_for_exact_bear_off = (start_pip_idx + 1) if player == PLAYER_X else (
-                            NUM_POINTS - start_pip_idx)
+                required_pip_for_exact_bear_off = BEAR_OFF_PIPS[player][start_pip_idx]
 
                 if not is_original_roll_double:
                     if required_pip_for_exact_bear_off in self.dice_used and not self.dice_used[
@@ -338,22 +819,7 @@ class BackgammonGame:
                             actual_die_val_for_segment = required_pip_for_exact_bear_off
 
                 if actual_die_val_for_segment == 0:
-                    home_range = self.get_player_home_board_range(player)
-                    is_furthest = True
-                    if player == PLAYER_X:
-                        for p_check_idx in range(start_pip_idx + 1, home_range.stop):
-                            if p_check_idx in home_range and self.board[p_check_idx][0] == player and \
-                                    self.board[p_check_idx][1] > 0:
-                                is_furthest = False;
-                                break
-                    else:
-                        for p_check_idx in range(start_pip_idx - 1, home_range.start - 1, -1):
-                            if p_check_idx in home_range and self.board[p_check_idx][0] == player and \
-                                    self.board[p_check_idx][1] > 0:
-                                is_furthest = False;
-                                break
-
-                    if is_furthest:
+                    if self.is_furthest_home_checker(player, self.position, start_pip_idx):
                         overshoot_candidates = []
                         if not is_original_roll_double:
                             overshoot_candidates = [d for d in self.dice_used if
@@ -367,8 +833,9 @@ class BackgammonGame:
                             actual_die_val_for_segment = min(overshoot_candidates)
 
                 if actual_die_val_for_segment == 0:
-                    print(
-                        f"{self.log_prefix}APPLY_MOVES WARN: Bear-off die deduction complex. Defaulting to required_pip {required_pip_for_exact_bear_off} if still 0.")
+                    self._log(logging.WARNING,
+                              "APPLY_MOVES WARN: Bear-off die deduction complex. Defaulting to required_pip %s if still 0.",
+                              required_pip_for_exact_bear_off)
                     actual_die_val_for_segment = required_pip_for_exact_bear_off
 
 
@@ -381,8 +848,9 @@ class BackgammonGame:
                 actual_die_val_for_segment = abs(start_pip_idx - landing_pip_idx)
 
             if not (1 <= actual_die_val_for_segment <= 6):
-                print(
-                    f"{self.log_prefix}APPLY_MOVES CRITICAL ERROR: Deduced die {actual_die_val_for_segment} for move ({start_pip_val}->{end_pip_val}) is invalid. This shouldn't happen after is_move_valid.")
+                self._log(logging.ERROR,
+                          "APPLY_MOVES CRITICAL ERROR: Deduced die %s for move (%s->%s) is invalid. This shouldn't happen after is_move_valid.",
+                          actual_die_val_for_segment, start_pip_val, end_pip_val)
 
             die_marked_successfully = False
             if is_original_roll_double:
@@ -394,82 +862,70 @@ class BackgammonGame:
                             die_marked_successfully = True
                             break
                     if not die_marked_successfully:
-                        print(
-                            f"{self.log_prefix}APPLY_MOVES ERROR: Double roll, tried to use {actual_die_val_for_segment}, but all 4 instances already marked or die mismatch. dice_used: {self.dice_used}")
+                        self._log(logging.ERROR,
+                                  "APPLY_MOVES ERROR: Double roll, tried to use %s, but all 4 instances already marked or die mismatch. dice_used: %s",
+                                  actual_die_val_for_segment, self.dice_used)
                 else:
-                    print(
-                        f"{self.log_prefix}APPLY_MOVES ERROR: Double roll ({self.dice[0]}), but segment die {actual_die_val_for_segment} doesn't match.")
+                    self._log(logging.ERROR, "APPLY_MOVES ERROR: Double roll (%s), but segment die %s doesn't match.",
+                              self.dice[0], actual_die_val_for_segment)
             else:
                 if actual_die_val_for_segment in self.dice_used:
                     if not self.dice_used[actual_die_val_for_segment]:
                         self.dice_used[actual_die_val_for_segment] = True
                         die_marked_successfully = True
                     else:
-                        print(
-                            f"{self.log_prefix}APPLY_MOVES WARN: Non-double, die {actual_die_val_for_segment} was already marked as used. dice_used: {self.dice_used}")
+                        self._log(logging.WARNING,
+                                  "APPLY_MOVES WARN: Non-double, die %s was already marked as used. dice_used: %s",
+                                  actual_die_val_for_segment, self.dice_used)
                 else:
-                    print(
-                        f"{self.log_prefix}APPLY_MOVES ERROR: Die {actual_die_val_for_segment} not in self.dice_used keys ({list(self.dice_used.keys())}). Original roll: {self.dice}")
+                    self._log(logging.ERROR, "APPLY_MOVES ERROR: Die %s not in self.dice_used keys (%s). Original roll: %s",
+                              actual_die_val_for_segment, self.dice_used.keys(), self.dice)
 
             if not die_marked_successfully and (
                     1 <= actual_die_val_for_segment <= 6):
-                print(
-                    f"{self.log_prefix}APPLY_MOVES CRITICAL: Failed to mark die {actual_die_val_for_segment} as used. This will likely break turn logic.")
-
-            if is_entering_from_bar:
-                self.bar[player] -= 1
-            else:
-                self.board[start_pip_idx][1] -= 1
-                if self.board[start_pip_idx][1] == 0:
-                    self.board[start_pip_idx][0] = None
-
-            if is_bearing_off:
-                self.borne_off[player] += 1
-            else:
-                landing_pip_idx = int(end_pip_val)
-                opponent = self.get_opponent(player)
-                target_owner, target_checkers_count = self.board[landing_pip_idx]
+                self._log(logging.ERROR,
+                          "APPLY_MOVES CRITICAL: Failed to mark die %s as used. This will likely break turn logic.",
+                          actual_die_val_for_segment)
 
-                if target_owner == opponent and target_checkers_count == 1:
-                    self.board[landing_pip_idx] = [player, 1]
-                    self.bar[opponent] += 1
-                else:
-                    self.board[landing_pip_idx][0] = player
-                    self.board[landing_pip_idx][1] += 1
+            self.position.apply_move(player, 'BAR' if is_entering_from_bar else start_pip_idx,
+                                     'OFF' if is_bearing_off else int(end_pip_val))
 
-            print(
-                f"{self.log_prefix} After segment ({start_pip_val}->{end_pip_val}), die {actual_die_val_for_segment} marked. dice_used: {self.dice_used}, doubles_played: {self.doubles_played_count}")
+            self._log(logging.DEBUG, " After segment (%s->%s), die %s marked. dice_used: %s, doubles_played: %s",
+                      start_pip_val, end_pip_val, actual_die_val_for_segment, self.dice_used, self.doubles_played_count)
 
-        if self.borne_off.get(player, 0) == MAX_CHECKERS_PER_PLAYER:
+        if self.position.off_count(player) == MAX_CHECKERS_PER_PLAYER:
             self.winner = player
-            print(f"{self.log_prefix}WINNER DETECTED: P{self.winner} has borne off all checkers.")
+            self._log(logging.INFO, "WINNER DETECTED: P%s has borne off all checkers.", self.winner)
             return
 
         all_dice_used_or_no_further_moves_possible = False
 
-        if is_original_roll_double:
+        if completes_legal_turn:
+            all_dice_used_or_no_further_moves_possible = True
+        elif is_original_roll_double:
             if self.doubles_played_count == 4:
                 all_dice_used_or_no_further_moves_possible = True
             else:
                 remaining_double_dice_for_check = [self.dice[0]] * (4 - self.doubles_played_count)
-                if not self.get_possible_moves(player, remaining_double_dice_for_check, self.board, self.bar):
+                if not self._possible_move_tuples(player, remaining_double_dice_for_check, self.position):
                     all_dice_used_or_no_further_moves_possible = True
         else:
             if all(self.dice_used.values()):
                 all_dice_used_or_no_further_moves_possible = True
             else:
                 unused_dice_values = [d_val for d_val, is_used in self.dice_used.items() if not is_used]
-                if not self.get_possible_moves(player, unused_dice_values, self.board, self.bar):
+                if not self._possible_move_tuples(player, unused_dice_values, self.position):
                     all_dice_used_or_no_further_moves_possible = True
 
         if all_dice_used_or_no_further_moves_possible:
             if self.winner is None:
-                print(
-                    f"{self.log_prefix}APPLY_MOVES: All dice used or no more moves possible. Switching player. dice_used: {self.dice_used}")
+                self._log(logging.DEBUG,
+                          "APPLY_MOVES: All dice used or no more moves possible. Switching player. dice_used: %s",
+                          self.dice_used)
                 self.switch_player()
         else:
-            print(
-                f"{self.log_prefix}APPLY_MOVES: P{player} turn continues. Some dice unplayed and playable. dice_used: {self.dice_used}")
+            self._log(logging.DEBUG, "APPLY_MOVES: P%s turn continues. Some dice unplayed and playable. dice_used: %s",
+                      player, self.dice_used)
 
     def switch_player(self):
         if self.current_player is None: return
@@ -477,27 +933,73 @@ class BackgammonGame:
         self.dice = []
         self.dice_used = {}
         self.doubles_played_count = 0
-        self._update_log_prefix()
-        print(f"{self.log_prefix}SWITCH_PLAYER: To P{self.current_player}. Dice cleared, ready for roll.")
+        self._log(logging.DEBUG, "SWITCH_PLAYER: To P%s. Dice cleared, ready for roll.", self.current_player)
 
     def get_state(self):
         return {
-            "board": self.board,
-            "bar": self.bar,
-            "borne_off": self.borne_off,
+            "board": self.position.to_board(),
+            "bar": self.position.bar_dict(),
+            "borne_off": self.position.borne_off_dict(),
             "current_player": self.current_player,
             "dice": self.dice,
             "dice_used": self.dice_used,
             "winner": self.winner,
-            "first_roll_made": self.first_roll_made
+            "first_roll_made": self.first_roll_made,
+            "position_hash": self.zobrist_hash,
+            "pip_counts": {PLAYER_X: self.position.pip_count(PLAYER_X), PLAYER_O: self.position.pip_count(PLAYER_O)},
+            "checkers_outside_home": {PLAYER_X: self.position.checkers_outside_home(PLAYER_X),
+                                      PLAYER_O: self.position.checkers_outside_home(PLAYER_O)},
+            "furthest_point": {PLAYER_X: self.position.furthest_point(PLAYER_X),
+                               PLAYER_O: self.position.furthest_point(PLAYER_O)}
         }
 
-    def get_possible_moves(self, player, current_dice_values, current_board_state, current_bar_state):
-        bar_to_use_in_recursion = {int(k) if isinstance(k, str) else k: v for k, v in current_bar_state.items()}
-
+    def get_possible_moves(self, player, current_dice_values, current_board_state, current_bar_state=None,
+                           unique_positions=False):
+        """Legal turns as turn codes; decode_turn gives a code's [(start, end), ...] form."""
+        return [encode_turn(seq_tuples) for seq_tuples in self._possible_move_tuples(
+            player, current_dice_values, _as_position(current_board_state, current_bar_state), unique_positions)]
+
+    def _possible_move_tuples(self, player, current_dice_values, position, unique_positions=False):
+        move_cache = self.move_cache
+        if move_cache is not None:
+            cache_key = (position.hash, player, tuple(sorted(current_dice_values)), unique_positions)
+            cached_sequences = move_cache.get(cache_key)
+            if cached_sequences is not None:
+                return cached_sequences
+
+        if unique_positions:
+            sequences_by_position = self.get_possible_moves_by_position(player, current_dice_values, position)
+            move_sequences = tuple(tuple(alternatives[0]) for alternatives in sequences_by_position.values())
+        else:
+            found_sequences_with_dice_info = self._find_legal_turns(player, current_dice_values, position)
+            move_sequences = tuple(dict.fromkeys(
+                tuple((mf, mt) for mf, mt, du_unused in seq) for seq in found_sequences_with_dice_info))
+
+        if move_cache is not None:
+            move_cache.put(cache_key, move_sequences)
+        return move_sequences
+
+    def get_possible_moves_by_position(self, player, current_dice_values, current_board_state,
+                                       current_bar_state=None):
+        """Groups legal sequences by resulting position key; the first sequence of each group is its representative."""
+        resulting_position_keys = []
+        found_sequences_with_dice_info = self._find_legal_turns(
+            player, current_dice_values, _as_position(current_board_state, current_bar_state),
+            resulting_position_keys)
+
+        sequences_by_position = {}
+        seen_sequences = set()
+        for seq, position_key in zip(found_sequences_with_dice_info, resulting_position_keys):
+            seq_tuples = tuple((mf, mt) for mf, mt, du_unused in seq)
+            if seq_tuples in seen_sequences:
+                continue
+            seen_sequences.add(seq_tuples)
+            sequences_by_position.setdefault(position_key, []).append(list(seq_tuples))
+        return sequences_by_position
+
+    def _find_legal_turns(self, player, current_dice_values, position, resulting_position_keys=None):
         if not current_dice_values: return []
 
-        initial_dice_list_for_recursion = []
         is_double_scenario = len(current_dice_values) == 2 and current_dice_values[0] == current_dice_values[1]
 
         if is_double_scenario:
@@ -505,162 +1007,99 @@ class BackgammonGame:
         else:
             initial_dice_list_for_recursion = list(current_dice_values)
 
-        found_sequences_with_dice_info = self._get_possible_moves_recursive(
-            player,
-            initial_dice_list_for_recursion,
-            current_board_state,
-            bar_to_use_in_recursion,
-            []
-        )
-
-        if not found_sequences_with_dice_info: return []
-
-        valid_found_sequences = [seq for seq in found_sequences_with_dice_info if seq]
-        if not valid_found_sequences: return []
-
-        max_dice_used_in_any_sequence = max(len(seq) for seq in valid_found_sequences)
-        optimal_sequences_by_dice_count = [seq for seq in valid_found_sequences if
-                                           len(seq) == max_dice_used_in_any_sequence]
-
-        final_move_sequences_tuples_only = [[(mf, mt) for mf, mt, du_unused in seq] for seq in
-                                            optimal_sequences_by_dice_count]
-
-        unique_final_sequences = []
-        for seq_tuples in final_move_sequences_tuples_only:
-            if seq_tuples not in unique_final_sequences:
-                unique_final_sequences.append(seq_tuples)
-
-        return unique_final_sequences
-
-    def _get_possible_moves_recursive(self, player, dice_still_to_play, board_state, bar_state_int_keys,
-                                      current_path_taken):
-
+        # With two different dice of which only one can be played, the larger must be played if it can be.
+        larger_die_of_roll = None
+        if len(current_dice_values) == 2 and not is_double_scenario:
+            larger_die_of_roll = max(current_dice_values)
+
+        found_sequences_with_dice_info = []
+        found_position_keys = resulting_position_keys if resulting_position_keys is not None else []
+        self._search_move_sequences(player, initial_dice_list_for_recursion, position.copy(), [],
+                                    found_sequences_with_dice_info, found_position_keys, larger_die_of_roll)
+        return found_sequences_with_dice_info
+
+    def _search_move_sequences(self, player, dice_still_to_play, position, path_stack, found_paths,
+                               found_position_keys, larger_die_of_roll=None):
+        # Make/unmake search: `position`, `dice_still_to_play` and `path_stack` are mutated in place and
+        # restored before returning. `found_paths` only ever holds legal turns: a completed sequence is
+        # dropped if a longer one is already known, replaces everything found so far if it is longer, and
+        # the larger-die rule is settled as single-die sequences arrive (larger-die moves are searched first).
+        # `found_position_keys` receives the key of the position each kept sequence reaches.
         possible_next_individual_moves = []
-        at_least_one_move_found_this_level = False
-
-        unique_dice_values_to_evaluate = sorted(list(set(dice_still_to_play)), reverse=True)
 
-        opponent = self.get_opponent(player)
-        home_range_for_player = self.get_player_home_board_range(player)
+        if dice_still_to_play:
+            unique_dice_values_to_evaluate = sorted(set(dice_still_to_play), reverse=True)
+            cells = position.cells
+            sign = 1 if player == PLAYER_X else -1
 
-        if bar_state_int_keys.get(player, 0) > 0:
-            for die_val in unique_dice_values_to_evaluate:
-                dest_pip_from_bar = (NUM_POINTS - die_val) if player == PLAYER_X else (die_val - 1)
-
-                if 0 <= dest_pip_from_bar < NUM_POINTS:
-                    target_owner, target_checkers_count = board_state[dest_pip_from_bar]
-                    if not (target_owner == opponent and target_checkers_count > 1):
+            if position.bar_count(player) > 0:
+                bar_entry_points = BAR_ENTRY_POINT[player]
+                for die_val in unique_dice_values_to_evaluate:
+                    dest_pip_from_bar = bar_entry_points[die_val]
+                    if cells[dest_pip_from_bar] * sign >= -1:
                         possible_next_individual_moves.append(('BAR', dest_pip_from_bar, die_val))
-                        at_least_one_move_found_this_level = True
-
-        else:
-            can_bear_off_now = self.all_checkers_in_home_state(player, board_state, bar_state_int_keys)
-
-            for die_val in unique_dice_values_to_evaluate:
-                for p_idx in range(NUM_POINTS):
-                    if board_state[p_idx][0] == player and board_state[p_idx][1] > 0:
-                        dest_pip_std = self.get_target_point(player, p_idx, die_val)
-                        if 0 <= dest_pip_std < NUM_POINTS:
-                            target_owner_std, target_checkers_std = board_state[dest_pip_std]
-                            if not (target_owner_std == opponent and target_checkers_std > 1):
-                                possible_next_individual_moves.append((p_idx, dest_pip_std, die_val))
-                                at_least_one_move_found_this_level = True
-
-                        if can_bear_off_now and p_idx in home_range_for_player:
-                            required_pip_for_exact_bear_off = (p_idx + 1) if player == PLAYER_X else (
-                                        NUM_POINTS - p_idx)
-
-                            if die_val == required_pip_for_exact_bear_off:
-                                possible_next_individual_moves.append((p_idx, 'OFF', die_val))
-                                at_least_one_move_found_this_level = True
-                            elif die_val > required_pip_for_exact_bear_off:
-                                is_furthest_checker = True
-                                if player == PLAYER_X:
-                                    for hp_idx in range(p_idx + 1, home_range_for_player.stop):
-                                        if hp_idx in home_range_for_player and board_state[hp_idx][0] == player and \
-                                                board_state[hp_idx][1] > 0:
-                                            is_furthest_checker = False;
-                                            break
-                                else:
-                                    for lp_idx in range(p_idx - 1, home_range_for_player.start - 1, -1):
-                                        if lp_idx in home_range_for_player and board_state[lp_idx][0] == player and \
-                                                board_state[lp_idx][1] > 0:
-                                            is_furthest_checker = False;
-                                            break
-                                if is_furthest_checker:
-                                    possible_next_individual_moves.append((p_idx, 'OFF', die_val))
-                                    at_least_one_move_found_this_level = True
-
-        if not dice_still_to_play or not at_least_one_move_found_this_level:
-            return [current_path_taken] if current_path_taken else []
-
-        all_completed_paths_from_this_point = []
-        if not possible_next_individual_moves and current_path_taken:
-            all_completed_paths_from_this_point.append(current_path_taken)
-
-        for move_from, move_to, die_val_used_for_move in possible_next_individual_moves:
-            if die_val_used_for_move not in dice_still_to_play: continue
-
-            temp_dice_remaining_for_next_call = list(dice_still_to_play)
-            temp_dice_remaining_for_next_call.remove(die_val_used_for_move)
-
-            board_after_move, bar_after_move, _ = self._apply_hypothetical_move_sequence(
-                player,
-                [(move_from, move_to)],
-                board_state,
-                bar_state_int_keys,
-                {}
-            )
-
-            recursive_paths = self._get_possible_moves_recursive(
-                player,
-                temp_dice_remaining_for_next_call,
-                board_after_move,
-                bar_after_move,
-                current_path_taken + [(move_from, move_to, die_val_used_for_move)]
-            )
-            all_completed_paths_from_this_point.extend(recursive_paths)
-
-        if current_path_taken and not possible_next_individual_moves and not any(
-                path == current_path_taken for path in all_completed_paths_from_this_point):
-            all_completed_paths_from_this_point.append(current_path_taken)
-        elif not current_path_taken and not all_completed_paths_from_this_point and not possible_next_individual_moves:
-            return []
-
-        final_unique_paths = []
-        for p_seq in all_completed_paths_from_this_point:
-            if p_seq and p_seq not in final_unique_paths:
-                final_unique_paths.append(p_seq)
-        return final_unique_paths
-
-    def _apply_hypothetical_move_sequence(self, player, move_sequence_tuples, board_orig, bar_orig_int_keys,
-                                          borne_off_dummy):
-        temp_board = copy.deepcopy(board_orig)
-        temp_bar = copy.deepcopy(bar_orig_int_keys)
-
-        opponent = self.get_opponent(player)
-
-        for start_pip_val, end_pip_val in move_sequence_tuples:
-            is_entering_from_bar = (start_pip_val == 'BAR')
-            is_bearing_off = (end_pip_val == 'OFF')
 
-            if is_entering_from_bar:
-                temp_bar[player] -= 1
             else:
-                start_pip_idx = int(start_pip_val)
-                temp_board[start_pip_idx][1] -= 1
-                if temp_board[start_pip_idx][1] == 0:
-                    temp_board[start_pip_idx][0] = None
+                can_bear_off_now = cells[OUTSIDE_HOME_INDEX + player] == 0
+                furthest_point = cells[FURTHEST_POINT_INDEX + player]
+                move_targets = MOVE_TARGET[player]
+                bear_off_kinds = BEAR_OFF_KIND[player]
+
+                for die_val in unique_dice_values_to_evaluate:
+                    for p_idx in range(NUM_POINTS):
+                        if cells[p_idx] * sign > 0:
+                            dest_pip_std = move_targets[p_idx][die_val]
+                            if dest_pip_std >= 0 and cells[dest_pip_std] * sign >= -1:
+                                possible_next_individual_moves.append((p_idx, dest_pip_std, die_val))
 
-            if not is_bearing_off:
-                landing_pip_idx = int(end_pip_val)
-                target_owner, target_checkers_count = temp_board[landing_pip_idx]
+                            if can_bear_off_now:
+                                bear_off_kind = bear_off_kinds[p_idx][die_val]
+                                if bear_off_kind == EXACT_BEAR_OFF or (
+                                        bear_off_kind == OVERSHOOT_BEAR_OFF and p_idx == furthest_point):
+                                    possible_next_individual_moves.append((p_idx, 'OFF', die_val))
 
-                if target_owner == opponent and target_checkers_count == 1:
-                    temp_board[landing_pip_idx] = [player, 1]
-                    temp_bar[opponent] += 1
-                else:
-                    temp_board[landing_pip_idx][0] = player
-                    temp_board[landing_pip_idx][1] += 1
+        if not possible_next_individual_moves:
+            if path_stack:
+                self._record_completed_sequence(path_stack, position, found_paths, found_position_keys,
+                                                larger_die_of_roll)
+            return
 
-        return temp_board, temp_bar, {}
\ No newline at end of file
+        for move in possible_next_individual_moves:
+            move_from, move_to, die_val_used_for_move = move
+            hit = position.apply_move(player, move_from, move_to)
+            dice_still_to_play.remove(die_val_used_for_move)
+            path_stack.append(move)
+
+            self._search_move_sequences(player, dice_still_to_play, position, path_stack, found_paths,
+                                        found_position_keys, larger_die_of_roll)
+
+            path_stack.pop()
+            dice_still_to_play.append(die_val_used_for_move)
+            position.undo_move(player, move_from, move_to, hit)
+
+    def _record_completed_sequence(self, path_stack, position, found_paths, found_position_keys,
+                                   larger_die_of_roll):
+        sequence_length = len(path_stack)
+        if found_paths:
+            best_length = len(found_paths[0])
+            if sequence_length < best_length:
+                return
+            if sequence_length > best_length:
+                found_paths.clear()
+                del found_position_keys[:]
+            elif sequence_length == 1 and larger_die_of_roll is not None:
+                die_used, best_die = path_stack[0][2], found_paths[0][0][2]
+                if die_used != best_die:
+                    if best_die == larger_die_of_roll:
+                        return
+                    found_paths.clear()
+                    del found_position_keys[:]
+        found_paths.append(tuple(path_stack))
+        found_position_keys.append(position.key())
+
+    def _apply_hypothetical_move_sequence(self, player, move_sequence_tuples, position_orig):
+        temp_position = position_orig.copy()
+        for start_pip_val, end_pip_val in move_sequence_tuples:
+            temp_position.apply_move(player, start_pip_val if start_pip_val == 'BAR' else int(start_pip_val),
+                                     end_pip_val if end_pip_val == 'OFF' else int(end_pip_val))
+        return temp_position
@@ -0,0 +1,215 @@
+import argparse
+import mmap
+import os
+import struct
+from array import array
+
+import ai_player
+from game_logic import BackgammonGame, MoveCache, PLAYER_O, PLAYER_X, decode_turn, encode_turn, turn_move_codes
+from selfplay import SelfPlayStats, game_seed, play_game
+
+FILE_MAGIC = b"BGREC\x00"
+FORMAT_VERSION = 1
+FILE_HEADER = struct.Struct("<6sH")
+RECORD_MAGIC = 0xB6A1
+# magic, payload bytes, seed, player X id, player O id, first player, winner, turn count
+GAME_HEADER = struct.Struct("<HIQHHBBH")
+NO_WINNER = 0xFF
+INDEX_SUFFIX = ".idx"
+
+
+def replay_turns(first_player, turns, game=None):
+    """Plays (dice, moves) turns on `game`, a fresh BackgammonGame by default, validating each one.
+
+    `moves` is anything encode_turn accepts. Yields (game, turn code) for every turn with its dice set, just
+    before the turn is played; raises ValueError at the first turn that is not legal.
+    """
+    game = game if game is not None else BackgammonGame()
+    game.current_player = first_player
+    game.first_roll_made = True
+    for dice, moves in turns:
+        player = game.current_player
+        game.set_dice(list(dice))
+        turn_code = encode_turn(moves)
+        if not game.is_move_valid(player, turn_code):
+            raise ValueError(f"Recorded turn {decode_turn(turn_code)} with dice {dice} is not legal for P{player}.")
+        yield game, turn_code
+        if turn_code:
+            game.apply_moves(player, turn_code)
+        else:
+            game.switch_player()
+
+
+def pack_turn(dice, move_codes):
+    """Turn entry: u16 of die1 (3 bits), die2 (3 bits) and move count (3 bits), then one u16 code per move."""
+    header = (dice[0] << 6) | (dice[1] << 3) | len(move_codes)
+    return struct.pack(f"<H{len(move_codes)}H", header, *move_codes)
+
+
+class GameRecord:
+    __slots__ = ("seed", "player_x_id", "player_o_id", "first_player", "winner", "turns")
+
+    def __init__(self, seed, player_x_id, player_o_id, first_player, winner, turns):
+        self.seed = seed
+        self.player_x_id = player_x_id
+        self.player_o_id = player_o_id
+        self.first_player = first_player
+        self.winner = winner
+        self.turns = turns
+
+    def __repr__(self):
+        return (f"GameRecord(seed={self.seed}, players=({self.player_x_id}, {self.player_o_id}), "
+                f"first={self.first_player}, winner={self.winner}, turns={len(self.turns)})")
+
+    def replay(self, upto_turn=None, game=None):
+        """Rebuilds the game through BackgammonGame, validating every turn; stops before turn `upto_turn`."""
+        game = game if game is not None else BackgammonGame()
+        for _ in replay_turns(self.first_player, self.turns[:upto_turn], game):
+            pass
+        return game
+
+
+class GameRecordWriter:
+    """Appends games to a record file and their byte offsets to the companion .idx file."""
+
+    def __init__(self, path):
+        self.path = path
+        is_new = not os.path.exists(path) or os.path.getsize(path) == 0
+        self._file = open(path, "ab")
+        if is_new:
+            self._file.write(FILE_HEADER.pack(FILE_MAGIC, FORMAT_VERSION))
+        self._index = open(path + INDEX_SUFFIX, "ab")
+
+    def write_game(self, seed, player_x_id, player_o_id, first_player, winner, turns):
+        """`turns` holds (dice, moves) pairs; moves is a turn code or a sequence of (start, end) pairs or move codes."""
+        payload = bytearray()
+        for dice, moves in turns:
+            payload += pack_turn(dice, turn_move_codes(encode_turn(moves)))
+        offset = self._file.tell()
+        self._file.write(GAME_HEADER.pack(RECORD_MAGIC, len(payload), seed, player_x_id, player_o_id, first_player,
+                                          NO_WINNER if winner is None else winner, len(turns)))
+        self._file.write(payload)
+        self._index.write(struct.pack("<Q", offset))
+        return offset
+
+    def flush(self):
+        self._file.flush()
+        self._index.flush()
+
+    def close(self):
+        self._file.close()
+        self._index.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class GameRecordReader:
+    """Memory-maps a record file for random access to game N through the .idx offsets.
+
+    A missing or short index (e.g. after a crash between the two appends) is rebuilt by scanning the records.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version = FILE_HEADER.unpack_from(self._map, 0)
+        if magic != FILE_MAGIC or version != FORMAT_VERSION:
+            raise ValueError(f"{path} is not a version {FORMAT_VERSION} game record file.")
+        self.offsets = array("Q")
+        index_path = path + INDEX_SUFFIX
+        if os.path.exists(index_path):
+            with open(index_path, "rb") as f:
+                self.offsets.frombytes(f.read())
+        if not self.offsets or self.offsets[-1] + GAME_HEADER.size > len(self._map) or \
+                self._record_end(self.offsets[-1]) != len(self._map):
+            self.offsets = self._scan_offsets()
+
+    def _record_end(self, offset):
+        return offset + GAME_HEADER.size + GAME_HEADER.unpack_from(self._map, offset)[1]
+
+    def _scan_offsets(self):
+        offsets = array("Q")
+        offset = FILE_HEADER.size
+        while offset + GAME_HEADER.size <= len(self._map):
+            if GAME_HEADER.unpack_from(self._map, offset)[0] != RECORD_MAGIC:
+                raise ValueError(f"Corrupt record at byte {offset} of {self.path}.")
+            end = self._record_end(offset)
+            if end > len(self._map):
+                break
+            offsets.append(offset)
+            offset = end
+        return offsets
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def __getitem__(self, game_idx):
+        offset = self.offsets[game_idx]
+        (_, payload_size, seed, player_x_id, player_o_id, first_player, winner,
+         num_turns) = GAME_HEADER.unpack_from(self._map, offset)
+        words = struct.unpack_from(f"<{payload_size // 2}H", self._map, offset + GAME_HEADER.size)
+        turns = []
+        pos = 0
+        for _ in range(num_turns):
+            header = words[pos]
+            num_moves = header & 0x7
+            turns.append((((header >> 6) & 0x7, (header >> 3) & 0x7), words[pos + 1:pos + 1 + num_moves]))
+            pos += 1 + num_moves
+        return GameRecord(seed, player_x_id, player_o_id, first_player, None if winner == NO_WINNER else winner,
+                          turns)
+
+    def __iter__(self):
+        for game_idx in range(len(self)):
+            yield self[game_idx]
+
+    def replay(self, game_idx, upto_turn=None):
+        return self[game_idx].replay(upto_turn)
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def record_selfplay(writer, strategy_x, strategy_o, num_games, seed=0, first_game=0, player_ids=(0, 1),
+                    move_cache=None):
+    """Plays seeded self-play games and appends each one to `writer`; returns the SelfPlayStats."""
+    strategies = {PLAYER_X: strategy_x, PLAYER_O: strategy_o}
+    move_cache = move_cache if move_cache is not None else MoveCache()
+    stats = SelfPlayStats()
+    for game_index in range(first_game, first_game + num_games):
+        this_seed = game_seed(seed, game_index)
+        turn_log = []
+        winner = play_game(strategies, this_seed, stats, move_cache, turn_log)
+        writer.write_game(this_seed, player_ids[0], player_ids[1], turn_log[0][0], winner,
+                          [(dice, moves) for _, dice, moves in turn_log])
+    return stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Record self-play games to a binary log, or inspect one.")
+    parser.add_argument("path")
+    parser.add_argument("--games", type=int, default=0, help="record this many ai_player self-play games")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--show", type=int, default=None, help="replay game N and print its final state")
+    args = parser.parse_args()
+
+    if args.games:
+        with GameRecordWriter(args.path) as record_writer:
+            record_selfplay(record_writer, ai_player.choose_move, ai_player.choose_move, args.games, args.seed)
+    with GameRecordReader(args.path) as reader:
+        print(f"{args.path}: {len(reader)} games, {os.path.getsize(args.path)} bytes")
+        if args.show is not None:
+            record = reader[args.show]
+            print(record)
+            print(record.replay().get_state())
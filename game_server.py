@@ -0,0 +1,343 @@
+import argparse
+import asyncio
+import logging
+import socket
+import sys
+import time
+
+from framing import FrameTooLarge
+from game_logic import BackgammonGame, MoveCache, PASS_TURN_CODE, PLAYER_O, PLAYER_X, decode_turn
+from wire import SUPPORTED_WIRE_FORMATS, WIRE_FORMAT_MESSAGE, WIRE_JSON, MessageStream
+
+DEFAULT_SERVER_PORT = 65433
+DEFAULT_MAX_MATCHES = 500
+# The legal turns of one doubles roll, kept in every move order, can take over 1 MB (13,517 turns seen).
+DEFAULT_MATCH_MEMORY_LIMIT = 4 * 1024 * 1024
+# The MoveCache every match shares is not charged to any match; it gets its own bound on top of
+# max_matches * match_memory_limit. A cached turn context averages about 10 KB.
+DEFAULT_MOVE_CACHE_MEMORY = 64 * 1024 * 1024
+REPORT_INTERVAL = 10.0
+SYMBOLS = {PLAYER_X: "X", PLAYER_O: "O"}
+
+logger = logging.getLogger(__name__)
+
+
+def _valid_roll(value):
+    return isinstance(value, int) and 1 <= value <= 6
+
+
+class PeerConnection(asyncio.BufferedProtocol):
+    """One client socket: the transport reads straight into its MessageStream, and each message goes to the match.
+
+    wire_format announcements are answered here, per connection, so the two players of a match may use different
+    wire formats; the session only ever sees decoded message dicts.
+    """
+
+    def __init__(self, server):
+        self.server = server
+        self.transport = None
+        self.session = None
+        self.player_id = None
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.wire = MessageStream()
+
+    def connection_made(self, transport):
+        self.transport = transport
+        self.server.on_connect(self)
+
+    def get_buffer(self, sizehint):
+        return self.wire.get_buffer(sizehint)
+
+    def buffer_updated(self, nbytes):
+        self.bytes_in += nbytes
+        self.wire.buffer_updated(nbytes)
+        framer = self.wire.framer
+        if self.session is None:
+            # Nothing is expected before pairing; just keep a chatty lobby client from filling the buffer.
+            if framer.buffered_bytes > framer.max_frame_size:
+                self.close()
+            return
+        try:
+            for message in self.wire.messages():
+                if self.transport.is_closing():
+                    break
+                if message.get("type") == WIRE_FORMAT_MESSAGE:
+                    if self.wire.send_format != message["format"]:
+                        self.transport.write(self.wire.switch_send_format(message["format"]))
+                else:
+                    self.session.on_message(self, message)
+        except FrameTooLarge as e:
+            self.session.abort(f"P{SYMBOLS[self.player_id]} sent an oversized message: {e}")
+        except ValueError as e:
+            self.session.abort(f"P{SYMBOLS[self.player_id]} sent an undecodable message: {e}")
+
+    def connection_lost(self, exc):
+        self.server.on_disconnect(self)
+
+    def send(self, message_dict):
+        if self.transport.is_closing():
+            return
+        data = self.wire.encode(message_dict)
+        self.bytes_out += len(data)
+        self.transport.write(data)
+
+    def notice(self, text):
+        # Shows up in p2p.py clients as a chat line.
+        self.send({"type": "chat", "sender_id": None, "message_text": text})
+
+    def buffered_bytes(self):
+        write_buffered = 0 if self.transport.is_closing() else self.transport.get_write_buffer_size()
+        return self.wire.framer.capacity + write_buffered
+
+    def close(self):
+        if not self.transport.is_closing():
+            self.transport.close()
+
+
+class MatchSession:
+    """State of one match between two connected clients, refereed by the server.
+
+    The server assigns identities like a p2p.py host, forwards every message to the other side and replays it
+    on its own BackgammonGame first, so a client that sends an out-of-turn or illegal action forfeits the match
+    instead of desynchronising it. Clients are plain p2p.py joiners.
+    """
+
+    def __init__(self, match_id, peer_x, peer_o, server, move_cache=None, memory_limit=DEFAULT_MATCH_MEMORY_LIMIT):
+        self.match_id = match_id
+        self.peers = {PLAYER_X: peer_x, PLAYER_O: peer_o}
+        self.server = server
+        self.memory_limit = memory_limit
+        self.game = BackgammonGame(move_cache=move_cache)
+        self.first_rolls = {PLAYER_X: None, PLAYER_O: None}
+        self.turns = 0
+        self.started = time.perf_counter()
+        self.finished = False
+        self.peak_memory = 0
+        for player_id, peer in self.peers.items():
+            peer.session = self
+            peer.player_id = player_id
+
+    def start(self):
+        for player_id, peer in self.peers.items():
+            peer.send({"type": "identity", "assigned_player_id": player_id, "assigned_symbol": SYMBOLS[player_id],
+                       "wire_formats": list(self.server.wire_formats)})
+
+    def memory_usage(self):
+        """Approximate bytes held for this match: game state, the legal turns of the roll being played and both
+        connections' read and write buffers.
+
+        The game's TurnContext is charged in full even when the shared MoveCache also holds it, since the game
+        keeps it alive after the cache evicts it.
+        """
+        game = self.game
+        game_bytes = (sys.getsizeof(game) + sys.getsizeof(game.__dict__) + sys.getsizeof(game.position.cells) +
+                      sys.getsizeof(game.dice) + sys.getsizeof(game.dice_used))
+        turn_bytes = game.turn_context.approximate_size() if game.turn_context is not None else 0
+        buffer_bytes = sum(peer.buffered_bytes() for peer in self.peers.values())
+        return {"game": game_bytes, "turns": turn_bytes, "buffers": buffer_bytes,
+                "total": game_bytes + turn_bytes + buffer_bytes}
+
+    def on_message(self, peer, message):
+        player_id = peer.player_id
+        opponent = self.peers[self.game.get_opponent(player_id)]
+        msg_type = message.get("type")
+        try:
+            error = self._referee(player_id, msg_type, message)
+        except (KeyError, TypeError, ValueError, IndexError) as e:
+            error = f"malformed {msg_type} message ({e})"
+        if error:
+            self.abort(f"P{SYMBOLS[player_id]} forfeits: {error}.")
+            return
+        opponent.send(message)
+
+        total = self.memory_usage()["total"]
+        self.peak_memory = max(self.peak_memory, total)
+        if total > self.memory_limit:
+            self.abort(f"Match {self.match_id} exceeded its memory limit ({total} > {self.memory_limit} bytes).")
+        elif msg_type == "game_over_notification":
+            self.finish()
+
+    def _referee(self, player_id, msg_type, message):
+        """Applies one client message to the server's game; returns an error string if it is not acceptable."""
+        game = self.game
+        if msg_type == "chat":
+            return None
+        if message["player_id" if msg_type != "game_over_notification" else "winner_id"] != player_id:
+            return f"{msg_type} sent for the other player"
+
+        if msg_type == "first_roll_exchange":
+            if game.first_roll_made or not _valid_roll(message["roll"]):
+                return "unexpected first roll"
+            self.first_rolls[player_id] = message["roll"]
+            x_roll, o_roll = self.first_rolls[PLAYER_X], self.first_rolls[PLAYER_O]
+            if x_roll is not None and o_roll is not None:
+                if x_roll == o_roll:
+                    # Both clients see the tie and re-roll on their own.
+                    self.first_rolls = {PLAYER_X: None, PLAYER_O: None}
+                else:
+                    game.current_player = PLAYER_X if x_roll > o_roll else PLAYER_O
+                    game.set_dice([x_roll, o_roll])
+                    game.first_roll_made = True
+            return None
+
+        if msg_type == "game_over_notification":
+            return None if game.winner == player_id else "false game over claim"
+        if not game.first_roll_made or game.winner is not None:
+            return f"{msg_type} outside of play"
+        if game.current_player != player_id:
+            return f"{msg_type} out of turn"
+
+        if msg_type == "action_roll_dice":
+            dice = message["rolled_dice"]
+            if game.dice or len(dice) != 2 or not all(_valid_roll(value) for value in dice):
+                return f"bad dice roll {dice}"
+            game.set_dice(dice)
+        elif msg_type == "action_submit_moves":
+            turn_code = message["turn_code"]
+            if not game.dice or not turn_code or not game.is_move_valid(player_id, turn_code):
+                return f"illegal moves {decode_turn(turn_code)} with dice {game.dice}"
+            game.apply_moves(player_id, turn_code)
+            self.turns += 1
+        elif msg_type == "action_pass_turn":
+            if not game.dice or not game.is_move_valid(player_id, PASS_TURN_CODE):
+                return "pass while moves are available"
+            game.switch_player()
+            self.turns += 1
+        else:
+            return f"unknown message type {msg_type!r}"
+        return None
+
+    def finish(self):
+        if self.finished:
+            return
+        self.finished = True
+        for peer in self.peers.values():
+            peer.close()
+        self.server.on_match_end(self)
+
+    def abort(self, reason):
+        if self.finished:
+            return
+        logger.info("Match %d aborted: %s", self.match_id, reason)
+        for peer in self.peers.values():
+            peer.notice(reason)
+        self.finish()
+
+    def on_peer_lost(self, peer):
+        if self.game.winner is not None:
+            self.finish()
+        else:
+            self.abort(f"P{SYMBOLS[peer.player_id]} disconnected.")
+
+
+class GameServer:
+    """Hosts many concurrent matches in one process on a single asyncio event loop.
+
+    Clients are paired in arrival order: the first to wait in the lobby plays X. While `max_matches` matches
+    are running, new clients are told the server is full and disconnected. Each match is charged for its own
+    game state, legal-turn context and socket buffers and is aborted once that exceeds `match_memory_limit` bytes,
+    so one stalled or flooding client cannot grow the server without bound. The move cache the matches share is
+    held to `move_cache_memory` bytes by evicting its least recently used turn contexts.
+    """
+
+    def __init__(self, host="0.0.0.0", port=DEFAULT_SERVER_PORT, max_matches=DEFAULT_MAX_MATCHES,
+                 match_memory_limit=DEFAULT_MATCH_MEMORY_LIMIT, move_cache=None, wire_formats=SUPPORTED_WIRE_FORMATS,
+                 move_cache_memory=DEFAULT_MOVE_CACHE_MEMORY):
+        self.host = host
+        self.port = port
+        self.max_matches = max_matches
+        self.match_memory_limit = match_memory_limit
+        self.wire_formats = tuple(wire_formats)
+        self.move_cache = move_cache if move_cache is not None else MoveCache(max_bytes=move_cache_memory)
+        self.matches = {}
+        self.lobby = None
+        self.next_match_id = 0
+        self.matches_finished = 0
+        self.matches_aborted = 0
+        self.clients_rejected = 0
+        self._server = None
+
+    def on_connect(self, peer):
+        if len(self.matches) >= self.max_matches:
+            self.clients_rejected += 1
+            peer.notice(f"Server full ({self.max_matches} matches running). Try again later.")
+            peer.close()
+        elif self.lobby is None:
+            self.lobby = peer
+        else:
+            session = MatchSession(self.next_match_id, self.lobby, peer, self, self.move_cache,
+                                   self.match_memory_limit)
+            self.lobby = None
+            self.next_match_id += 1
+            self.matches[session.match_id] = session
+            session.start()
+
+    def on_disconnect(self, peer):
+        if peer is self.lobby:
+            self.lobby = None
+        elif peer.session is not None:
+            peer.session.on_peer_lost(peer)
+
+    def on_match_end(self, session):
+        del self.matches[session.match_id]
+        if session.game.winner is None:
+            self.matches_aborted += 1
+            return
+        self.matches_finished += 1
+        logger.debug("Match %d: P%s wins after %d turns in %.2fs (peak %d bytes)", session.match_id,
+                     SYMBOLS[session.game.winner], session.turns, time.perf_counter() - session.started,
+                     session.peak_memory)
+
+    def memory_usage(self):
+        usages = [session.memory_usage()["total"] for session in self.matches.values()]
+        return {"matches": len(usages), "total": sum(usages), "max": max(usages, default=0),
+                "move_cache": self.move_cache.size_bytes}
+
+    def summary(self):
+        memory = self.memory_usage()
+        return (f"active {memory['matches']}  finished {self.matches_finished}  aborted {self.matches_aborted}  "
+                f"rejected {self.clients_rejected}  match memory {memory['total']} bytes "
+                f"(max {memory['max']})  move cache {memory['move_cache']} bytes")
+
+    async def serve(self, report_interval=REPORT_INTERVAL):
+        loop = asyncio.get_running_loop()
+        self._server = await loop.create_server(lambda: PeerConnection(self), self.host, self.port,
+                                                reuse_address=True,
+                                                backlog=max(socket.SOMAXCONN, 2 * self.max_matches))
+        self.port = self._server.sockets[0].getsockname()[1]
+        logger.info("Serving matches on %s:%d (max %d concurrent)", self.host, self.port, self.max_matches)
+        async with self._server:
+            while True:
+                await asyncio.sleep(report_interval)
+                logger.info("%s", self.summary())
+
+    def close(self):
+        if self._server is not None:
+            self._server.close()
+        for session in list(self.matches.values()):
+            session.abort("Server shutting down.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Host many concurrent backgammon matches for p2p.py clients.")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=DEFAULT_SERVER_PORT)
+    parser.add_argument("--max-matches", type=int, default=DEFAULT_MAX_MATCHES)
+    parser.add_argument("--match-memory", type=int, default=DEFAULT_MATCH_MEMORY_LIMIT,
+                        help="per-match byte budget for game state, legal turns and socket buffers")
+    parser.add_argument("--move-cache-memory", type=int, default=DEFAULT_MOVE_CACHE_MEMORY,
+                        help="byte budget for the legal-turn cache shared by all matches")
+    parser.add_argument("--report-interval", type=float, default=REPORT_INTERVAL)
+    parser.add_argument("--json-only", action="store_true", help="do not offer clients the binary wire format")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    logging.getLogger("game_logic").setLevel(logging.WARNING)
+
+    game_server = GameServer(args.host, args.port, args.max_matches, args.match_memory,
+                             wire_formats=(WIRE_JSON,) if args.json_only else SUPPORTED_WIRE_FORMATS,
+                             move_cache_memory=args.move_cache_memory)
+    try:
+        asyncio.run(game_server.serve(args.report_interval))
+    except KeyboardInterrupt:
+        print(game_server.summary())
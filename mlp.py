@@ -0,0 +1,121 @@
+import os
+import threading
+import time
+
+import numpy as np
+
+from evaluator import choose_move_by_evaluator, evaluator_strategy
+from features import encode_positions, feature_width
+from game_logic import PLAYER_X
+
+DEFAULT_WEIGHTS_PATH = "mlp_weights.npz"
+WEIGHTS_PATH_ENV = "BACKGAMMON_MLP_WEIGHTS"
+DEFAULT_HIDDEN_SIZES = (80,)
+
+
+def _sigmoid(x):
+    return 1.0 / (1.0 + np.exp(-x))
+
+
+class MLPEvaluator:
+    """Sigmoid multilayer perceptron over features.encode_positions, estimating P(X wins) for a position.
+
+    Weights are float32 (in, out) matrices with bias vectors; the last layer has a single output. evaluate()
+    scores a whole candidate array in one forward pass and keeps per-call timing counters.
+    """
+
+    def __init__(self, weights, biases, include_pips=False, include_structure=False):
+        if len(weights) != len(biases) or not weights:
+            raise ValueError("MLPEvaluator needs one bias vector per weight matrix.")
+        expected_inputs = feature_width(include_pips, include_structure)
+        if weights[0].shape[0] != expected_inputs or weights[-1].shape[1] != 1:
+            raise ValueError(f"Weight shapes {[w.shape for w in weights]} do not map {expected_inputs} "
+                             f"features to one output.")
+        self.weights = [np.ascontiguousarray(w, dtype=np.float32) for w in weights]
+        self.biases = [np.ascontiguousarray(b, dtype=np.float32) for b in biases]
+        self.include_pips = include_pips
+        self.include_structure = include_structure
+        self.reset_timers()
+
+    @classmethod
+    def random(cls, hidden_sizes=DEFAULT_HIDDEN_SIZES, include_pips=False, include_structure=False, seed=0):
+        rng = np.random.default_rng(seed)
+        sizes = [feature_width(include_pips, include_structure), *hidden_sizes, 1]
+        weights = [rng.normal(0.0, 1.0 / np.sqrt(n_in), (n_in, n_out)).astype(np.float32)
+                   for n_in, n_out in zip(sizes, sizes[1:])]
+        biases = [np.zeros(n_out, dtype=np.float32) for n_out in sizes[1:]]
+        return cls(weights, biases, include_pips, include_structure)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            num_layers = int(data["num_layers"])
+            return cls([data[f"w{i}"] for i in range(num_layers)], [data[f"b{i}"] for i in range(num_layers)],
+                       bool(data["include_pips"]), bool(data["include_structure"]))
+
+    def save(self, path):
+        arrays = {f"w{i}": w for i, w in enumerate(self.weights)}
+        arrays.update({f"b{i}": b for i, b in enumerate(self.biases)})
+        np.savez(path, num_layers=len(self.weights), include_pips=self.include_pips,
+                 include_structure=self.include_structure, **arrays)
+
+    def reset_timers(self):
+        self.calls = 0
+        self.positions = 0
+        self.encode_time = 0.0
+        self.forward_time = 0.0
+        self.max_call_time = 0.0
+
+    def timing_stats(self):
+        total = self.encode_time + self.forward_time
+        return {
+            "calls": self.calls,
+            "positions": self.positions,
+            "encode_time": self.encode_time,
+            "forward_time": self.forward_time,
+            "mean_call_ms": total / self.calls * 1000 if self.calls else 0.0,
+            "max_call_ms": self.max_call_time * 1000,
+            "positions_per_second": self.positions / total if total else 0.0,
+        }
+
+    def forward(self, features):
+        """P(X wins) for each row of an (M, feature_width) float32 array."""
+        activations = features
+        for w, b in zip(self.weights, self.biases):
+            activations = _sigmoid(activations @ w + b)
+        return activations[:, 0]
+
+    def evaluate(self, candidates, player_id):
+        """Scores candidate positions (after player_id's move, so the opponent is on roll) for player_id."""
+        start = time.perf_counter()
+        features = encode_positions(candidates, 1 - player_id, self.include_pips, self.include_structure)
+        encoded = time.perf_counter()
+        x_wins = self.forward(features)
+        done = time.perf_counter()
+        self.calls += 1
+        self.positions += len(candidates)
+        self.encode_time += encoded - start
+        self.forward_time += done - encoded
+        self.max_call_time = max(self.max_call_time, done - start)
+        return x_wins if player_id == PLAYER_X else 1.0 - x_wins
+
+    def as_strategy(self):
+        return evaluator_strategy(self.evaluate)
+
+
+_default_evaluator = None
+_default_lock = threading.Lock()
+
+
+def default_evaluator():
+    """The evaluator loaded from $BACKGAMMON_MLP_WEIGHTS (or mlp_weights.npz), loaded once per process."""
+    global _default_evaluator
+    with _default_lock:
+        if _default_evaluator is None:
+            _default_evaluator = MLPEvaluator.load(os.environ.get(WEIGHTS_PATH_ENV, DEFAULT_WEIGHTS_PATH))
+        return _default_evaluator
+
+
+def choose_move(game_state, player_id, possible_moves):
+    """Drop-in for ai_player.choose_move backed by default_evaluator()."""
+    return choose_move_by_evaluator(default_evaluator().evaluate, game_state, player_id, possible_moves)
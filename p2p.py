@@ -1,18 +1,22 @@
+import asyncio
 import socket
-import json
+import logging
 import random
-import threading
-import time
-import copy
 import traceback
-from game_logic import BackgammonGame , PLAYER_X , PLAYER_O , NUM_POINTS
+from framing import FrameTooLarge
+from game_logic import BackgammonGame , MoveCache , PLAYER_X , PLAYER_O , NUM_POINTS , PASS_TURN_CODE , choose_turn_code , decode_turn
+from wire import MessageStream , SUPPORTED_WIRE_FORMATS , WIRE_JSON , choose_wire_format
 import ai_player
 
 DEFAULT_PORT = 65433
 BUFFER_SIZE = 4096
 
-peer_socket = None
-game_instance = BackgammonGame ()
+peer_reader = None
+peer_writer = None
+listener_task = None
+wire = None
+move_cache = MoveCache ()
+game_instance = BackgammonGame ( move_cache=move_cache )
 my_player_id = None
 opponent_player_id = None
 my_player_symbol = None
@@ -20,8 +24,9 @@ opponent_player_symbol = None
 
 my_first_roll_value = None
 opponent_first_roll_value = None
-first_roll_event = threading.Event ()
-game_started_event = threading.Event ()
+first_roll_event = asyncio.Event ()
+game_started_event = asyncio.Event ()
+game_over_event = asyncio.Event ()
 global is_local_player_ai
 is_local_player_ai = False
 
@@ -170,70 +175,76 @@ def print_board_p2p() :
     print ( "=" * 60 + "\n" )
 
 
+def peer_connected() :
+    return peer_writer is not None and not peer_writer.is_closing ()
+
+
 def send_message_to_peer(message_dict) :
-    global peer_socket
-    if peer_socket :
+    # StreamWriter.write only buffers; listen_to_peer drains after each dispatched message.
+    if peer_connected () :
         try :
-            peer_socket.sendall ( (json.dumps ( message_dict ) + "\n").encode ( 'utf-8' ) )
-        except socket.error as e :
-            print ( f"Error sending message: {e}. Opponent may have disconnected." )
-            peer_socket = None
-            handle_disconnect ()
+            peer_writer.write ( wire.encode ( message_dict ) )
         except Exception as e :
             print ( f"An unexpected error occurred while sending: {e}" )
-            peer_socket = None
             handle_disconnect ()
 
 
-def listen_to_peer() :
-    global peer_socket
-    buffer = ""
-    while peer_socket :
+def switch_wire_format(wire_format) :
+    if peer_connected () and wire.send_format != wire_format :
+        peer_writer.write ( wire.switch_send_format ( wire_format ) )
+        print ( f"Sending to opponent in {wire_format} format." )
+
+
+async def listen_to_peer() :
+    while peer_connected () :
         try :
-            data = peer_socket.recv ( BUFFER_SIZE )
+            data = await peer_reader.read ( BUFFER_SIZE )
             if not data :
                 print ( "Opponent disconnected (received no data)." )
-                peer_socket = None
                 handle_disconnect ()
                 break
 
-            buffer += data.decode ( 'utf-8' )
-            while "\n" in buffer :
-                message_str , buffer = buffer.split ( "\n" , 1 )
-                if not message_str.strip () :
+            wire.feed ( data )
+            while peer_connected () :
+                try :
+                    message = wire.next_message ()
+                except FrameTooLarge :
+                    raise
+                except ValueError as e :
+                    print ( f"Invalid message received: {e}" )
                     continue
-                message = json.loads ( message_str )
+                if message is None :
+                    break
                 handle_incoming_message ( message )
-        except socket.timeout :
-            continue
+            if peer_connected () :
+                await peer_writer.drain ()
         except ConnectionResetError :
             print ( "Opponent connection reset." )
-            peer_socket = None
             handle_disconnect ()
             break
-        except json.JSONDecodeError :
-            print ( f"Invalid JSON received: '{message_str[:100]}...'" )
+        except FrameTooLarge as e :
+            print ( f"Dropping connection: {e}" )
+            handle_disconnect ()
+            break
         except Exception as e :
-            print ( f"Error in listener thread: {e}" )
+            print ( f"Error in listener task: {e}" )
             traceback.print_exc ()
-            peer_socket = None
             handle_disconnect ()
             break
-    print ( "Listener thread stopped." )
+    print ( "Listener task stopped." )
 
 
 def handle_disconnect() :
-    global game_instance , peer_socket
     if game_instance.winner is None :
         print ( "Opponent has disconnected. Game cannot continue." )
-    if peer_socket :
+    if peer_connected () :
         try :
-            peer_socket.close ()
-        except :
+            peer_writer.close ()
+        except Exception :
             pass
-        peer_socket = None
     first_roll_event.set ()
     game_started_event.set ()
+    game_over_event.set ()
 
 
 def handle_incoming_message(message) :
@@ -250,6 +261,10 @@ def handle_incoming_message(message) :
         print (
             f"Identity received: You are Player {my_player_symbol} (ID: {my_player_id}). Opponent is Player {opponent_player_symbol}." )
 
+        wire_format = choose_wire_format ( message.get ( "wire_formats" , [] ) )
+        if wire_format != WIRE_JSON :
+            switch_wire_format ( wire_format )
+
         my_first_roll_value = random.randint ( 1 , 6 )
         print ( f"You rolled a {my_first_roll_value} for first turn determination." )
         send_message_to_peer ( {
@@ -258,6 +273,10 @@ def handle_incoming_message(message) :
             "roll" : my_first_roll_value
         } )
 
+    elif msg_type == "wire_format" :
+        print ( f"Opponent is sending in {message['format']} format." )
+        switch_wire_format ( message["format"] )
+
     elif msg_type == "first_roll_exchange" :
         peer_id = message["player_id"]
         roll_value = message["roll"]
@@ -291,13 +310,8 @@ def handle_incoming_message(message) :
                 initial_dice = sorted ( [actual_player_x_roll , actual_player_o_roll] , reverse=True )
 
                 game_instance.current_player = first_player
-                game_instance.dice = list ( initial_dice )
-                if initial_dice[0] == initial_dice[1] :
-                    game_instance.dice_used = {initial_dice[0] : [False , False , False , False]}
-                else :
-                    game_instance.dice_used = {val : False for val in initial_dice}
+                game_instance.set_dice ( initial_dice )
                 game_instance.first_roll_made = True
-                game_instance._update_log_prefix ()
 
                 print ( f"Player {format_player_id_display ( first_player )} wins the first roll and starts." )
                 print ( f"Initial dice for the first turn: {game_instance.dice}" )
@@ -309,29 +323,16 @@ def handle_incoming_message(message) :
             print (
                 f"Opponent (Player {format_player_id_display ( opponent_player_id )}) rolled: {message['rolled_dice']}" )
             game_instance.current_player = opponent_player_id
-            game_instance.dice = list ( message['rolled_dice'] )
-            if game_instance.dice[0] == game_instance.dice[1] :
-                game_instance.dice_used = {game_instance.dice[0] : [False , False , False , False]}
-            else :
-                game_instance.dice_used = {val : False for val in game_instance.dice}
-            game_instance.doubles_played_count = 0
-            game_instance._update_log_prefix ()
+            game_instance.set_dice ( message['rolled_dice'] )
             print_board_p2p ()
         else :
             print ( f"[DEBUG] Received own dice roll? {message}. Current dice: {game_instance.dice}" )
 
     elif msg_type == "action_submit_moves" :
         if message["player_id"] == opponent_player_id :
-            moves_raw = message["moves"]
-            parsed_moves = []
-            try :
-                for m_part in moves_raw :
-                    start = m_part[0] if m_part[0] in ['BAR' , 'OFF'] else int ( m_part[0] )
-                    end = m_part[1] if m_part[1] in ['BAR' , 'OFF'] else int ( m_part[1] )
-                    parsed_moves.append ( (start , end) )
-            except (ValueError , TypeError , IndexError) as e :
-                print ( f"ERROR: Malformed move data from opponent: {moves_raw} - {e}" )
-                return
+            # The wire layer fills in "turn_code", also for peers that only send the "moves" pairs.
+            turn_code = message["turn_code"]
+            parsed_moves = decode_turn ( turn_code )
 
             print (
                 f"Opponent (Player {format_player_id_display ( opponent_player_id )}) submitted moves: {parsed_moves}" )
@@ -341,20 +342,19 @@ def handle_incoming_message(message) :
                     f"WARNING: Received moves from P{format_player_id_display ( opponent_player_id )}, but current local player is P{format_player_id_display ( game_instance.current_player )}. Adjusting." )
                 game_instance.current_player = opponent_player_id
 
-            is_valid_opponent_move = game_instance.is_move_valid ( opponent_player_id , parsed_moves )
+            is_valid_opponent_move = game_instance.is_move_valid ( opponent_player_id , turn_code )
             if is_valid_opponent_move :
-                game_instance.apply_moves ( opponent_player_id , parsed_moves )
+                game_instance.apply_moves ( opponent_player_id , turn_code )
                 print ( "Opponent's moves applied." )
                 print_board_p2p ()
                 if game_instance.winner is not None :
                     print ( f"Game Over! Player {format_player_id_display ( game_instance.winner )} wins!" )
+                    game_over_event.set ()
                 elif game_instance.current_player == my_player_id :
                     print ( "It's your turn!" )
                     if not game_instance.dice :
-                        time.sleep ( 0.1 )
                         request_roll_and_send ()
                     else :
-                        time.sleep ( 0.1 )
                         make_move_or_pass_and_send ()
             else :
                 print (
@@ -369,13 +369,12 @@ def handle_incoming_message(message) :
                     f"WARNING: Received pass from P{format_player_id_display ( opponent_player_id )}, but local current player P{format_player_id_display ( game_instance.current_player )}. Adjusting." )
                 game_instance.current_player = opponent_player_id
 
-            if game_instance.is_move_valid ( opponent_player_id , [] ) :
+            if game_instance.is_move_valid ( opponent_player_id , PASS_TURN_CODE ) :
                 game_instance.switch_player ()
                 print ( "Opponent's pass processed." )
                 print_board_p2p ()
                 if game_instance.current_player == my_player_id :
                     print ( "It's your turn!" )
-                    time.sleep ( 0.1 )
                     request_roll_and_send ()
             else :
                 print (
@@ -411,7 +410,6 @@ def request_roll_and_send() :
             "rolled_dice" : rolled_dice
         } )
         print_board_p2p ()
-        time.sleep ( 0.1 )
         make_move_or_pass_and_send ()
     elif game_instance.current_player != my_player_id :
         print ( "Not your turn to roll (or waiting for opponent's previous action)." )
@@ -425,66 +423,51 @@ def make_move_or_pass_and_send() :
     if game_instance.current_player != my_player_id or not game_instance.dice :
         return
 
-    temp_game_for_possible_moves = BackgammonGame ()
-    temp_game_for_possible_moves.board = copy.deepcopy ( game_instance.board )
-    temp_game_for_possible_moves.bar = {int ( k ) : v for k , v in game_instance.bar.items ()}
-    temp_game_for_possible_moves.borne_off = {int ( k ) : v for k , v in game_instance.borne_off.items ()}
-    temp_game_for_possible_moves.current_player = game_instance.current_player
-    temp_game_for_possible_moves.dice = list ( game_instance.dice )
-    temp_game_for_possible_moves.dice_used = copy.deepcopy ( game_instance.dice_used )
-
-    possible_move_sequences = temp_game_for_possible_moves.get_possible_moves (
-        my_player_id ,
-        temp_game_for_possible_moves.dice ,
-        temp_game_for_possible_moves.board ,
-        temp_game_for_possible_moves.bar
-    )
-
-    chosen_sequence_tuples = []
+    possible_turn_codes = game_instance.get_legal_turn_codes ( my_player_id , unique_positions=True )
+
+    chosen_turn_code = PASS_TURN_CODE
     player_descriptor = f"P{format_player_id_display ( my_player_id )}"
 
-    if possible_move_sequences :
+    if possible_turn_codes :
         if is_local_player_ai :
             player_descriptor += " (AI)"
             print ( f"{player_descriptor} is thinking..." )
             current_game_state_for_ai = game_instance.get_state ()
-            chosen_sequence_tuples = ai_player.choose_move (
-                current_game_state_for_ai ,
-                my_player_id ,
-                possible_move_sequences
-            )
+            try :
+                chosen_turn_code = choose_turn_code (
+                    ai_player.choose_move ,
+                    current_game_state_for_ai ,
+                    my_player_id ,
+                    possible_turn_codes
+                )
+            except (ValueError , TypeError , IndexError) as e :
+                print ( f"!!! WARNING: {player_descriptor} returned a malformed sequence: {e}" )
+                chosen_turn_code = possible_turn_codes[0]
 
-            if chosen_sequence_tuples and chosen_sequence_tuples not in possible_move_sequences :
+            if chosen_turn_code and chosen_turn_code not in possible_turn_codes :
                 print (
-                    f"!!! WARNING: {player_descriptor} returned an invalid sequence {chosen_sequence_tuples} not in list of {len ( possible_move_sequences )} valid_sequences. Defaulting to first valid move." )
-                chosen_sequence_tuples = possible_move_sequences[0]
-            elif not chosen_sequence_tuples and possible_move_sequences :
+                    f"!!! WARNING: {player_descriptor} returned an invalid sequence {decode_turn ( chosen_turn_code )} not in list of {len ( possible_turn_codes )} valid_sequences. Defaulting to first valid move." )
+                chosen_turn_code = possible_turn_codes[0]
+            elif not chosen_turn_code and possible_turn_codes :
                 print (
                     f"!!! WARNING: {player_descriptor} chose to pass, but moves were available. AI should return a valid move or an empty list if it calculates no moves from given options." )
         else :
             player_descriptor += " (Human/Random)"
             print ( f"{player_descriptor} (randomly) choosing a move..." )
-            chosen_sequence_tuples = random.choice ( possible_move_sequences )
-
-        json_safe_sequence = []
-        if chosen_sequence_tuples :
-            for move_tuple in chosen_sequence_tuples :
-                start_val , end_val = move_tuple
-                json_safe_sequence.append ( [
-                    str ( start_val ) if isinstance ( start_val , int ) else start_val ,
-                    str ( end_val ) if isinstance ( end_val , int ) else end_val
-                ] )
-            print ( f"{player_descriptor} chose to move: {json_safe_sequence} (using dice: {game_instance.dice})" )
+            chosen_turn_code = random.choice ( possible_turn_codes )
+
+        if chosen_turn_code :
+            print ( f"{player_descriptor} chose to move: {decode_turn ( chosen_turn_code )} (using dice: {game_instance.dice})" )
         else :
-            print ( f"{player_descriptor} chose to pass (no moves in chosen_sequence_tuples)." )
+            print ( f"{player_descriptor} chose to pass (no moves in chosen turn)." )
 
-        if chosen_sequence_tuples and game_instance.is_move_valid ( my_player_id , chosen_sequence_tuples ) :
-            game_instance.apply_moves ( my_player_id , chosen_sequence_tuples )
+        if chosen_turn_code and game_instance.is_move_valid ( my_player_id , chosen_turn_code ) :
+            game_instance.apply_moves ( my_player_id , chosen_turn_code )
             print ( "Moves applied locally." )
             send_message_to_peer ( {
                 "type" : "action_submit_moves" ,
                 "player_id" : my_player_id ,
-                "moves" : json_safe_sequence
+                "turn_code" : chosen_turn_code
             } )
             print_board_p2p ()
             if game_instance.winner is not None :
@@ -496,17 +479,16 @@ def make_move_or_pass_and_send() :
                 handle_disconnect ()
             elif game_instance.current_player == my_player_id and game_instance.dice :
                 print ( f"{player_descriptor} has more moves with the current dice." )
-                time.sleep ( 0.1 )
                 make_move_or_pass_and_send ()
             elif game_instance.current_player == opponent_player_id :
                 print ( f"Turn passed to opponent P{format_player_id_display ( opponent_player_id )}." )
 
-        elif not chosen_sequence_tuples :
+        elif not chosen_turn_code :
             print ( f"{player_descriptor} has no chosen moves or AI passed. Validating pass." )
             pass_turn_and_send ()
         else :
             print (
-                f"!!! ERROR ({player_descriptor}): Auto-chosen/AI move was invalid by local check: {chosen_sequence_tuples} with {game_instance.dice}. Passing." )
+                f"!!! ERROR ({player_descriptor}): Auto-chosen/AI move was invalid by local check: {decode_turn ( chosen_turn_code )} with {game_instance.dice}. Passing." )
             pass_turn_and_send ()
     else :
         print ( f"No possible moves for {player_descriptor}. Passing turn." )
@@ -524,7 +506,7 @@ def pass_turn_and_send() :
     if game_instance.current_player != my_player_id :
         return
 
-    if game_instance.is_move_valid ( my_player_id , [] ) :
+    if game_instance.is_move_valid ( my_player_id , PASS_TURN_CODE ) :
         current_dice_before_pass = list ( game_instance.dice )
         game_instance.switch_player ()
         print ( f"{player_descriptor} passed turn locally (dice were {current_dice_before_pass})." )
@@ -540,38 +522,45 @@ def pass_turn_and_send() :
         print_board_p2p ()
 
 
-def connect_as_host(port=DEFAULT_PORT) :
-    global peer_socket , my_player_id , opponent_player_id , my_player_symbol , opponent_player_symbol , game_instance
+async def connect_as_host(port=DEFAULT_PORT) :
+    global peer_reader , peer_writer , listener_task , wire , my_player_id , opponent_player_id , my_player_symbol
+    global opponent_player_symbol , game_instance , my_first_roll_value
 
     my_player_id = PLAYER_X
     my_player_symbol = "X"
     opponent_player_id = PLAYER_O
     opponent_player_symbol = "O"
-    game_instance = BackgammonGame ()
+    game_instance = BackgammonGame ( move_cache=move_cache )
+
+    connected = asyncio.get_running_loop ().create_future ()
 
-    server_sock = socket.socket ( socket.AF_INET , socket.SOCK_STREAM )
-    server_sock.setsockopt ( socket.SOL_SOCKET , socket.SO_REUSEADDR , 1 )
+    def on_connect(reader , writer) :
+        if connected.done () :
+            writer.close ()
+        else :
+            connected.set_result ( (reader , writer) )
+
+    server = None
     try :
         host_ip = get_local_ip ()
-        server_sock.bind ( (host_ip , port) )
-        server_sock.listen ( 1 )
+        server = await asyncio.start_server ( on_connect , host_ip , port , reuse_address=True , backlog=1 )
         player_type_str = "(AI)" if is_local_player_ai else "(Human/Random)"
         print ( f"Hosting on {host_ip}:{port} as Player X {player_type_str}. Waiting for opponent..." )
 
-        conn , addr = server_sock.accept ()
-        peer_socket = conn
-        peer_socket.settimeout ( 5 )
-        print ( f"Opponent connected from {addr}" )
+        peer_reader , peer_writer = await connected
+        wire = MessageStream ()
+        server.close ()
+        print ( f"Opponent connected from {peer_writer.get_extra_info ( 'peername' )}" )
 
         send_message_to_peer ( {
             "type" : "identity" ,
             "assigned_player_id" : opponent_player_id ,
-            "assigned_symbol" : opponent_player_symbol
+            "assigned_symbol" : opponent_player_symbol ,
+            "wire_formats" : list ( SUPPORTED_WIRE_FORMATS )
         } )
 
-        threading.Thread ( target=listen_to_peer , daemon=True ).start ()
+        listener_task = asyncio.create_task ( listen_to_peer () )
 
-        global my_first_roll_value
         my_first_roll_value = random.randint ( 1 , 6 )
         print ( f"You (Host - P{my_player_symbol}) rolled a {my_first_roll_value} for first turn determination." )
         send_message_to_peer ( {
@@ -583,41 +572,40 @@ def connect_as_host(port=DEFAULT_PORT) :
     except Exception as e :
         print ( f"Error hosting game: {e}" )
         traceback.print_exc ()
-        if peer_socket : peer_socket.close ()
-        if server_sock : server_sock.close ()
+        if peer_writer : peer_writer.close ()
+        if server : server.close ()
         return False
 
 
-def connect_as_joiner(host_ip , port=DEFAULT_PORT) :
-    global peer_socket , game_instance
-    game_instance = BackgammonGame ()
+async def connect_as_joiner(host_ip , port=DEFAULT_PORT) :
+    global peer_reader , peer_writer , listener_task , wire , game_instance
+    game_instance = BackgammonGame ( move_cache=move_cache )
     try :
         player_type_str = "(AI)" if is_local_player_ai else "(Human/Random)"
         print ( f"Attempting to connect to {host_ip}:{port} as Player O {player_type_str}..." )
-        sock = socket.socket ( socket.AF_INET , socket.SOCK_STREAM )
-        sock.connect ( (host_ip , port) )
-        peer_socket = sock
-        peer_socket.settimeout ( 5 )
+        peer_reader , peer_writer = await asyncio.open_connection ( host_ip , port )
+        wire = MessageStream ()
         print ( "Connected to host!" )
 
-        threading.Thread ( target=listen_to_peer , daemon=True ).start ()
+        listener_task = asyncio.create_task ( listen_to_peer () )
         return True
     except Exception as e :
         print ( f"Error joining game: {e}" )
         traceback.print_exc ()
-        if peer_socket : peer_socket.close ()
+        if peer_writer : peer_writer.close ()
         return False
 
 
-def game_loop() :
-    global game_instance
+async def game_loop() :
     print ( "Waiting for first roll determination to complete..." )
-    if not first_roll_event.wait ( timeout=30 ) :
+    try :
+        await asyncio.wait_for ( first_roll_event.wait () , timeout=30 )
+    except asyncio.TimeoutError :
         print ( "Timeout waiting for first roll determination. Exiting." )
         handle_disconnect ()
         return
 
-    if not peer_socket :
+    if not peer_connected () :
         print ( "Game cannot start, opponent disconnected during setup." )
         return
 
@@ -627,36 +615,65 @@ def game_loop() :
     if game_instance.current_player == my_player_id :
         player_type_str = "(AI)" if is_local_player_ai else "(Human/Random)"
         print ( f"You {player_type_str} start the first turn with the initial dice: {game_instance.dice}." )
-        time.sleep ( 0.2 )
         make_move_or_pass_and_send ()
     else :
         print ( "Opponent starts the first turn. Waiting for their move..." )
 
-    while game_instance.winner is None and peer_socket is not None :
-        try :
-            time.sleep ( 1 )
-        except EOFError :
-            time.sleep ( 1 )
-        except KeyboardInterrupt :
-            print ( "\nKeyboard interrupt. Exiting game." )
-            if peer_socket :
-                try :
-                    send_message_to_peer ( {"type" : "chat" , "sender_id" : my_player_id ,
-                                            "message_text" : "Opponent left (KeyboardInterrupt)."} )
-                except :
-                    pass
-            handle_disconnect ()
-            break
+    # Every later turn is driven from listen_to_peer as the opponent's messages arrive.
+    try :
+        await game_over_event.wait ()
+    except asyncio.CancelledError :
+        print ( "\nKeyboard interrupt. Exiting game." )
+        send_message_to_peer ( {"type" : "chat" , "sender_id" : my_player_id ,
+                                "message_text" : "Opponent left (KeyboardInterrupt)."} )
+        handle_disconnect ()
+        raise
 
     if game_instance.winner is not None :
         print ( f"Game has ended. Winner: Player {format_player_id_display ( game_instance.winner )}" )
-    elif peer_socket is None :
+    else :
         print ( "Game has ended due to disconnection." )
     print ( "Exiting game loop." )
 
 
+async def run_p2p(mode , host_ip , port) :
+    if mode == 'host' :
+        success = await connect_as_host ( port )
+    else :
+        success = await connect_as_joiner ( host_ip , port )
+
+    if not success :
+        print ( "Failed to start P2P game. Exiting." )
+        return
+
+    try :
+        await game_loop ()
+    except Exception as e :
+        print ( f"An error occurred in the main game loop: {e}" )
+        traceback.print_exc ()
+    finally :
+        if peer_writer :
+            print ( "Closing peer connection." )
+            peer_writer.close ()
+            try :
+                await peer_writer.wait_closed ()
+            except Exception :
+                pass
+        if listener_task :
+            listener_task.cancel ()
+        print ( "Game finished. Goodbye!" )
+
+
 if __name__ == "__main__" :
 
+    # Game logic reports through the `game_logic` logger; keep its per-move trace on the console. Only that
+    # logger is turned up, so asyncio's own debug output stays out of the prompts.
+    game_logic_handler = logging.StreamHandler ()
+    game_logic_handler.setFormatter ( logging.Formatter ( "%(message)s" ) )
+    game_logic_logger = logging.getLogger ( "game_logic" )
+    game_logic_logger.addHandler ( game_logic_handler )
+    game_logic_logger.setLevel ( logging.DEBUG )
+    game_logic_logger.propagate = False
 
     print ( "Welcome to P2P Backgammon!" )
 
@@ -672,34 +689,15 @@ if __name__ == "__main__" :
         is_local_player_ai = False
         print ( "Local player will be controlled by Human (current: random moves)." )
 
-    success = False
+    host_ip = None
     if mode == 'host' :
         port_str = input ( f"Enter port to host on (default {DEFAULT_PORT}): " ).strip ()
-        port = int ( port_str ) if port_str.isdigit () else DEFAULT_PORT
-        success = connect_as_host ( port )
     else :
         host_ip = input ( "Enter host IP address: " ).strip ()
         port_str = input ( f"Enter host port (default {DEFAULT_PORT}): " ).strip ()
-        port = int ( port_str ) if port_str.isdigit () else DEFAULT_PORT
-        success = connect_as_joiner ( host_ip , port )
+    port = int ( port_str ) if port_str.isdigit () else DEFAULT_PORT
 
-    if success :
-        try :
-            game_loop ()
-        except Exception as e :
-            print ( f"An error occurred in the main game loop: {e}" )
-            traceback.print_exc ()
-        finally :
-            if peer_socket :
-                print ( "Closing peer socket." )
-                try :
-                    peer_socket.shutdown ( socket.SHUT_RDWR )
-                except :
-                    pass
-                try :
-                    peer_socket.close ()
-                except :
-                    pass
-            print ( "Game finished. Goodbye!" )
-    else :
-        print ( "Failed to start P2P game. Exiting." )
\ No newline at end of file
+    try :
+        asyncio.run ( run_p2p ( mode , host_ip , port ) )
+    except KeyboardInterrupt :
+        print ( "Interrupted. Goodbye!" )
@@ -0,0 +1,163 @@
+import argparse
+import random
+import time
+
+import ai_player
+from game_logic import (BackgammonGame, MoveCache, PASS_TURN_CODE, PLAYER_X, PLAYER_O, choose_turn_code,
+                        decode_turn, turn_move_codes)
+
+PHASES = ("roll", "movegen", "state", "strategy", "validate", "apply")
+GAME_SEED_STRIDE = 1 << 32
+
+
+def game_seed(seed, game_index):
+    """Seed of game `game_index` in a run seeded with `seed`; any slice of a run can be replayed on its own."""
+    return seed * GAME_SEED_STRIDE + game_index
+
+
+class SelfPlayStats:
+    """Results and timings accumulated over one or more headless games."""
+
+    def __init__(self):
+        self.games = 0
+        self.wins = {PLAYER_X: 0, PLAYER_O: 0}
+        self.turns = 0
+        self.moves = 0
+        self.passes = 0
+        self.elapsed = 0.0
+        self.phase_times = {phase: 0.0 for phase in PHASES}
+
+    def merge(self, other):
+        self.games += other.games
+        for player in self.wins:
+            self.wins[player] += other.wins[player]
+        self.turns += other.turns
+        self.moves += other.moves
+        self.passes += other.passes
+        self.elapsed += other.elapsed
+        for phase in self.phase_times:
+            self.phase_times[phase] += other.phase_times[phase]
+        return self
+
+    @property
+    def games_per_second(self):
+        return self.games / self.elapsed if self.elapsed else 0.0
+
+    @property
+    def moves_per_second(self):
+        return self.moves / self.elapsed if self.elapsed else 0.0
+
+    def as_dict(self):
+        return {
+            "games": self.games,
+            "wins": dict(self.wins),
+            "turns": self.turns,
+            "moves": self.moves,
+            "passes": self.passes,
+            "elapsed": self.elapsed,
+            "games_per_second": self.games_per_second,
+            "moves_per_second": self.moves_per_second,
+            "phase_times": dict(self.phase_times),
+        }
+
+    def summary(self):
+        lines = [
+            f"Games: {self.games}  X wins: {self.wins[PLAYER_X]}  O wins: {self.wins[PLAYER_O]}",
+            f"Turns: {self.turns}  checker moves: {self.moves}  passes: {self.passes}",
+            f"Elapsed: {self.elapsed:.3f}s  games/s: {self.games_per_second:.1f}  moves/s: {self.moves_per_second:.1f}",
+        ]
+        for phase in PHASES:
+            share = self.phase_times[phase] / self.elapsed * 100 if self.elapsed else 0.0
+            lines.append(f"  {phase:<9}{self.phase_times[phase]:9.3f}s  {share:5.1f}%")
+        return "\n".join(lines)
+
+
+def play_game(strategies, seed, stats, move_cache=None, turn_log=None):
+    """Plays one game between `strategies[PLAYER_X]` and `strategies[PLAYER_O]`; returns the winner.
+
+    Each strategy is called like ai_player.choose_move(game_state, player_id, possible_moves). Dice come from
+    a private RNG seeded with `seed`; the module-level RNG is seeded too so strategies that use it are reproducible.
+    If `turn_log` is a list, a (player, dice, move codes) entry is appended for every turn, with [] for a pass.
+    """
+    clock = time.perf_counter
+    phase_times = stats.phase_times
+    random.seed(seed)
+    game = BackgammonGame(move_cache=move_cache, rng=random.Random(seed))
+
+    t0 = clock()
+    game.determine_first_player()
+    phase_times["roll"] += clock() - t0
+
+    while game.winner is None:
+        player = game.current_player
+        if not game.dice:
+            # Same draws as game.roll_dice(), split so set_dice's eager move generation is timed as movegen.
+            t0 = clock()
+            dice = [game.rng.randint(1, 6), game.rng.randint(1, 6)]
+            phase_times["roll"] += clock() - t0
+            t0 = clock()
+            game.set_dice(dice)
+        else:
+            t0 = clock()
+        legal_turn_codes = game.get_legal_turn_codes(player, unique_positions=True)
+        turn_dice = game.dice
+        t1 = clock()
+        phase_times["movegen"] += t1 - t0
+        stats.turns += 1
+
+        if not legal_turn_codes:
+            if not game.is_move_valid(player, PASS_TURN_CODE):
+                raise RuntimeError(f"P{player} has no legal turns but the pass was rejected.")
+            t2 = clock()
+            phase_times["validate"] += t2 - t1
+            game.switch_player()
+            phase_times["apply"] += clock() - t2
+            stats.passes += 1
+            if turn_log is not None:
+                turn_log.append((player, tuple(turn_dice), []))
+            continue
+
+        game_state = game.get_state()
+        t2 = clock()
+        phase_times["state"] += t2 - t1
+        turn_code = choose_turn_code(strategies[player], game_state, player, legal_turn_codes)
+        t3 = clock()
+        phase_times["strategy"] += t3 - t2
+        if not turn_code or not game.is_move_valid(player, turn_code):
+            raise ValueError(f"Strategy for P{player} chose an illegal turn {decode_turn(turn_code)} "
+                             f"with dice {game.dice}.")
+        t4 = clock()
+        phase_times["validate"] += t4 - t3
+        game.apply_moves(player, turn_code)
+        phase_times["apply"] += clock() - t4
+        move_codes = turn_move_codes(turn_code)
+        stats.moves += len(move_codes)
+        if turn_log is not None:
+            turn_log.append((player, tuple(turn_dice), move_codes))
+
+    stats.games += 1
+    stats.wins[game.winner] += 1
+    return game.winner
+
+
+def run_selfplay(strategy_x, strategy_o, num_games, seed=0, first_game=0, move_cache=None):
+    """Plays games `first_game` .. `first_game + num_games - 1` of the run seeded with `seed`."""
+    if move_cache is None:
+        move_cache = MoveCache()
+    strategies = {PLAYER_X: strategy_x, PLAYER_O: strategy_o}
+    stats = SelfPlayStats()
+    start = time.perf_counter()
+    for game_index in range(first_game, first_game + num_games):
+        play_game(strategies, game_seed(seed, game_index), stats, move_cache)
+    stats.elapsed = time.perf_counter() - start
+    return stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Headless self-play of ai_player.choose_move against itself.")
+    parser.add_argument("--games", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    result = run_selfplay(ai_player.choose_move, ai_player.choose_move, args.games, args.seed)
+    print(result.summary())
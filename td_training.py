@@ -0,0 +1,227 @@
+import argparse
+import logging
+import multiprocessing
+import os
+import queue
+import random
+import time
+
+import numpy as np
+
+from evaluator import choose_move_by_evaluator
+from features import encode_positions
+from game_logic import BackgammonGame, MoveCache, PLAYER_X, POSITION_SIZE
+from mlp import DEFAULT_HIDDEN_SIZES, DEFAULT_WEIGHTS_PATH, MLPEvaluator
+from selfplay import game_seed
+
+DEFAULT_ALPHA = 0.1
+DEFAULT_LAMBDA = 0.7
+DEFAULT_BROADCAST_EVERY = 10
+DEFAULT_CHECKPOINT_EVERY = 500
+DEFAULT_REPORT_EVERY = 100
+TRACE_POLL_INTERVAL = 1.0
+
+logger = logging.getLogger(__name__)
+
+
+def play_training_game(evaluator, rng, move_cache=None, epsilon=0.0):
+    """Self-play one game with `evaluator` on both sides.
+
+    Returns the features of every position with a player on roll, in order, and the outcome: 1.0 if X won.
+    """
+    game = BackgammonGame(move_cache=move_cache, rng=rng)
+    game.determine_first_player()
+    cells, players = [game.position.cells[:POSITION_SIZE]], [game.current_player]
+    while game.winner is None:
+        if not game.dice:
+            game.roll_dice()
+        player = game.current_player
+        legal_turns = game.get_legal_turns(player, unique_positions=True)
+        if legal_turns:
+            if epsilon and rng.random() < epsilon:
+                chosen = rng.choice(legal_turns)
+            else:
+                chosen = choose_move_by_evaluator(evaluator.evaluate, game.get_state(), player, legal_turns)
+            game.apply_moves(player, chosen)
+        else:
+            game.switch_player()
+        if game.winner is None:
+            cells.append(game.position.cells[:POSITION_SIZE])
+            players.append(game.current_player)
+    features = encode_positions(np.array(cells, dtype=np.int16), np.array(players),
+                                evaluator.include_pips, evaluator.include_structure)
+    return features, 1.0 if game.winner == PLAYER_X else 0.0
+
+
+def td_lambda_update(evaluator, features, outcome, alpha=DEFAULT_ALPHA, lam=DEFAULT_LAMBDA):
+    """Offline TD(lambda) step over one game's trace; updates `evaluator` in place and returns the mean |TD error|.
+
+    With weights fixed during the game, sum_t delta_t * e_t equals sum_k g_k * c_k where
+    c_k = delta_k + lam * c_(k+1). So the whole update is one batched backward pass whose output gradients are c_k.
+    """
+    activations = [features]
+    for w, b in zip(evaluator.weights, evaluator.biases):
+        activations.append(1.0 / (1.0 + np.exp(-(activations[-1] @ w + b))))
+    values = activations[-1][:, 0]
+
+    deltas = np.empty_like(values)
+    deltas[:-1] = values[1:] - values[:-1]
+    deltas[-1] = outcome - values[-1]
+    credit = np.empty_like(deltas)
+    running = 0.0
+    for t in range(len(deltas) - 1, -1, -1):
+        running = deltas[t] + lam * running
+        credit[t] = running
+
+    grad_out = (credit * values * (1.0 - values))[:, None]
+    for layer in range(len(evaluator.weights) - 1, -1, -1):
+        w = evaluator.weights[layer]
+        inputs = activations[layer]
+        grad_in = None
+        if layer:
+            grad_in = (grad_out @ w.T) * inputs * (1.0 - inputs)
+        w += alpha * (inputs.T @ grad_out)
+        evaluator.biases[layer] += alpha * grad_out.sum(axis=0)
+        grad_out = grad_in
+    return float(np.abs(deltas).mean())
+
+
+def _worker_main(worker_id, initial_weights, weights_queue, trace_queue, stop_event, seed, epsilon):
+    evaluator = MLPEvaluator(*initial_weights)
+    rng = random.Random(game_seed(seed, worker_id))
+    move_cache = MoveCache()
+    while not stop_event.is_set():
+        latest = None
+        while True:
+            try:
+                latest = weights_queue.get_nowait()
+            except queue.Empty:
+                break
+        if latest is not None:
+            evaluator.weights, evaluator.biases = latest
+        features, outcome = play_training_game(evaluator, rng, move_cache, epsilon)
+        trace_queue.put((worker_id, features, outcome))
+
+
+def _next_trace(trace_queue, workers):
+    # Polls rather than blocking for good, so a crashed worker is reported instead of hanging the learner.
+    while True:
+        try:
+            return trace_queue.get(timeout=TRACE_POLL_INTERVAL)
+        except queue.Empty:
+            dead = [worker for worker in workers if not worker.is_alive()]
+            if dead:
+                exit_codes = [worker.exitcode for worker in dead]
+                raise RuntimeError(f"Training workers exited with codes {exit_codes}.") from None
+
+
+def _save_checkpoint(evaluator, path):
+    # Write then rename, so mlp.choose_move never loads a half-written file.
+    tmp_path = path + ".tmp.npz"
+    evaluator.save(tmp_path)
+    os.replace(tmp_path, path)
+
+
+class TrainingStats:
+    def __init__(self):
+        self.games = 0
+        self.updates = 0
+        self.positions = 0
+        self.td_error = 0.0
+        self.start = time.perf_counter()
+        self._error_sum = 0.0
+        self._error_games = 0
+
+    def add_game(self, positions, td_error):
+        self.games += 1
+        self.updates += 1
+        self.positions += positions
+        self._error_sum += td_error
+        self._error_games += 1
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.start
+
+    def summary(self):
+        """One report line; its mean |TD error| covers the games added since the previous summary, if any."""
+        if self._error_games:
+            self.td_error = self._error_sum / self._error_games
+            self._error_sum, self._error_games = 0.0, 0
+        elapsed = self.elapsed
+        return (f"games {self.games}  positions {self.positions}  games/s {self.games / elapsed:.1f}  "
+                f"updates/s {self.updates / elapsed:.1f}  mean |TD error| {self.td_error:.4f}")
+
+
+def run_training(num_games, num_workers=None, checkpoint_path=DEFAULT_WEIGHTS_PATH, resume=True,
+                 hidden_sizes=DEFAULT_HIDDEN_SIZES, include_pips=True, include_structure=True, alpha=DEFAULT_ALPHA,
+                 lam=DEFAULT_LAMBDA, epsilon=0.0, seed=0, broadcast_every=DEFAULT_BROADCAST_EVERY,
+                 checkpoint_every=DEFAULT_CHECKPOINT_EVERY, report_every=DEFAULT_REPORT_EVERY):
+    """Trains an MLPEvaluator by TD(lambda) self-play and returns it.
+
+    Worker processes play greedy games with their copy of the network and stream traces to this process,
+    which applies one update per game, sends fresh weights to every worker each `broadcast_every` games and
+    checkpoints to `checkpoint_path`, where mlp.choose_move picks it up.
+    """
+    if resume and checkpoint_path and os.path.exists(checkpoint_path):
+        evaluator = MLPEvaluator.load(checkpoint_path)
+        logger.info("Resuming from %s", checkpoint_path)
+    else:
+        evaluator = MLPEvaluator.random(hidden_sizes, include_pips, include_structure, seed)
+    initial = (evaluator.weights, evaluator.biases, evaluator.include_pips, evaluator.include_structure)
+
+    num_workers = num_workers or os.cpu_count()
+    trace_queue = multiprocessing.Queue()
+    stop_event = multiprocessing.Event()
+    weights_queues = [multiprocessing.Queue() for _ in range(num_workers)]
+    workers = [multiprocessing.Process(target=_worker_main, daemon=True,
+                                       args=(worker_id, initial, weights_queues[worker_id], trace_queue, stop_event,
+                                             seed, epsilon))
+               for worker_id in range(num_workers)]
+    for worker in workers:
+        worker.start()
+
+    stats = TrainingStats()
+    try:
+        while stats.games < num_games:
+            _, features, outcome = _next_trace(trace_queue, workers)
+            stats.add_game(len(features), td_lambda_update(evaluator, features, outcome, alpha, lam))
+            if stats.games % broadcast_every == 0:
+                snapshot = ([w.copy() for w in evaluator.weights], [b.copy() for b in evaluator.biases])
+                for weights_queue in weights_queues:
+                    weights_queue.put(snapshot)
+            if checkpoint_path and stats.games % checkpoint_every == 0:
+                _save_checkpoint(evaluator, checkpoint_path)
+            if stats.games % report_every == 0:
+                logger.info("%s", stats.summary())
+    finally:
+        stop_event.set()
+        for worker in workers:
+            worker.join(timeout=1.0)
+            if worker.is_alive():
+                worker.terminate()
+        for q in [trace_queue, *weights_queues]:
+            q.cancel_join_thread()
+    if checkpoint_path:
+        _save_checkpoint(evaluator, checkpoint_path)
+    logger.info("Finished: %s", stats.summary())
+    return evaluator
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="TD(lambda) self-play training of the NumPy MLP evaluator.")
+    parser.add_argument("--games", type=int, default=1000)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--checkpoint", default=DEFAULT_WEIGHTS_PATH)
+    parser.add_argument("--fresh", action="store_true", help="ignore an existing checkpoint")
+    parser.add_argument("--hidden", type=int, nargs="+", default=list(DEFAULT_HIDDEN_SIZES))
+    parser.add_argument("--alpha", type=float, default=DEFAULT_ALPHA)
+    parser.add_argument("--lam", type=float, default=DEFAULT_LAMBDA)
+    parser.add_argument("--epsilon", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    logging.getLogger("game_logic").setLevel(logging.WARNING)
+
+    run_training(args.games, args.workers, args.checkpoint, not args.fresh, tuple(args.hidden), alpha=args.alpha,
+                 lam=args.lam, epsilon=args.epsilon, seed=args.seed)
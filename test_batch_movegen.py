@@ -0,0 +1,29 @@
+import random
+
+import numpy as np
+
+from batch_movegen import BATCH_POSITION_WIDTH, _conformance_corpus, check_conformance, generate_successors
+from game_logic import PLAYER_O, PLAYER_X, BackgammonGame
+
+ROLLS = [(d1, d2) for d1 in range(1, 7) for d2 in range(1, d1 + 1)]
+
+
+def test_played_positions_conform():
+    corpus = _conformance_corpus(num_games=6, seed=1)
+    assert check_conformance(corpus) == []
+
+
+def test_empty_batch():
+    assert check_conformance([]) == []
+    successors, offsets, moves = generate_successors(np.zeros((0, BATCH_POSITION_WIDTH), dtype=np.int16),
+                                                     np.zeros((0, 2), dtype=np.int16), np.zeros(0, dtype=int))
+    assert successors.shape == (0, BATCH_POSITION_WIDTH) and moves.shape == (0, 4)
+    assert list(offsets) == [0]
+
+
+def test_mixed_players_in_one_batch():
+    # The same positions for both sides and every roll, shuffled so X and O rows (and doubles) interleave.
+    positions = [BackgammonGame().position] + [position for position, _, _ in _conformance_corpus(1, seed=3)[::9]]
+    samples = [(position, roll, player) for position in positions for roll in ROLLS for player in (PLAYER_X, PLAYER_O)]
+    random.Random(5).shuffle(samples)
+    assert check_conformance(samples) == []
@@ -0,0 +1,190 @@
+import random
+
+from game_logic import (BAR_INDEX, NUM_POINTS, OFF_INDEX, PLAYER_O, PLAYER_X, BackgammonGame, MoveCache, Position,
+                        decode_turn, encode_turn)
+
+ROLLS = [(d1, d2) for d1 in range(1, 7) for d2 in range(1, d1 + 1)]
+
+
+# Reference rules, written out on plain lists independently of the search in game_logic: every order of every
+# playable die, keeping the longest sequences and, when only one of two different dice can be played, the larger.
+
+def _reference_single_moves(board, bar, player, die):
+    own = 1 if player == PLAYER_X else -1
+    home = range(0, 6) if player == PLAYER_X else range(NUM_POINTS - 6, NUM_POINTS)
+    if bar[player]:
+        entry = NUM_POINTS - die if player == PLAYER_X else die - 1
+        return [('BAR', entry)] if board[entry] * own > -2 else []
+    all_home = all(board[point] * own <= 0 for point in range(NUM_POINTS) if point not in home)
+    moves = []
+    for point in range(NUM_POINTS):
+        if board[point] * own <= 0:
+            continue
+        dest = point - die if player == PLAYER_X else point + die
+        if 0 <= dest < NUM_POINTS:
+            if board[dest] * own > -2:
+                moves.append((point, dest))
+        elif all_home:
+            distance = point + 1 if player == PLAYER_X else NUM_POINTS - point
+            further = range(point + 1, 6) if player == PLAYER_X else range(NUM_POINTS - 6, point)
+            if die == distance or not any(board[p] * own > 0 for p in further):
+                moves.append((point, 'OFF'))
+    return moves
+
+
+def _reference_apply(board, bar, off, player, move):
+    board, bar, off = list(board), list(bar), list(off)
+    own = 1 if player == PLAYER_X else -1
+    start, end = move
+    if start == 'BAR':
+        bar[player] -= 1
+    else:
+        board[start] -= own
+    if end == 'OFF':
+        off[player] += 1
+    else:
+        if board[end] * own == -1:
+            board[end] = 0
+            bar[1 - player] += 1
+        board[end] += own
+    return board, bar, off
+
+
+def _reference_sequences(board, bar, off, player, dice_left):
+    sequences = []
+    for die in set(dice_left):
+        rest = list(dice_left)
+        rest.remove(die)
+        for move in _reference_single_moves(board, bar, player, die):
+            next_state = _reference_apply(board, bar, off, player, move)
+            for moves, dice_used, final in _reference_sequences(*next_state, player, rest):
+                sequences.append(((move,) + moves, (die,) + dice_used, final))
+    return sequences or [((), (), (board, bar, off))]
+
+
+def reference_turns(position, player, dice):
+    """{move tuple sequence: resulting cells} for every legal turn under the reference rules."""
+    cells = position.cells
+    board = list(cells[:NUM_POINTS])
+    bar = [cells[BAR_INDEX + PLAYER_X], cells[BAR_INDEX + PLAYER_O]]
+    off = [cells[OFF_INDEX + PLAYER_X], cells[OFF_INDEX + PLAYER_O]]
+    dice_left = [dice[0]] * 4 if dice[0] == dice[1] else list(dice)
+    sequences = _reference_sequences(board, bar, off, player, dice_left)
+    max_moves = max(len(moves) for moves, _, _ in sequences)
+    if max_moves == 0:
+        return {}
+    sequences = [sequence for sequence in sequences if len(sequence[0]) == max_moves]
+    if max_moves == 1 and dice[0] != dice[1] and any(max(dice) in dice_used for _, dice_used, _ in sequences):
+        sequences = [sequence for sequence in sequences if max(dice) in sequence[1]]
+    return {moves: tuple(board + bar + off) for moves, _, (board, bar, off) in sequences}
+
+
+def _game_at(position, player, dice, move_cache=None):
+    game = BackgammonGame(move_cache=move_cache)
+    game.position = position.copy()
+    game.current_player = player
+    game.first_roll_made = True
+    game.set_dice(list(dice))
+    return game
+
+
+def _assert_matches_reference(position, player, dice):
+    expected = reference_turns(position, player, dice)
+    game = _game_at(position, player, dice)
+    context = f"P{player} dice {dice} at {position!r}"
+
+    legal = {tuple(decode_turn(turn_code)) for turn_code in game.get_legal_turn_codes(player)}
+    assert legal == set(expected), context
+    board, bar = position.to_board(), position.bar_dict()
+    assert set(game.get_possible_moves(player, list(dice), board, bar)) == {encode_turn(t) for t in expected}, context
+
+    unique = game.get_legal_turn_codes(player, unique_positions=True)
+    unique_results = [expected[tuple(decode_turn(turn_code))] for turn_code in unique]
+    assert len(unique_results) == len(set(unique_results)) and set(unique_results) == set(expected.values()), context
+
+    assert game.is_move_valid(player, []) == (not expected), context
+    for moves in expected:
+        assert game.is_move_valid(player, list(moves)), context
+
+
+def _sample_positions(num_games, seed, every=5):
+    rng = random.Random(seed)
+    samples = []
+    for _ in range(num_games):
+        game = BackgammonGame(rng=rng)
+        game.determine_first_player()
+        while game.winner is None:
+            if not game.dice:
+                game.roll_dice()
+            player = game.current_player
+            if len(samples) % every == 0 or game.position.bar_count(player) or \
+                    game.position.checkers_outside_home(player) == 0:
+                samples.append((game.position.copy(), player))
+            turn_codes = game.get_legal_turn_codes(player)
+            if turn_codes:
+                game.apply_moves(player, rng.choice(turn_codes))
+            else:
+                game.switch_player()
+    return samples
+
+
+def _position(points, bar=(0, 0), off=(0, 0)):
+    cells = [0] * NUM_POINTS + list(bar) + list(off)
+    for point, count in points.items():
+        cells[point] = count
+    return Position(cells)
+
+
+def test_opening_rolls_match_reference():
+    start = BackgammonGame().position
+    for dice in ROLLS:
+        for player in (PLAYER_X, PLAYER_O):
+            _assert_matches_reference(start, player, dice)
+
+
+def test_played_positions_match_reference():
+    for position, player in _sample_positions(num_games=2, seed=11, every=7):
+        for dice in ROLLS:
+            _assert_matches_reference(position, player, dice)
+
+
+def test_larger_die_must_be_played_when_only_one_can_be():
+    # X's lone checker on 9 can play the 6 (to 3) or the 3 (to 6), but not then the other die: O holds point 0.
+    position = _position({9: 1, 0: -2, 20: -2}, off=(14, 11))
+    game = _game_at(position, PLAYER_X, (6, 3))
+    assert [decode_turn(turn_code) for turn_code in game.get_legal_turn_codes(PLAYER_X)] == [[(9, 3)]]
+    assert not game.is_move_valid(PLAYER_X, [(9, 6)])
+    _assert_matches_reference(position, PLAYER_X, (6, 3))
+
+
+def test_both_dice_must_be_played_when_possible():
+    # Entering with the 6 leaves a 5 for the checker on 10. Entering with the 5 first leaves no 6 (O holds 13 and
+    # 4), so that shorter sequence is found after a full one and must be dropped.
+    position = _position({10: 1, 13: -2, 4: -2, 20: -2}, bar=(1, 0), off=(13, 9))
+    game = _game_at(position, PLAYER_X, (6, 5))
+    assert [decode_turn(turn_code) for turn_code in game.get_legal_turn_codes(PLAYER_X)] == [[('BAR', 18), (10, 5)]]
+    assert not game.is_move_valid(PLAYER_X, [('BAR', 19)])
+    _assert_matches_reference(position, PLAYER_X, (6, 5))
+
+
+def test_bar_entry_and_bear_off_positions_match_reference():
+    positions = [
+        (_position({5: 2, 12: 3, 3: -2, 18: -2, 20: -3}, bar=(1, 0), off=(9, 8)), PLAYER_X),
+        (_position({20: 2, 10: 3, 22: 2, 1: -2, 4: -3}, bar=(0, 2), off=(8, 8)), PLAYER_O),
+        (_position({0: 3, 2: 2, 4: 1, 5: 1, 23: -2}, off=(8, 13)), PLAYER_X),
+        (_position({23: -2, 21: -1, 18: -2, 1: 2}, off=(13, 10)), PLAYER_O),
+    ]
+    for position, player in positions:
+        for dice in ROLLS:
+            _assert_matches_reference(position, player, dice)
+
+
+def test_move_cache_byte_bound():
+    cache = MoveCache(max_bytes=64 * 1024)
+    for position, player in _sample_positions(num_games=1, seed=5, every=1):
+        for dice in ROLLS:
+            _game_at(position, player, dice, cache).get_legal_turn_codes(player)
+            assert cache.size_bytes <= cache.max_bytes or len(cache) == 1
+    assert cache.evictions
+    cache.clear()
+    assert cache.size_bytes == 0 and len(cache) == 0
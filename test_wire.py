@@ -0,0 +1,184 @@
+import json
+
+import pytest
+
+from framing import FRAME_LENGTH, FrameTooLarge, LengthPrefixedFramer, LineFramer
+from game_logic import encode_turn
+from wire import (WIRE_BINARY, WIRE_FORMAT_MESSAGE, WIRE_JSON, MessageStream, choose_wire_format, encode_json,
+                  submitted_turn_code)
+
+
+def _length_prefixed(*bodies):
+    return b"".join(FRAME_LENGTH.pack(len(body)) + body for body in bodies)
+
+
+def test_line_frames_split_across_feeds():
+    framer = LineFramer(read_size=8)
+    data = b'{"type": "a"}\n\n{"type": "b", "text": "' + b"x" * 40 + b'"}\n'
+    frames = []
+    for i in range(len(data)):
+        framer.feed(data[i:i + 1])
+        frames.extend(framer.frames())
+    assert frames == ['{"type": "a"}', "", '{"type": "b", "text": "' + "x" * 40 + '"}']
+    assert framer.buffered_bytes == 0
+
+
+def test_line_frames_received_into_buffer():
+    framer = LineFramer(read_size=4)
+    data = "first\nsecond\nthird, with ü\n".encode("utf-8")
+    frames = []
+    for i in range(0, len(data), 3):
+        chunk = data[i:i + 3]
+        framer.get_buffer(len(chunk))[:len(chunk)] = chunk
+        framer.buffer_updated(len(chunk))
+        frames.extend(framer.frames())
+    assert frames == ["first", "second", "third, with ü"]
+
+
+def test_length_prefixed_frames_split_across_feeds():
+    framer = LengthPrefixedFramer(read_size=8)
+    data = _length_prefixed(b"\x01\x02", b"", b"z" * 300)
+    frames = []
+    for i in range(0, len(data), 5):
+        framer.feed(data[i:i + 5])
+        frames.extend(bytes(frame) for frame in framer.frames())
+    assert frames == [b"\x01\x02", b"", b"z" * 300]
+    assert framer.buffered_bytes == 0
+
+
+def test_line_frame_size_cap():
+    framer = LineFramer(max_frame_size=16)
+    framer.feed(b"0123456789abcdef\n")
+    assert framer.next_frame() == "0123456789abcdef"
+    framer.feed(b"0123456789abcdefg\n")
+    with pytest.raises(FrameTooLarge):
+        framer.next_frame()
+
+    partial = LineFramer(max_frame_size=16)
+    partial.feed(b"0123456789abcdefg")
+    with pytest.raises(FrameTooLarge):
+        partial.next_frame()
+
+
+def test_length_prefixed_frame_size_cap():
+    framer = LengthPrefixedFramer(max_frame_size=16)
+    framer.feed(FRAME_LENGTH.pack(17))
+    with pytest.raises(FrameTooLarge):
+        framer.next_frame()
+
+
+def test_undecodable_line_is_dropped():
+    framer = LineFramer()
+    framer.feed(b'\xff\xfe\n{"type": "x"}\n')
+    with pytest.raises(UnicodeDecodeError):
+        framer.next_frame()
+    assert framer.next_frame() == '{"type": "x"}'
+    assert framer.next_frame() is None
+    assert framer.buffered_bytes == 0
+
+
+def test_framer_handover_keeps_unread_bytes():
+    lines = LineFramer()
+    lines.feed(b"switch\n" + _length_prefixed(b"abc", b"de")[:6])
+    assert lines.next_frame() == "switch"
+    frames = LengthPrefixedFramer.from_framer(lines)
+    assert bytes(frames.next_frame()) == b"abc"
+    assert frames.next_frame() is None
+    frames.feed(_length_prefixed(b"abc", b"de")[6:])
+    assert bytes(frames.next_frame()) == b"de"
+
+
+def test_message_stream_skips_undecodable_line():
+    stream = MessageStream()
+    stream.feed(b'\xff\xfe\n{"type": "chat", "sender_id": 0, "message_text": "hi"}\n')
+    with pytest.raises(ValueError):
+        stream.next_message()
+    assert stream.next_message() == {"type": "chat", "sender_id": 0, "message_text": "hi"}
+    assert stream.next_message() is None
+
+
+MESSAGES = [
+    {"type": "identity", "name": "host", "wire_formats": ["binary", "json"]},
+    {"type": "first_roll_exchange", "player_id": 1, "roll": 5},
+    {"type": "action_roll_dice", "player_id": 0, "rolled_dice": [6, 6]},
+    {"type": "action_submit_moves", "player_id": 0, "turn_code": encode_turn([('BAR', 18), (10, 4), (4, 'OFF')])},
+    {"type": "action_pass_turn", "player_id": 1},
+    {"type": "chat", "sender_id": None, "message_text": "gg, ünïcode"},
+    {"type": "game_over_notification", "winner_id": 0},
+]
+
+
+def _received(message):
+    # JSON peers also read the legacy string-pair "moves" of a submitted turn; compare the turn code alone.
+    return {key: value for key, value in message.items() if key != "moves"}
+
+
+def _round_trip(sender, receiver, messages, chunk_size=7):
+    data = b"".join(sender.encode(message) for message in messages)
+    received = []
+    for i in range(0, len(data), chunk_size):
+        receiver.feed(data[i:i + chunk_size])
+        received.extend(receiver.messages())
+    return received
+
+
+@pytest.mark.parametrize("wire_format", [WIRE_JSON, WIRE_BINARY])
+def test_round_trip(wire_format):
+    sender, receiver = MessageStream(), MessageStream()
+    announcement = sender.switch_send_format(wire_format)
+    receiver.feed(announcement)
+    assert receiver.next_message() == {"type": WIRE_FORMAT_MESSAGE, "format": wire_format}
+    assert receiver.recv_format == wire_format
+    assert [_received(message) for message in _round_trip(sender, receiver, MESSAGES)] == MESSAGES
+
+
+def test_switching_format_mid_stream():
+    sender, receiver = MessageStream(), MessageStream()
+    data = sender.encode(MESSAGES[1]) + sender.switch_send_format(WIRE_BINARY) + sender.encode(MESSAGES[2])
+    data += sender.encode(MESSAGES[3]) + sender.switch_send_format(WIRE_JSON) + sender.encode(MESSAGES[5])
+    receiver.feed(data)
+    received = [_received(message) for message in receiver.messages()]
+    assert received == [MESSAGES[1], {"type": WIRE_FORMAT_MESSAGE, "format": WIRE_BINARY}, MESSAGES[2],
+                        MESSAGES[3], {"type": WIRE_FORMAT_MESSAGE, "format": WIRE_JSON}, MESSAGES[5]]
+    assert receiver.recv_format == WIRE_JSON and receiver.framer.buffered_bytes == 0
+
+
+def test_unsupported_wire_format():
+    with pytest.raises(ValueError):
+        MessageStream().switch_send_format("xml")
+    receiver = MessageStream()
+    receiver.feed(b'{"type": "wire_format", "format": "xml"}\n{"type": "action_pass_turn", "player_id": 1}\n')
+    with pytest.raises(ValueError):
+        receiver.next_message()
+    assert receiver.next_message() == {"type": "action_pass_turn", "player_id": 1}
+
+
+def test_choose_wire_format():
+    assert choose_wire_format(["json", "binary"]) == WIRE_BINARY
+    assert choose_wire_format(["json"]) == WIRE_JSON
+    assert choose_wire_format([]) == WIRE_JSON
+
+
+def test_submitted_turn_code():
+    turn_code = encode_turn([(12, 7), (7, 3)])
+    assert submitted_turn_code({"turn_code": turn_code}) == turn_code
+    assert submitted_turn_code({"moves": [["12", "7"], ["7", "3"]]}) == turn_code
+    assert submitted_turn_code({"moves": [["BAR", "20"], ["3", "OFF"]]}) == encode_turn([('BAR', 20), (3, 'OFF')])
+    assert submitted_turn_code({"moves": []}) == 0
+    for message in ({"turn_code": True}, {"turn_code": "5"}, {"turn_code": -1}, {"turn_code": 1 << 40},
+                    {"moves": [["12", "30"]]}, {"moves": [["OFF", "3"]]}, {"moves": [["12"]]}, {"moves": 5}, {}):
+        with pytest.raises(ValueError):
+            submitted_turn_code(message)
+
+
+def test_legacy_moves_translation():
+    turn_code = encode_turn([('BAR', 20), (3, 'OFF')])
+    line = encode_json({"type": "action_submit_moves", "player_id": 1, "turn_code": turn_code})
+    assert json.loads(line)["moves"] == [["BAR", "20"], ["3", "OFF"]]
+
+    receiver = MessageStream()
+    receiver.feed(b'{"type": "action_submit_moves", "player_id": 1, "moves": [["BAR", "20"], ["3", "OFF"]]}\n')
+    assert receiver.next_message()["turn_code"] == turn_code
+    receiver.feed(b'{"type": "action_submit_moves", "player_id": 1, "moves": [["BAR", "-1"]]}\n')
+    with pytest.raises(ValueError):
+        receiver.next_message()
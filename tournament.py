@@ -0,0 +1,188 @@
+import argparse
+import importlib
+import itertools
+import math
+import multiprocessing
+import os
+import time
+from collections import namedtuple
+
+from game_logic import MoveCache, PLAYER_X, PLAYER_O
+from selfplay import SelfPlayStats, game_seed, play_game
+
+DEFAULT_SHARD_SIZE = 25
+CONFIDENCE_Z = 1.96
+
+GameResult = namedtuple("GameResult", "pairing game_index seed player_x player_o winner turns moves")
+
+_worker_strategies = {}
+_worker_move_cache = None
+
+
+def load_strategy(spec):
+    """Resolves 'module:function' (function defaults to choose_move) to a choose_move-style callable."""
+    module_name, _, attr = spec.partition(":")
+    return getattr(importlib.import_module(module_name), attr or "choose_move")
+
+
+def wilson_interval(wins, games, z=CONFIDENCE_Z):
+    """Wilson score interval for a win rate; (0.0, 1.0) when no games were played."""
+    if games == 0:
+        return 0.0, 1.0
+    p = wins / games
+    denom = 1 + z * z / games
+    centre = (p + z * z / (2 * games)) / denom
+    half = z * math.sqrt(p * (1 - p) / games + z * z / (4 * games * games)) / denom
+    return max(0.0, centre - half), min(1.0, centre + half)
+
+
+def make_pairings(names, mode):
+    if mode == "head-to-head":
+        if len(names) != 2:
+            raise ValueError(f"head-to-head needs exactly 2 strategies, got {len(names)}.")
+        return [(names[0], names[1])]
+    if mode == "round-robin":
+        if len(names) < 2:
+            raise ValueError("round-robin needs at least 2 strategies.")
+        return list(itertools.combinations(names, 2))
+    raise ValueError(f"Unknown tournament mode: {mode}")
+
+
+def make_shards(pairings, games_per_pairing, shard_size=DEFAULT_SHARD_SIZE):
+    """Splits every pairing's game indices into (pairing index, first game, game count) shards."""
+    shards = []
+    for pairing_idx in range(len(pairings)):
+        for first_game in range(0, games_per_pairing, shard_size):
+            shards.append((pairing_idx, first_game, min(shard_size, games_per_pairing - first_game)))
+    return shards
+
+
+def _init_worker(strategy_specs):
+    # Runs once per pool process: strategies are imported once and every shard shares one size-bounded move cache.
+    global _worker_move_cache
+    for name, spec in strategy_specs.items():
+        _worker_strategies[name] = load_strategy(spec)
+    _worker_move_cache = MoveCache()
+
+
+def _play_shard(task):
+    pairings, seed, shard = task
+    return play_shard(_worker_strategies, pairings, seed, shard, _worker_move_cache)
+
+
+def play_shard(strategies_by_name, pairings, seed, shard, move_cache=None):
+    """Plays one (pairing index, first game, game count) shard; returns its GameResult records."""
+    pairing_idx, first_game, num_games = shard
+    name_a, name_b = pairings[pairing_idx]
+    stats = SelfPlayStats()
+    results = []
+    for game_index in range(first_game, first_game + num_games):
+        # Colours alternate by game index so neither strategy keeps the first-roll side.
+        player_x, player_o = (name_a, name_b) if game_index % 2 == 0 else (name_b, name_a)
+        strategies = {PLAYER_X: strategies_by_name[player_x], PLAYER_O: strategies_by_name[player_o]}
+        turns_before, moves_before = stats.turns, stats.moves
+        this_seed = game_seed(seed, game_index)
+        winner = play_game(strategies, this_seed, stats, move_cache)
+        results.append(GameResult(pairing_idx, game_index, this_seed, player_x, player_o,
+                                  player_x if winner == PLAYER_X else player_o,
+                                  stats.turns - turns_before, stats.moves - moves_before))
+    return results
+
+
+def iter_tournament(strategy_specs, pairings, games_per_pairing, seed=0, workers=None,
+                    shard_size=DEFAULT_SHARD_SIZE):
+    """Yields GameResult records as shards finish, in completion order.
+
+    Every pairing replays the same game seeds, so strategies are compared on identical dice.
+    """
+    tasks = [(pairings, seed, shard) for shard in make_shards(pairings, games_per_pairing, shard_size)]
+    with multiprocessing.Pool(processes=workers or os.cpu_count(), initializer=_init_worker,
+                              initargs=(strategy_specs,)) as pool:
+        for shard_results in pool.imap_unordered(_play_shard, tasks):
+            yield from shard_results
+
+
+class TournamentStandings:
+    """Win/loss tallies per pairing and per strategy, with Wilson confidence intervals on win rates."""
+
+    def __init__(self, pairings):
+        self.pairings = pairings
+        self.pairing_wins = [{name_a: 0, name_b: 0} for name_a, name_b in pairings]
+        self.totals = {}
+        self.turns = 0
+        self.moves = 0
+        for name in itertools.chain.from_iterable(pairings):
+            self.totals.setdefault(name, [0, 0])
+
+    def add(self, result):
+        self.pairing_wins[result.pairing][result.winner] += 1
+        loser = result.player_o if result.winner == result.player_x else result.player_x
+        self.totals[result.winner][0] += 1
+        self.totals[loser][1] += 1
+        self.turns += result.turns
+        self.moves += result.moves
+
+    def pairing_win_rate(self, pairing_idx):
+        name_a, _ = self.pairings[pairing_idx]
+        wins = self.pairing_wins[pairing_idx]
+        games = sum(wins.values())
+        rate = wins[name_a] / games if games else 0.0
+        return rate, wilson_interval(wins[name_a], games)
+
+    def summary(self):
+        lines = []
+        for pairing_idx, (name_a, name_b) in enumerate(self.pairings):
+            wins = self.pairing_wins[pairing_idx]
+            rate, (low, high) = self.pairing_win_rate(pairing_idx)
+            lines.append(f"{name_a} vs {name_b}: {wins[name_a]}-{wins[name_b]}  "
+                         f"{name_a} win rate {rate:.3f} [{low:.3f}, {high:.3f}]")
+        for name, (won, lost) in sorted(self.totals.items(), key=lambda item: -item[1][0]):
+            low, high = wilson_interval(won, won + lost)
+            rate = won / (won + lost) if won + lost else 0.0
+            lines.append(f"  {name:<30} {won:6d}-{lost:<6d} {rate:.3f} [{low:.3f}, {high:.3f}]")
+        return "\n".join(lines)
+
+
+def run_tournament(strategy_specs, mode="round-robin", games_per_pairing=100, seed=0, workers=None,
+                   shard_size=DEFAULT_SHARD_SIZE, on_result=None):
+    """Runs a tournament over {name: 'module:function'} strategies and returns its TournamentStandings."""
+    pairings = make_pairings(list(strategy_specs), mode)
+    standings = TournamentStandings(pairings)
+    for result in iter_tournament(strategy_specs, pairings, games_per_pairing, seed, workers, shard_size):
+        standings.add(result)
+        if on_result is not None:
+            on_result(result)
+    return standings
+
+
+def parse_strategy_specs(specs):
+    """Turns command-line '[name=]module[:function]' entries into {name: spec}, numbering duplicate names."""
+    named = {}
+    for idx, spec in enumerate(specs):
+        name, sep, target = spec.partition("=")
+        if not sep:
+            name, target = spec, spec
+        if name in named:
+            name = f"{name}#{idx + 1}"
+        named[name] = target
+    return named
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Multi-core backgammon tournament between choose_move strategies.")
+    parser.add_argument("strategies", nargs="+", help="[name=]module[:function], e.g. ai_player:choose_move")
+    parser.add_argument("--mode", choices=("round-robin", "head-to-head"), default="round-robin")
+    parser.add_argument("--games", type=int, default=100, help="games per pairing")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--shard-size", type=int, default=DEFAULT_SHARD_SIZE)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    final = run_tournament(parse_strategy_specs(args.strategies), args.mode, args.games, args.seed, args.workers,
+                           args.shard_size)
+    elapsed = time.perf_counter() - start
+    total_games = sum(sum(wins.values()) for wins in final.pairing_wins)
+    print(final.summary())
+    print(f"{total_games} games in {elapsed:.2f}s ({total_games / elapsed:.1f} games/s, "
+          f"{final.moves / elapsed:.1f} moves/s)")
@@ -0,0 +1,183 @@
+import argparse
+import json
+import os
+
+import numpy as np
+
+import ai_player
+from features import encode_positions, feature_width
+from game_logic import BackgammonGame, MoveCache, PLAYER_O, PLAYER_X, POSITION_SIZE
+from game_records import replay_turns
+from selfplay import SelfPlayStats, game_seed, play_game
+
+MANIFEST_NAME = "manifest.json"
+DEFAULT_SHARD_ROWS = 1 << 16
+NO_MOVE_INDEX = -1
+SHARD_ARRAYS = ("features", "side_to_move", "result", "move_index")
+
+
+def _shard_file(directory, array_name, shard_idx):
+    return os.path.join(directory, f"{array_name}-{shard_idx:05d}.npy")
+
+
+class ShardWriter:
+    """Streams training rows into fixed-size .npy shards plus a manifest.json describing them.
+
+    Each row is one position with a player on roll: its encoded features, the side to move, the final result
+    (1.0 if X won) and the index of the chosen turn in the unique legal-turn list (NO_MOVE_INDEX if unknown or
+    a pass). Only one shard is held in memory; the manifest is rewritten after every shard.
+    """
+
+    def __init__(self, directory, shard_rows=DEFAULT_SHARD_ROWS, include_pips=False, include_structure=False):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.shard_rows = shard_rows
+        self.include_pips = include_pips
+        self.include_structure = include_structure
+        width = feature_width(include_pips, include_structure)
+        self._buffers = {
+            "features": np.empty((shard_rows, width), dtype=np.float32),
+            "side_to_move": np.empty(shard_rows, dtype=np.int8),
+            "result": np.empty(shard_rows, dtype=np.float32),
+            "move_index": np.empty(shard_rows, dtype=np.int16),
+        }
+        self._fill = 0
+        self.shards = []
+        self.games = 0
+
+    @property
+    def rows(self):
+        return sum(self.shards) + self._fill
+
+    def add_game(self, cells, players, outcome, move_indices=None):
+        """Appends one finished game: (T, 26 or 28) position rows, (T,) side to move, X's result, optional indices."""
+        features = encode_positions(np.asarray(cells), np.asarray(players), self.include_pips,
+                                    self.include_structure)
+        columns = {
+            "features": features,
+            "side_to_move": np.asarray(players, dtype=np.int8),
+            "result": np.full(len(features), outcome, dtype=np.float32),
+            "move_index": (np.full(len(features), NO_MOVE_INDEX, dtype=np.int16) if move_indices is None
+                           else np.asarray(move_indices, dtype=np.int16)),
+        }
+        written = 0
+        while written < len(features):
+            take = min(self.shard_rows - self._fill, len(features) - written)
+            for name, column in columns.items():
+                self._buffers[name][self._fill:self._fill + take] = column[written:written + take]
+            self._fill += take
+            written += take
+            if self._fill == self.shard_rows:
+                self._flush()
+        self.games += 1
+
+    def _flush(self):
+        if not self._fill:
+            return
+        shard_idx = len(self.shards)
+        for name, buffer in self._buffers.items():
+            np.save(_shard_file(self.directory, name, shard_idx), buffer[:self._fill])
+        self.shards.append(self._fill)
+        self._fill = 0
+        self._write_manifest()
+
+    def _write_manifest(self):
+        manifest = {
+            "feature_width": self._buffers["features"].shape[1],
+            "include_pips": self.include_pips,
+            "include_structure": self.include_structure,
+            "shard_rows": self.shard_rows,
+            "shards": self.shards,
+            "rows": sum(self.shards),
+            "games": self.games,
+            "arrays": list(SHARD_ARRAYS),
+        }
+        tmp_path = os.path.join(self.directory, MANIFEST_NAME + ".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(manifest, f, indent=1)
+        os.replace(tmp_path, os.path.join(self.directory, MANIFEST_NAME))
+
+    def close(self):
+        self._flush()
+        self._write_manifest()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class TrainingDataset:
+    """Read side of ShardWriter output; shards are opened with mmap so only touched pages are loaded."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        with open(os.path.join(directory, MANIFEST_NAME)) as f:
+            self.manifest = json.load(f)
+        self.shard_sizes = self.manifest["shards"]
+
+    def __len__(self):
+        return self.manifest["rows"]
+
+    def shard(self, shard_idx):
+        return {name: np.load(_shard_file(self.directory, name, shard_idx), mmap_mode="r")
+                for name in self.manifest["arrays"]}
+
+    def iter_batches(self, batch_size=4096, arrays=SHARD_ARRAYS):
+        """Yields dicts of array slices of at most batch_size rows, shard by shard."""
+        for shard_idx in range(len(self.shard_sizes)):
+            shard = self.shard(shard_idx)
+            for start in range(0, self.shard_sizes[shard_idx], batch_size):
+                yield {name: shard[name][start:start + batch_size] for name in arrays}
+
+
+def export_game(writer, first_player, winner, turns, move_cache=None):
+    """Replays one game's (dice, moves) turns and streams its on-roll positions into `writer`.
+
+    A chosen turn's move_index is that of the unique legal turn reaching the same position, so any move order
+    of it is accepted; passes get NO_MOVE_INDEX.
+    """
+    cells, players, move_indices = [], [], []
+    for game, turn_code in replay_turns(first_player, turns, BackgammonGame(move_cache=move_cache)):
+        cells.append(game.position.cells[:POSITION_SIZE])
+        players.append(game.current_player)
+        turn_index = game.get_unique_turn_index(turn_code) if turn_code else None
+        move_indices.append(NO_MOVE_INDEX if turn_index is None else turn_index)
+    writer.add_game(np.array(cells, dtype=np.int16), players, 1.0 if winner == PLAYER_X else 0.0, move_indices)
+
+
+def export_selfplay(writer, strategy_x, strategy_o, num_games, seed=0, first_game=0, move_cache=None):
+    """Plays games with selfplay.play_game, as selfplay.run_selfplay does, and streams every on-roll position
+    into `writer`; returns the SelfPlayStats.
+    """
+    strategies = {PLAYER_X: strategy_x, PLAYER_O: strategy_o}
+    move_cache = move_cache if move_cache is not None else MoveCache()
+    stats = SelfPlayStats()
+    for game_index in range(first_game, first_game + num_games):
+        turn_log = []
+        winner = play_game(strategies, game_seed(seed, game_index), stats, move_cache, turn_log)
+        export_game(writer, turn_log[0][0], winner, [(dice, moves) for _, dice, moves in turn_log], move_cache)
+    return stats
+
+
+def export_records(writer, reader, move_cache=None):
+    """Replays every game of a game_records.GameRecordReader and streams its on-roll positions into `writer`."""
+    for record in reader:
+        export_game(writer, record.first_player, record.winner, record.turns, move_cache)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export self-play positions as sharded .npy training data.")
+    parser.add_argument("directory")
+    parser.add_argument("--games", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--shard-rows", type=int, default=DEFAULT_SHARD_ROWS)
+    parser.add_argument("--pips", action="store_true")
+    parser.add_argument("--structure", action="store_true")
+    args = parser.parse_args()
+
+    with ShardWriter(args.directory, args.shard_rows, args.pips, args.structure) as shard_writer:
+        export_selfplay(shard_writer, ai_player.choose_move, ai_player.choose_move, args.games, args.seed)
+    print(f"Wrote {shard_writer.rows} rows from {shard_writer.games} games in {len(shard_writer.shards)} shards "
+          f"to {args.directory}")
@@ -0,0 +1,173 @@
+import json
+import struct
+
+from framing import DEFAULT_MAX_FRAME_SIZE, FRAME_LENGTH, LengthPrefixedFramer, LineFramer
+from game_logic import decode_turn, encode_turn, turn_move_codes
+
+WIRE_JSON = "json"
+WIRE_BINARY = "binary"
+SUPPORTED_WIRE_FORMATS = (WIRE_BINARY, WIRE_JSON)
+WIRE_FORMAT_MESSAGE = "wire_format"
+
+# Binary frames: u16 length, then a message kind byte and its fields. Players and dice are single bytes and each
+# checker move is a u16 game_logic move code, so 'BAR' and 'OFF' travel as the reserved cells 24 and 25.
+# Submitted turns are game_logic turn codes under "turn_code"; JSON frames also carry the string-pair "moves"
+# list that peers predating turn codes send and read.
+MSG_JSON = 0
+MSG_FIRST_ROLL = 1
+MSG_ROLL_DICE = 2
+MSG_SUBMIT_MOVES = 3
+MSG_PASS_TURN = 4
+MSG_GAME_OVER = 5
+MSG_CHAT = 6
+NO_PLAYER = 0xFF
+SUBMIT_MOVES_MESSAGE = "action_submit_moves"
+
+
+def encode_json(message):
+    if message.get("type") == SUBMIT_MOVES_MESSAGE and "moves" not in message:
+        message = dict(message, moves=[[str(start), str(end)] for start, end in decode_turn(message["turn_code"])])
+    return (json.dumps(message) + "\n").encode("utf-8")
+
+
+def submitted_turn_code(message):
+    """The turn code of a submit message, from "turn_code" or else the legacy "moves" pairs."""
+    if "turn_code" in message:
+        turn_code = message["turn_code"]
+        if not isinstance(turn_code, int) or isinstance(turn_code, bool):
+            raise ValueError(f"Turn code {turn_code!r} is not an integer.")
+        return encode_turn(turn_code)
+    try:
+        moves = message["moves"]
+        if not isinstance(moves, list):
+            raise TypeError(f"Moves {moves!r} are not a list.")
+        return encode_turn(moves)
+    except (KeyError, TypeError, ValueError) as e:
+        raise ValueError(f"Malformed moves in {message!r}.") from e
+
+
+def encode_binary(message):
+    """One length-prefixed frame for a message dict; types without a compact layout are sent as MSG_JSON."""
+    msg_type = message.get("type")
+    if msg_type == "first_roll_exchange":
+        body = bytes((MSG_FIRST_ROLL, message["player_id"], message["roll"]))
+    elif msg_type == "action_roll_dice":
+        body = bytes((MSG_ROLL_DICE, message["player_id"], *message["rolled_dice"]))
+    elif msg_type == SUBMIT_MOVES_MESSAGE:
+        codes = turn_move_codes(submitted_turn_code(message))
+        body = struct.pack(f"<BB{len(codes)}H", MSG_SUBMIT_MOVES, message["player_id"], *codes)
+    elif msg_type == "action_pass_turn":
+        body = bytes((MSG_PASS_TURN, message["player_id"]))
+    elif msg_type == "game_over_notification":
+        body = bytes((MSG_GAME_OVER, message["winner_id"]))
+    elif msg_type == "chat":
+        sender = message["sender_id"]
+        body = bytes((MSG_CHAT, NO_PLAYER if sender is None else sender)) + message["message_text"].encode("utf-8")
+    else:
+        body = bytes((MSG_JSON,)) + json.dumps(message).encode("utf-8")
+    return FRAME_LENGTH.pack(len(body)) + body
+
+
+def decode_binary(frame):
+    """The message dict for one binary frame (without its length prefix), in the same shape JSON peers send."""
+    try:
+        kind = frame[0]
+        if kind == MSG_FIRST_ROLL:
+            return {"type": "first_roll_exchange", "player_id": frame[1], "roll": frame[2]}
+        if kind == MSG_ROLL_DICE:
+            return {"type": "action_roll_dice", "player_id": frame[1], "rolled_dice": [frame[2], frame[3]]}
+        if kind == MSG_SUBMIT_MOVES:
+            codes = struct.unpack_from(f"<{(len(frame) - 2) // 2}H", frame, 2)
+            return {"type": SUBMIT_MOVES_MESSAGE, "player_id": frame[1], "turn_code": encode_turn(codes)}
+        if kind == MSG_PASS_TURN:
+            return {"type": "action_pass_turn", "player_id": frame[1]}
+        if kind == MSG_GAME_OVER:
+            return {"type": "game_over_notification", "winner_id": frame[1]}
+        if kind == MSG_CHAT:
+            return {"type": "chat", "sender_id": None if frame[1] == NO_PLAYER else frame[1],
+                    "message_text": frame[2:].decode("utf-8")}
+        if kind == MSG_JSON:
+            return json.loads(frame[1:])
+    except (IndexError, struct.error) as e:
+        raise ValueError(f"Malformed binary message ({len(frame)} bytes).") from e
+    raise ValueError(f"Unknown binary message kind {kind}.")
+
+
+def choose_wire_format(offered):
+    """Our preferred format among those a peer offered in its identity message; JSON if it offered none."""
+    for wire_format in SUPPORTED_WIRE_FORMATS:
+        if wire_format in offered:
+            return wire_format
+    return WIRE_JSON
+
+
+class MessageStream:
+    """Message codec for one connection. Each direction starts as JSON lines and may switch to binary frames.
+
+    A side switches its outgoing direction by sending {"type": "wire_format", "format": ...} as the last message
+    in the old format; the receiver decodes everything after that message in the new one. A host lists the
+    formats it accepts under "wire_formats" in its identity message, a joiner that shares one switches first and
+    the host answers in kind. Peers that predate this ignore the offer and both directions stay JSON.
+    """
+
+    def __init__(self, max_frame_size=DEFAULT_MAX_FRAME_SIZE):
+        self.framer = LineFramer(max_frame_size)
+        self.send_format = WIRE_JSON
+        self.recv_format = WIRE_JSON
+
+    def get_buffer(self, sizehint=-1):
+        return self.framer.get_buffer(sizehint)
+
+    def buffer_updated(self, nbytes):
+        self.framer.buffer_updated(nbytes)
+
+    def feed(self, data):
+        self.framer.feed(data)
+
+    def encode(self, message):
+        return encode_binary(message) if self.send_format == WIRE_BINARY else encode_json(message)
+
+    def switch_send_format(self, wire_format):
+        """The announcement to send, still in the old format; messages encoded after it use `wire_format`."""
+        if wire_format not in SUPPORTED_WIRE_FORMATS:
+            raise ValueError(f"Unsupported wire format {wire_format!r}.")
+        announcement = self.encode({"type": WIRE_FORMAT_MESSAGE, "format": wire_format})
+        self.send_format = wire_format
+        return announcement
+
+    def next_message(self):
+        """The next message dict, or None until more bytes arrive. A frame that cannot be decoded is dropped
+        and raises ValueError; FrameTooLarge (also a ValueError) means the stream cannot continue.
+        """
+        while True:
+            frame = self.framer.next_frame()
+            if frame is None:
+                return None
+            if self.recv_format == WIRE_BINARY:
+                message = decode_binary(frame)
+            elif frame.strip():
+                message = json.loads(frame)
+            else:
+                continue
+            if not isinstance(message, dict):
+                raise ValueError(f"Expected a message object, got {type(message).__name__}.")
+            if message.get("type") == SUBMIT_MOVES_MESSAGE:
+                message["turn_code"] = submitted_turn_code(message)
+            if message.get("type") == WIRE_FORMAT_MESSAGE:
+                self._switch_recv_format(message.get("format"))
+            return message
+
+    def messages(self):
+        while (message := self.next_message()) is not None:
+            yield message
+
+    def _switch_recv_format(self, wire_format):
+        if wire_format == self.recv_format:
+            return
+        if wire_format == WIRE_BINARY:
+            self.framer = LengthPrefixedFramer.from_framer(self.framer)
+        elif wire_format == WIRE_JSON:
+            self.framer = LineFramer.from_framer(self.framer)
+        else:
+            raise ValueError(f"Unsupported wire format {wire_format!r}.")
+        self.recv_format = wire_format